@@ -0,0 +1 @@
+# Marks bench as a package
@@ -0,0 +1,199 @@
+import argparse, json, os, platform, sys, time
+import numpy as np
+
+# Cases: (name, vectorized?) -> builder(n_agents, render_mode, num_worlds) returning
+# (step_fn, worlds_per_call). step_fn advances the env once and handles resets.
+
+
+def _pz_case(n_agents, render_mode, num_worlds):
+    from envs.spread_wrapper import make_env
+    env = make_env(n_agents=n_agents, render_mode=render_mode)
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+
+    def step():
+        if not env.agents:
+            env.reset()
+        env.step({a: rng.uniform(0, 1, 5).astype(np.float32) for a in env.agents})
+        if render_mode:
+            env.render()
+    return step, 1
+
+
+def _rllib_case(n_agents, render_mode, num_worlds):
+    from train.rllib_env import RLlibSpread
+    env = RLlibSpread({"n_agents": n_agents, "render_mode": render_mode})
+    obs, _ = env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    state = {"obs": obs}
+
+    def step():
+        if not state["obs"]:
+            state["obs"], _ = env.reset()
+        state["obs"], _, _, truncs, _ = env.step(
+            {a: rng.uniform(0, 1, 5).astype(np.float32) for a in state["obs"]}
+        )
+        if truncs.get("__all__"):
+            state["obs"] = {}
+        if render_mode:
+            env.render()
+    return step, 1
+
+
+def _reset_case(fast_reset):
+    def builder(n_agents, render_mode, num_worlds):
+        from train.rllib_env import RLlibSpread
+        env = RLlibSpread({"n_agents": n_agents, "fast_reset": fast_reset})
+        env.reset(seed=0)
+        return env.reset, 1
+    return builder
+
+
+def _vector_case(n_agents, render_mode, num_worlds):
+    from envs.vector_spread import VectorSpread
+    env = VectorSpread(num_worlds=num_worlds, n_agents=n_agents, seed=0)
+    env.reset()
+    actions = np.random.default_rng(0).uniform(0, 1, (num_worlds, n_agents, 5))
+
+    def step():
+        _, _, _, trunc, _ = env.step(actions)
+        if trunc.all():
+            env.reset()
+    return step, num_worlds
+
+
+def _rllib_vector_case(n_agents, render_mode, num_worlds):
+    from train.rllib_env import RLlibVectorSpread
+    env = RLlibVectorSpread({"n_agents": n_agents, "num_worlds": num_worlds})
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    ids = list(env.possible_agents)
+
+    def step():
+        _, _, _, truncs, _ = env.step({a: rng.uniform(0, 1, 5) for a in ids})
+        if truncs["__all__"]:
+            env.reset()
+    return step, num_worlds
+
+
+def _reward_case(n_agents, render_mode, num_worlds):
+    from envs.rewards import ShapedReward
+    rng = np.random.default_rng(0)
+    agents = rng.uniform(-1, 1, (num_worlds, n_agents, 2))
+    landmarks = rng.uniform(-1, 1, (num_worlds, n_agents, 2))
+    actions = rng.uniform(0, 1, (num_worlds, n_agents, 5))
+    shaping = ShapedReward()
+
+    def step():
+        shaping(agents, landmarks, actions)
+    return step, num_worlds
+
+
+CASES = {
+    "make_env": (_pz_case, False),
+    "RLlibSpread": (_rllib_case, False),
+    "RLlibSpread.reset": (_reset_case(True), False),
+    "RLlibSpread.reset_pettingzoo": (_reset_case(False), False),
+    "VectorSpread": (_vector_case, True),
+    "RLlibVectorSpread": (_rllib_vector_case, True),
+    "reward": (_reward_case, True),
+}
+
+
+def measure(step, worlds_per_call, min_steps=200, min_time=1.0, warmup=20):
+    for _ in range(warmup):
+        step()
+    lat = []
+    start = time.perf_counter()
+    while len(lat) < min_steps or (time.perf_counter() - start) < min_time:
+        t0 = time.perf_counter()
+        step()
+        lat.append(time.perf_counter() - t0)
+    lat = np.asarray(lat)
+    return {
+        "calls": int(len(lat)),
+        "steps_per_s": float(worlds_per_call * len(lat) / lat.sum()),
+        "p50_ms": float(np.percentile(lat, 50) * 1e3),
+        "p90_ms": float(np.percentile(lat, 90) * 1e3),
+        "p99_ms": float(np.percentile(lat, 99) * 1e3),
+    }
+
+
+def case_key(r):
+    return f"{r['case']}|n={r['n_agents']}|render={r['render_mode']}|worlds={r['num_worlds']}"
+
+
+def run_suite(cases, n_agents_list, render_modes, num_worlds_list, min_steps, min_time):
+    results = []
+    for name in cases:
+        builder, vectorized = CASES[name]
+        for n in n_agents_list:
+            # Rendering only exists for the PettingZoo-backed envs
+            modes = render_modes if name in ("make_env", "RLlibSpread") else [None]
+            worlds = num_worlds_list if vectorized else [1]
+            for mode in modes:
+                for w in worlds:
+                    step, per_call = builder(n, mode, w)
+                    r = {"case": name, "n_agents": n, "render_mode": mode, "num_worlds": w}
+                    r.update(measure(step, per_call, min_steps=min_steps, min_time=min_time))
+                    results.append(r)
+                    print(
+                        f"{case_key(r):<55} {r['steps_per_s']:>12.0f} steps/s  "
+                        f"p50={r['p50_ms']:.3f}ms p99={r['p99_ms']:.3f}ms",
+                        flush=True,
+                    )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the cases whose throughput fell more than ``tolerance`` below baseline."""
+    base = {case_key(r): r for r in baseline["results"]}
+    slow = []
+    for r in results:
+        b = base.get(case_key(r))
+        if b is None:
+            continue
+        ratio = r["steps_per_s"] / b["steps_per_s"]
+        flag = "SLOWER" if ratio < 1 - tolerance else "ok"
+        print(f"{case_key(r):<55} {ratio:6.2f}x baseline  {flag}")
+        if flag != "ok":
+            slow.append((case_key(r), ratio))
+    return slow
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Environment throughput benchmarks")
+    ap.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    ap.add_argument("--n_agents", type=int, nargs="+", default=[3, 10, 30])
+    ap.add_argument("--render_modes", nargs="+", default=["none", "rgb_array"])
+    ap.add_argument("--num_worlds", type=int, nargs="+", default=[1, 64])
+    ap.add_argument("--min_steps", type=int, default=200)
+    ap.add_argument("--min_time", type=float, default=1.0, help="seconds per case")
+    ap.add_argument("--out", type=str, default="bench/results.json")
+    ap.add_argument("--compare", type=str, default="", help="baseline JSON to check against")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed fractional slowdown")
+    args = ap.parse_args()
+
+    render_modes = [None if m == "none" else m for m in args.render_modes]
+    results = run_suite(args.cases, args.n_agents, render_modes, args.num_worlds, args.min_steps, args.min_time)
+    payload = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(payload, f, indent=2)
+    print("Wrote", args.out)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slow = compare(results, baseline, args.tolerance)
+        if slow:
+            print(f"{len(slow)} case(s) slower than baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+        print("No throughput regressions vs", args.compare)
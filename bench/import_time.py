@@ -0,0 +1,95 @@
+import argparse, json, os, platform, subprocess, sys, tempfile, time
+
+# Startup budget of the CLI entry points. Each case runs in a fresh
+# interpreter under `python -X importtime`; the report is the summed
+# cumulative time of the top-level imports (the import cost of the whole
+# invocation), the process wall time and the heaviest top-level packages.
+# A case fails when its import time exceeds its budget or when it imports a
+# module it must not (e.g. Ray for a random-policy video, pandas for --help),
+# so a new top-level import of the heavy stack shows up here first.
+
+HEAVY = ("ray", "torch", "pandas", "matplotlib", "scipy")
+
+# name -> (argv after `python -X importtime`, import budget in seconds, forbidden top-level packages)
+CASES = {
+    "record_video random": (["-m", "eval.record_video", "--ckpts", "random", "--outs", "{tmp}/random.mp4",
+                             "--max_steps", "5", "--render_workers", "1"], 1.5, HEAVY),
+    "plot_training --help": (["-m", "eval.plot_training", "--help"], 0.5, HEAVY),
+    "evaluate --help": (["-m", "eval.evaluate", "--help"], 1.5, HEAVY),
+    "export_policy --help": (["-m", "eval.export_policy", "--help"], 1.5, HEAVY),
+    "leaderboard --help": (["-m", "eval.leaderboard", "--help"], 1.5, HEAVY),
+    "rollout_log --help": (["-m", "eval.rollout_log", "--help"], 1.0, HEAVY),
+    "offline_rollouts --help": (["-m", "train.offline_rollouts", "--help"], 1.0, HEAVY),
+    "eval_worker --help": (["-m", "train.eval_worker", "--help"], 1.0, HEAVY),
+    "fast_reset --help": (["-m", "envs.fast_reset", "--help"], 1.0, HEAVY),
+    "check_parity --help": (["-m", "envs.check_parity", "--help"], 1.5, HEAVY),
+    # The trainer needs Ray and torch; only its budget is guarded
+    "import train_rllib_ppo": (["-c", "import train.train_rllib_ppo"], 15.0, ()),
+}
+
+
+def parse_importtime(stderr):
+    """``(modules, top)``: every imported module name and ``{top-level module: cumulative s}``."""
+    modules, top = set(), {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name[1:].startswith(" "):  # depth 0: one leading space
+            top[name.strip()] = top.get(name.strip(), 0.0) + int(cumulative) / 1e6
+    return modules, top
+
+
+def run_case(argv, env):
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], env=env, capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    modules, top = parse_importtime(proc.stderr)
+    return proc.returncode, wall, modules, top
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Import time of each CLI entry point against its budget")
+    ap.add_argument("--cases", nargs="*", default=None, help=f"subset of: {', '.join(CASES)}")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per case (the fastest counts: warm file cache)")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow CI machines)")
+    ap.add_argument("--top", type=int, default=4, help="heaviest top-level imports to list per case")
+    ap.add_argument("--out", type=str, default="bench/import_time.json")
+    args = ap.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    results, failed = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.cases or CASES:
+            argv, budget, forbid = CASES[name]
+            argv = [a.format(tmp=tmp) for a in argv]
+            runs = [run_case(argv, env) for _ in range(args.repeat)]
+            code, wall, modules, top = min(runs, key=lambda r: sum(r[3].values()))
+            import_s = sum(top.values())
+            budget *= args.scale
+            bad = sorted(m for m in modules if m in forbid)
+            ok = code == 0 and import_s <= budget and not bad
+            heaviest = sorted(top.items(), key=lambda kv: -kv[1])[:args.top]
+            results.append({"case": name, "argv": argv, "ok": ok, "exit_code": code, "import_s": import_s,
+                            "wall_s": wall, "budget_s": budget, "forbidden_imported": bad,
+                            "heaviest": dict(heaviest)})
+            note = "" if ok else ("  FAIL" + (f" exit={code}" if code else "") + (f" imports {bad}" if bad else "")
+                                  + (" over budget" if import_s > budget else ""))
+            print(f"{name:<24} import={import_s:5.2f}s (budget {budget:4.1f}s)  wall={wall:5.2f}s  "
+                  + ", ".join(f"{m} {s:.2f}" for m, s in heaviest) + note, flush=True)
+            if not ok:
+                failed.append(name)
+    payload = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(payload, f, indent=2)
+    print("Wrote", args.out)
+    if failed:
+        print(f"{len(failed)} entry point(s) over budget or importing forbidden modules: {', '.join(failed)}")
+        sys.exit(1)
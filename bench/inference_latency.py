@@ -0,0 +1,68 @@
+import argparse, json, subprocess, sys, time
+import numpy as np
+
+# Startup = fresh interpreter importing the backend and loading the policy.
+_STARTUP = {
+    "rllib": "from eval.evaluate import load_policy; load_policy({src!r})",
+    "npz": "from eval.inference import NumpyPolicy; NumpyPolicy.load({src!r})",
+    "torchscript": "from eval.inference import TorchScriptPolicy; TorchScriptPolicy({src!r})",
+}
+
+
+def startup_s(backend, src, repeats=3):
+    code = _STARTUP[backend].format(src=src)
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-W", "ignore", "-c", code], check=True, capture_output=True)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+def call_latency_ms(policy, batch, obs_dim, min_time=0.5):
+    obs = np.random.default_rng(0).standard_normal((batch, obs_dim)).astype(np.float32)
+    policy.act(obs)
+    lat = []
+    start = time.perf_counter()
+    while (time.perf_counter() - start) < min_time or len(lat) < 10:
+        t0 = time.perf_counter()
+        policy.act(obs)
+        lat.append(time.perf_counter() - t0)
+    return float(np.percentile(lat, 50) * 1e3), float(np.percentile(lat, 99) * 1e3)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Startup and per-call latency: RLlib vs exported policies")
+    ap.add_argument("--ckpt", required=True, help="RLlib checkpoint dir")
+    ap.add_argument("--npz", default="", help="exported .npz (default: export to /tmp)")
+    ap.add_argument("--torchscript", default="", help="exported TorchScript file (default: export to /tmp)")
+    ap.add_argument("--batch", type=int, nargs="+", default=[1, 3, 192, 4096])
+    ap.add_argument("--json", default="")
+    args = ap.parse_args()
+
+    from eval.export_policy import export
+    from eval.evaluate import load_policy
+    from eval.inference import load_exported
+    npz = args.npz or "/tmp/bench_policy.npz"
+    ts = args.torchscript or "/tmp/bench_policy.pt"
+    if not args.npz:
+        export(args.ckpt, npz, fmt="npz")
+    if not args.torchscript:
+        export(args.ckpt, ts, fmt="torchscript")
+
+    obs_dim = load_exported(npz).obs_dim
+    sources = {"rllib": args.ckpt, "npz": npz, "torchscript": ts}
+    rows = []
+    for backend, src in sources.items():
+        policy = load_policy(src)
+        row = {"backend": backend, "startup_s": startup_s(backend, src)}
+        for b in args.batch:
+            p50, p99 = call_latency_ms(policy, b, obs_dim)
+            row[f"b{b}_p50_ms"], row[f"b{b}_p99_ms"] = p50, p99
+        rows.append(row)
+        lat = " ".join(f"b{b}={row[f'b{b}_p50_ms']:.3f}ms" for b in args.batch)
+        print(f"{backend:<12} startup={row['startup_s']:.2f}s  p50: {lat}", flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print("Wrote", args.json)
@@ -0,0 +1,116 @@
+import argparse, copy, gc, json, os, platform, sys, time
+import numpy as np
+
+# Learner-only PPO update throughput on one fixed batch of episodes. Sampling
+# is done once and every case trains on a copy of the same episodes, so the
+# numbers isolate the update: minibatch/epoch settings, torch threads and the
+# number of local learner processes (DDP, gradients averaged).
+#
+# "rllib_defaults" is what train_rllib_ppo.py ran before train.sgd_minibatch_size
+# and num_sgd_iter were wired through (RLlib's PPO minibatch 128 x 30 epochs).
+
+
+def _cases(args, cpus):
+    cases = []
+    if not args.no_baseline:
+        cases.append(("rllib_defaults", {"sgd_minibatch_size": 128, "num_sgd_iter": 30}))
+    for k in args.learners:
+        for t in (args.threads or [0, max(1, cpus // max(1, k))]):
+            cases.append((f"learners={k} threads={t or 'default'}", {"num_learners": k, "learner_torch_threads": t}))
+    return cases
+
+
+def sample_episodes(env_cfg, trn, train_batch_size):
+    from train.train_rllib_ppo import build_config
+    algo = build_config(env_cfg, trn, num_workers=0, train_batch_size=train_batch_size).build()
+    episodes = algo.env_runner.sample(num_timesteps=train_batch_size)
+    algo.stop()
+    algo.learner_group.shutdown()
+    return episodes
+
+
+def run_case(env_cfg, trn, episodes, train_batch_size, reps):
+    from ray.rllib.utils.metrics import NUM_ENV_STEPS_SAMPLED_LIFETIME
+    from train.train_rllib_ppo import build_config
+    algo_cfg = build_config(env_cfg, trn, num_workers=0, train_batch_size=train_batch_size)
+    algo = algo_cfg.build()
+    agent_steps = sum(e.agent_steps() for e in episodes)
+    times = []
+    try:
+        for r in range(reps + 1):
+            batch = copy.deepcopy(episodes)  # the learner connector edits episodes in place
+            t0 = time.perf_counter()
+            algo.learner_group.update_from_episodes(
+                episodes=batch, timesteps={NUM_ENV_STEPS_SAMPLED_LIFETIME: 0},
+                num_epochs=algo_cfg.num_epochs, minibatch_size=algo_cfg.minibatch_size,
+                shuffle_batch_per_epoch=algo_cfg.shuffle_batch_per_epoch,
+            )
+            if r:  # first update warms up (optimizer state, DDP buckets)
+                times.append(time.perf_counter() - t0)
+    finally:
+        algo.stop()
+        algo.learner_group.shutdown()  # algo.stop() leaves the learners up
+    update_s = float(np.median(times))
+    return {
+        "num_learners": int(trn.get("num_learners", 0) or 0),
+        "torch_threads": int(trn.get("learner_torch_threads", 0) or 0),
+        "minibatch_size": algo_cfg.minibatch_size,
+        "num_epochs": algo_cfg.num_epochs,
+        "agent_steps": agent_steps,
+        "update_s": update_s,
+        "learner_samples_per_s": agent_steps / update_s,
+        "sample_passes_per_s": agent_steps * algo_cfg.num_epochs / update_s,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="PPO learner update throughput (CPU learner modes)")
+    ap.add_argument("--train_batch_size", type=int, default=0, help="default: config.yaml train.train_batch_size")
+    ap.add_argument("--learners", type=int, nargs="+", default=[0, 2], help="num_learners values")
+    ap.add_argument("--threads", type=int, nargs="*", default=None,
+                    help="torch threads per learner (default: torch default and cpus / learners)")
+    ap.add_argument("--no_baseline", action="store_true", help="skip the rllib_defaults case")
+    ap.add_argument("--reps", type=int, default=2, help="timed updates per case (after one warm-up)")
+    ap.add_argument("--ray_cpus", type=int, default=0, help="CPUs Ray may schedule learners on (0 = all)")
+    ap.add_argument("--out", type=str, default="bench/learner_throughput.json")
+    args = ap.parse_args()
+
+    import ray, yaml
+    with open("config.yaml") as f:
+        cfg = yaml.safe_load(f)
+    env_cfg, trn = cfg["env"], cfg["train"]
+    B = args.train_batch_size or trn["train_batch_size"]
+    cpus = os.cpu_count() or 1
+    ray.init(num_cpus=args.ray_cpus or max(cpus, max(args.learners) + 1), include_dashboard=False)
+
+    t0 = time.time()
+    episodes = sample_episodes(env_cfg, trn, B)
+    print(f"Sampled {sum(e.env_steps() for e in episodes)} env steps in {time.time() - t0:.0f}s", flush=True)
+    results = []
+    for name, overrides in _cases(args, cpus):
+        # Learner processes get a fractional CPU so k learners fit on small machines
+        case_trn = dict(trn, **overrides, num_cpus_per_learner=min(1, cpus / max(1, overrides.get("num_learners", 0))))
+        r = dict(case=name, **run_case(env_cfg, case_trn, episodes, B, args.reps))
+        results.append(r)
+        print(f"{name:<26} minibatch={r['minibatch_size']:<5} epochs={r['num_epochs']:<3} update={r['update_s']:7.2f}s "
+              f"{r['learner_samples_per_s']:9.0f} samples/s  {r['sample_passes_per_s']:10.0f} sample-passes/s", flush=True)
+        # Free the stopped algo while Ray is up: reference cycles would otherwise keep it alive
+        # until interpreter exit, after Ray's atexit shutdown, and its teardown then blocks
+        gc.collect()
+    base = results[0]
+    for r in results:
+        r["speedup_vs_" + base["case"]] = base["update_s"] / r["update_s"]
+    payload = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "cpus": cpus,
+        "train_batch_size": B,
+        "n_agents": env_cfg.get("n_agents", 3),
+        "fcnet_hiddens": trn["fcnet_hiddens"],
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(payload, f, indent=2)
+    print("Wrote", args.out)
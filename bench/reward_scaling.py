@@ -0,0 +1,68 @@
+import argparse, json, time
+import numpy as np
+from envs.rewards import ShapedReward, HAVE_SCIPY
+
+
+def reference_shaping(agents, landmarks, actions, cover_radius=0.1, collision_penalty=1.0, action_penalty=0.01):
+    # The original per-pair Python loop from make_env._step, kept as the baseline
+    dmat = np.linalg.norm(agents[:, None, :] - landmarks[None, :, :], axis=-1)
+    covered = (dmat < cover_radius).any(axis=0).sum()
+    collisions = 0
+    for i in range(len(agents)):
+        for j in range(i + 1, len(agents)):
+            if np.linalg.norm(agents[i] - agents[j]) < 0.05:
+                collisions += 1
+    effort = 0.0
+    for a in actions:
+        arr = np.asarray(a)
+        effort += float(np.sum(arr * arr))
+    return float(covered) - collision_penalty * float(collisions) - action_penalty * effort
+
+
+def time_call(fn, min_time=0.2, max_reps=1000):
+    # Median wall time per call over as many reps as fit in ``min_time``
+    fn()  # warm-up (allocates reusable buffers)
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_reps and (time.perf_counter() - start) < min_time or len(times) < 3:
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+def run(ns, max_ref_n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in ns:
+        # Spread agents like the env does so collisions stay sparse
+        agents = rng.uniform(-1, 1, (n, 2))
+        landmarks = rng.uniform(-1, 1, (n, 2))
+        actions = rng.uniform(0, 1, (n, 5)).astype(np.float32)
+        row = {"n_agents": n}
+        if n <= max_ref_n:
+            row["loop_s"] = time_call(lambda: reference_shaping(agents, landmarks, actions), max_reps=20)
+        dense = ShapedReward(method="dense")
+        row["dense_s"] = time_call(lambda: dense(agents, landmarks, actions))
+        grid = ShapedReward(method="grid")
+        row["grid_s"] = time_call(lambda: grid(agents, landmarks, actions))
+        if HAVE_SCIPY:
+            tree = ShapedReward(method="kdtree")
+            row["kdtree_s"] = time_call(lambda: tree(agents, landmarks, actions))
+        rows.append(row)
+        cols = " ".join(f"{k}={v * 1e6:.1f}us" for k, v in row.items() if k.endswith("_s"))
+        print(f"n_agents={n}: {cols}", flush=True)
+    return rows
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Shaped-reward cost vs number of agents")
+    ap.add_argument("--n", type=int, nargs="+", default=[3, 10, 30, 100, 300, 1000])
+    ap.add_argument("--max_ref_n", type=int, default=1000, help="skip the Python loop above this N")
+    ap.add_argument("--json", type=str, default="", help="optional path to write results")
+    args = ap.parse_args()
+    rows = run(args.n, max_ref_n=args.max_ref_n)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print("Wrote", args.json)
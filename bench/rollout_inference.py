@@ -0,0 +1,156 @@
+import argparse, json, os, platform, sys, time
+import numpy as np
+
+# Env-runner rollout inference modes (train.rollout_compile x
+# train.rollout_precision, see train/rollout_inference.py) against RLlib's
+# eager fp32 forward. Every mode gets the same weights (random init, or
+# --ckpt) through module.set_state, i.e. the path weight syncs take during
+# training. Reported per mode:
+#   parity:     max |action_dist_inputs - fp32|, max |deterministic action - fp32|
+#               and mean KL(fp32 || mode) on observations sampled by the fp32 policy
+#   forward:    policy forward latency at the per-step batch (all agents of all worlds)
+#   throughput: env steps/sec of env_runner.sample (explore=True, as in training)
+
+DEFAULT_MODES = ["none/fp32", "script/fp32", "compile/fp32", "none/bf16", "script/bf16", "none/int8", "script/int8"]
+
+
+def _module(algo):
+    return algo.env_runner.module["shared_policy"]
+
+
+def observations(episodes, max_rows):
+    obs = []
+    for ep in episodes:
+        for sa in ep.agent_episodes.values():
+            obs.append(np.asarray(sa.get_observations(), dtype=np.float32))
+    obs = np.concatenate(obs).reshape(-1, obs[0].shape[-1])  # vector engine: (T, num_worlds, obs_dim) per agent
+    return obs[::max(1, len(obs) // max_rows)][:max_rows]
+
+
+def dist_inputs(module, obs):
+    import torch
+    from ray.rllib.core.columns import Columns
+    with torch.no_grad():
+        return module.forward_inference({Columns.OBS: torch.as_tensor(obs)})[Columns.ACTION_DIST_INPUTS]
+
+
+def parity(ref_module, module, obs):
+    import torch
+    ref, out = dist_inputs(ref_module, obs), dist_inputs(module, obs)
+    cls = ref_module.get_inference_action_dist_cls()
+    ref_dist, dist = cls.from_logits(ref), cls.from_logits(out)
+    with torch.no_grad():
+        kl = ref_dist.kl(dist)
+        act_diff = (ref_dist.to_deterministic().sample() - dist.to_deterministic().sample()).abs()
+    return {
+        "max_abs_dist_inputs": float((ref - out).abs().max()),
+        "max_abs_action": float(act_diff.max()),
+        "mean_abs_action": float(act_diff.mean()),
+        "mean_kl": float(kl.mean()),
+    }
+
+
+def forward_latency(module, obs, reps):
+    import torch
+    from ray.rllib.core.columns import Columns
+    batch = {Columns.OBS: torch.as_tensor(obs)}
+    with torch.no_grad():
+        for _ in range(10):
+            module.forward_exploration(batch)
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            module.forward_exploration(batch)
+    return (time.perf_counter() - t0) / reps
+
+
+def sample_throughput(algo, steps, reps):
+    rates = []
+    algo.env_runner.sample(num_timesteps=steps)  # warm-up (compilation, env resets)
+    for _ in range(reps):
+        t0 = time.perf_counter()
+        episodes = algo.env_runner.sample(num_timesteps=steps)
+        rates.append(sum(e.env_steps() for e in episodes) / (time.perf_counter() - t0))
+    return float(np.median(rates))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rollout inference modes: action-distribution parity and env-steps/sec")
+    ap.add_argument("--modes", nargs="+", default=DEFAULT_MODES, help="rollout_compile/rollout_precision pairs")
+    ap.add_argument("--ckpt", type=str, default="", help="checkpoint whose shared_policy weights to use (default: random init)")
+    ap.add_argument("--engine", type=str, default="", help="override env.engine (vector batches num_worlds * N rows)")
+    ap.add_argument("--num_worlds", type=int, default=0, help="override env.num_worlds")
+    ap.add_argument("--steps", type=int, default=2000,
+                    help="env steps per timed sample() call (vector/shm: steps of all num_worlds worlds)")
+    ap.add_argument("--reps", type=int, default=3, help="timed sample() calls per mode (median)")
+    ap.add_argument("--forward_reps", type=int, default=2000)
+    ap.add_argument("--parity_rows", type=int, default=20000, help="observations in the parity check")
+    ap.add_argument("--small_model", action="store_true", help="[64, 64] instead of train.fcnet_hiddens")
+    ap.add_argument("--out", type=str, default="bench/rollout_inference.json")
+    args = ap.parse_args()
+
+    import ray, torch, yaml
+    from train.train_rllib_ppo import build_config
+    with open("config.yaml") as f:
+        cfg = yaml.safe_load(f)
+    env_cfg, trn = dict(cfg["env"]), cfg["train"]
+    if args.engine:
+        env_cfg["engine"] = args.engine
+    if args.num_worlds:
+        env_cfg["num_worlds"] = args.num_worlds
+    rows_per_step = env_cfg["n_agents"] * (env_cfg.get("num_worlds", 1) if env_cfg.get("engine") in ("vector", "shm") else 1)
+    ray.init(num_cpus=1, include_dashboard=False)
+
+    def build(mode):
+        comp, prec = mode.split("/")
+        return build_config(env_cfg, dict(trn, rollout_compile=comp, rollout_precision=prec), num_workers=0,
+                            train_batch_size=args.steps, rollout_fragment_length=args.steps,
+                            small_model=args.small_model).build()
+
+    ref_algo = build("none/fp32")
+    if args.ckpt:
+        from ray.rllib.core.rl_module.rl_module import RLModule
+        from eval.evaluate import find_module_dir
+        state = RLModule.from_checkpoint(find_module_dir(args.ckpt)).get_state()
+        _module(ref_algo).set_state(state)
+    state = _module(ref_algo).get_state()
+    obs = observations(ref_algo.env_runner.sample(num_timesteps=args.steps, explore=False), args.parity_rows)
+    step_obs = obs[:rows_per_step]
+    print(f"{len(obs)} parity observations, forward batch {rows_per_step} rows, torch threads {torch.get_num_threads()}",
+          flush=True)
+
+    results = []
+    for mode in args.modes:
+        algo = ref_algo if mode == "none/fp32" else build(mode)
+        module = _module(algo)
+        module.set_state(state)
+        r = {"mode": mode}
+        r.update(parity(_module(ref_algo), module, obs))
+        r["forward_us"] = forward_latency(module, step_obs, args.forward_reps) * 1e6
+        r["env_steps_per_s"] = sample_throughput(algo, args.steps, args.reps)
+        results.append(r)
+        print(f"{mode:<13} max|d dist_in|={r['max_abs_dist_inputs']:.2e} max|d action|={r['max_abs_action']:.2e} "
+              f"KL={r['mean_kl']:.2e}  forward={r['forward_us']:7.1f}us  {r['env_steps_per_s']:8.0f} env steps/s",
+              flush=True)
+        if algo is not ref_algo:
+            algo.stop()
+    ref_algo.stop()
+    base = next((r for r in results if r["mode"] == "none/fp32"), results[0])
+    for r in results:
+        r["forward_speedup"] = base["forward_us"] / r["forward_us"]
+        r["env_steps_speedup"] = r["env_steps_per_s"] / base["env_steps_per_s"]
+    payload = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "torch": torch.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "engine": env_cfg.get("engine", "pettingzoo"),
+        "rows_per_step": rows_per_step,
+        "fcnet_hiddens": [64, 64] if args.small_model else trn["fcnet_hiddens"],
+        "weights": args.ckpt or "random init",
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(payload, f, indent=2)
+    print("Wrote", args.out)
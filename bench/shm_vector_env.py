@@ -0,0 +1,161 @@
+import argparse, json, multiprocessing as mp, os, platform, sys, time
+import numpy as np
+from bench.env_throughput import measure
+
+# Sub-env throughput with the envs in worker subprocesses: pickled dicts over
+# pipes (what crosses process boundaries today) vs ShmVectorSpread's
+# shared-memory buffers + barrier. "inprocess" steps the same PettingZoo envs
+# serially in this process for reference.
+
+
+def _pipe_worker(conn, n_envs, n_agents):
+    from envs.spread_wrapper import make_env
+    envs = [make_env(n_agents=n_agents) for _ in range(n_envs)]
+    while True:
+        cmd, payload = conn.recv()
+        if cmd == "close":
+            break
+        out = []
+        for k, env in enumerate(envs):
+            if cmd == "reset":
+                obs, _ = env.reset(seed=payload[k])
+                out.append((obs, None, None, None))
+            else:
+                obs, rew, term, trunc, _ = env.step(payload[k])
+                out.append((obs, rew, term, trunc))
+        conn.send(out)
+
+
+class PipeVectorSpread:
+    """Baseline: per-world dicts keyed by agent id, pickled through pipes."""
+
+    def __init__(self, num_worlds, n_agents, num_procs, start_method="spawn"):
+        ctx = mp.get_context(start_method)
+        self.num_worlds, self.n_agents = num_worlds, n_agents
+        self.ids = [f"agent_{i}" for i in range(n_agents)]
+        self.bounds = np.linspace(0, num_worlds, num_procs + 1).astype(int)
+        self.conns, self.procs = [], []
+        for p in range(num_procs):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_pipe_worker, args=(child, int(self.bounds[p + 1] - self.bounds[p]), n_agents),
+                               daemon=True)
+            proc.start()
+            self.conns.append(parent)
+            self.procs.append(proc)
+
+    def _call(self, cmd, per_world):
+        for p, conn in enumerate(self.conns):
+            conn.send((cmd, per_world[self.bounds[p]:self.bounds[p + 1]]))
+        out = []
+        for conn in self.conns:
+            out.extend(conn.recv())
+        obs = np.stack([[o[a] for a in self.ids] for o, _, _, _ in out])
+        if cmd == "reset":
+            return obs
+        rew = np.array([[r[a] for a in self.ids] for _, r, _, _ in out])
+        trunc = np.array([any(t.values()) for _, _, _, t in out])
+        return obs, rew, None, trunc, {}
+
+    def reset(self, seed=0):
+        return self._call("reset", [seed + b for b in range(self.num_worlds)])
+
+    def step(self, actions):
+        return self._call("step", [dict(zip(self.ids, a)) for a in actions])
+
+    def close(self):
+        for conn in self.conns:
+            conn.send(("close", None))
+        for proc in self.procs:
+            proc.join(timeout=5)
+
+
+class InProcessSpread:
+    def __init__(self, num_worlds, n_agents, num_procs=None):
+        from envs.spread_wrapper import make_env
+        self.envs = [make_env(n_agents=n_agents) for _ in range(num_worlds)]
+        self.ids = [f"agent_{i}" for i in range(n_agents)]
+
+    def reset(self, seed=0):
+        return np.stack([[o[a] for a in self.ids] for o in (e.reset(seed=seed + b)[0] for b, e in enumerate(self.envs))])
+
+    def step(self, actions):
+        trunc = []
+        obs = []
+        for env, a in zip(self.envs, actions):
+            o, _, _, tr, _ = env.step(dict(zip(self.ids, a)))
+            obs.append([o[i] for i in self.ids])
+            trunc.append(any(tr.values()))
+        return np.stack(obs), None, None, np.array(trunc), {}
+
+    def close(self):
+        pass
+
+
+def _build(backend, num_worlds, n_agents, num_procs):
+    if backend == "shm":
+        from envs.shm_vector import ShmVectorSpread
+        return ShmVectorSpread(num_worlds=num_worlds, n_agents=n_agents, num_procs=num_procs)
+    if backend == "pickle":
+        return PipeVectorSpread(num_worlds, n_agents, num_procs)
+    return InProcessSpread(num_worlds, n_agents)
+
+
+BACKENDS = ("inprocess", "pickle", "shm")
+
+
+def run_case(backend, num_worlds, n_agents, num_procs, min_steps, min_time):
+    env = _build(backend, num_worlds, n_agents, num_procs)
+    try:
+        env.reset(seed=0)
+        actions = np.random.default_rng(0).uniform(0, 1, (num_worlds, n_agents, 5)).astype(np.float32)
+
+        def step():
+            obs, _, _, trunc, _ = env.step(actions)
+            # Consumer side: the policy batch reads every observation once
+            obs.reshape(-1, obs.shape[-1]).sum()
+            if trunc.all():
+                env.reset(seed=0)
+        return measure(step, num_worlds, min_steps=min_steps, min_time=min_time)
+    finally:
+        env.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Shared-memory vs pickle subprocess sub-env throughput")
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    ap.add_argument("--num_envs", type=int, nargs="+", default=[8, 16, 32], help="sub-envs per runner")
+    ap.add_argument("--n_agents", type=int, nargs="+", default=[3, 10])
+    ap.add_argument("--procs", type=int, default=0, help="worker processes (0 = CPU count)")
+    ap.add_argument("--min_steps", type=int, default=100)
+    ap.add_argument("--min_time", type=float, default=2.0, help="seconds per case")
+    ap.add_argument("--out", type=str, default="bench/shm_vector_env.json")
+    args = ap.parse_args()
+
+    procs = args.procs or os.cpu_count() or 1
+    results = []
+    for n in args.n_agents:
+        for B in args.num_envs:
+            for backend in args.backends:
+                r = {"backend": backend, "num_envs": B, "n_agents": n, "procs": 1 if backend == "inprocess" else min(procs, B)}
+                r.update(run_case(backend, B, n, r["procs"], args.min_steps, args.min_time))
+                results.append(r)
+                print(f"{backend:<10} envs={B:<3} n={n:<3} procs={r['procs']:<3} {r['steps_per_s']:>10.0f} env-steps/s  "
+                      f"p50={r['p50_ms']:.3f}ms p99={r['p99_ms']:.3f}ms", flush=True)
+    for r in results:
+        base = next((b for b in results if b["backend"] == "pickle" and b["num_envs"] == r["num_envs"]
+                     and b["n_agents"] == r["n_agents"]), None)
+        if base is not None and r["backend"] == "shm":
+            r["speedup_vs_pickle"] = r["steps_per_s"] / base["steps_per_s"]
+            print(f"shm vs pickle  envs={r['num_envs']:<3} n={r['n_agents']:<3} {r['speedup_vs_pickle']:.2f}x")
+    payload = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(payload, f, indent=2)
+    print("Wrote", args.out)
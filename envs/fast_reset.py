@@ -0,0 +1,129 @@
+import argparse
+import numpy as np
+
+# Initial states of simple_spread are agent then landmark positions drawn
+# uniformly from [-1, 1]^2 (Scenario.reset_world), with zero velocity and
+# comm. A state here is a ``(N + L, 2)`` array in that order, so drawing it
+# from ``default_rng(seed)`` reproduces PettingZoo's ``reset(seed=seed)``.
+
+
+def sample_initial_states(seeds, n_agents):
+    """``(len(seeds), 2N, 2)`` initial states, one per seed."""
+    return np.stack([np.random.default_rng(int(s)).uniform(-1, +1, (2 * n_agents, 2)) for s in seeds])
+
+
+class InitialStatePool:
+    """Pre-generated initial states for seeds ``seed .. seed + size - 1``.
+
+    Entry ``k`` is exactly the world that ``reset(seed=seed + k)`` would
+    produce, so replaying the pool is deterministic and interchangeable with
+    seeded resets (``eval/evaluate.py --reset_pool``).
+    """
+
+    def __init__(self, states, seed=0):
+        self.states = np.asarray(states, dtype=np.float64)
+        self.seed = int(seed)
+        self.n_agents = self.states.shape[1] // 2
+
+    @classmethod
+    def generate(cls, n_agents, size, seed=0):
+        return cls(sample_initial_states(range(seed, seed + size), n_agents), seed)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(f["states"], int(f["seed"]))
+
+    def save(self, path):
+        np.savez(path, states=self.states, seed=self.seed)
+
+    @property
+    def seeds(self):
+        return np.arange(self.seed, self.seed + len(self))
+
+    def __len__(self):
+        return len(self.states)
+
+    def __getitem__(self, index):
+        return self.states[index]
+
+
+class FastReset:
+    """In-place episode reset for a ``make_env()`` parallel env.
+
+    The first reset must go through PettingZoo (it creates the world state
+    arrays). Afterwards positions are re-sampled from the env's own
+    ``np_random`` with one vectorized draw, written into the existing state
+    arrays, and observations are computed for all agents at once, bypassing
+    the wrapper chain and per-agent ``observation`` calls. Same RNG stream
+    and results as ``env.reset``.
+    """
+
+    def __init__(self, par_env):
+        self.par_env = par_env
+        self.base = par_env.aec_env.unwrapped
+        world = self.base.world
+        self.agents = list(world.agents)
+        self.landmarks = list(world.landmarks)
+        self.ids = list(self.base.possible_agents)
+        N, L = len(self.agents), len(self.landmarks)
+        self.n_agents, self.n_landmarks = N, L
+        self.obs_dim = 4 + 2 * L + 4 * (N - 1)
+        self._others = np.array([[j for j in range(N) if j != i] for i in range(N)], dtype=np.int64).reshape(N, N - 1)
+
+    def sample(self):
+        # Same draw order as Scenario.reset_world: agents first, then landmarks
+        return self.base.np_random.uniform(-1, +1, (self.n_agents + self.n_landmarks, 2))
+
+    def reset(self, seed=None, state=None):
+        base = self.base
+        if seed is not None:
+            base._seed(seed=seed)
+        pos = self.sample() if state is None else np.asarray(state, dtype=np.float64)
+        N = self.n_agents
+        for k, agent in enumerate(self.agents):
+            agent.state.p_pos[:] = pos[k]
+            agent.state.p_vel[:] = 0.0
+            agent.state.c[:] = 0.0
+        for k, landmark in enumerate(self.landmarks):
+            landmark.state.p_pos[:] = pos[N + k]
+            landmark.state.p_vel[:] = 0.0
+
+        ids = self.ids
+        base.agents = ids[:]
+        base.rewards = dict.fromkeys(ids, 0.0)
+        base._cumulative_rewards = dict.fromkeys(ids, 0.0)
+        base.terminations = dict.fromkeys(ids, False)
+        base.truncations = dict.fromkeys(ids, False)
+        base.infos = {a: {} for a in ids}
+        base.agent_selection = base._agent_selector.reset()
+        base.steps = 0
+        base.current_actions = [None] * N
+        self.par_env.agents = ids[:]
+        obs = self.observations(pos)
+        return dict(zip(ids, obs)), {a: {} for a in ids}
+
+    def observations(self, pos):
+        # [self_vel (0 after reset), self_pos, landmark_rel, other_rel, comm (0)]
+        N, L = self.n_agents, self.n_landmarks
+        agent_pos, landmark_pos = pos[:N], pos[N:]
+        obs = np.zeros((N, self.obs_dim), dtype=np.float32)
+        obs[:, 2:4] = agent_pos
+        obs[:, 4:4 + 2 * L] = (landmark_pos[None, :, :] - agent_pos[:, None, :]).reshape(N, 2 * L)
+        if N > 1:
+            obs[:, 4 + 2 * L:4 + 2 * L + 2 * (N - 1)] = (
+                agent_pos[self._others] - agent_pos[:, None, :]
+            ).reshape(N, 2 * (N - 1))
+        return obs
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pre-generate a pool of initial states")
+    ap.add_argument("--n_agents", type=int, default=3)
+    ap.add_argument("--size", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0, help="state k equals reset(seed=seed + k)")
+    ap.add_argument("--out", type=str, default="reset_pool.npz")
+    args = ap.parse_args()
+    pool = InitialStatePool.generate(args.n_agents, args.size, args.seed)
+    pool.save(args.out)
+    print(f"Wrote {args.out}: {len(pool)} states for n_agents={args.n_agents}, seeds {args.seed}..{args.seed + len(pool) - 1}")
@@ -0,0 +1,46 @@
+import numpy as np
+
+# simple_spread observation for N agents (landmarks = N):
+#   [self_vel(2), self_pos(2), landmark_rel(2N), other_rel(2(N-1)), other_comm(2(N-1))]
+# The comm block is always zero (agents are silent) and is dropped here.
+
+
+def raw_obs_dim(n_agents):
+    return 4 + 2 * n_agents + 4 * (n_agents - 1)
+
+
+def padded_obs_dim(max_agents):
+    # self(4) + landmarks(2M) + others(2(M-1)) + presence masks (M + M-1)
+    return 4 + 3 * max_agents + 3 * (max_agents - 1)
+
+
+def pad_observations(obs, n_agents, max_agents):
+    """Fixed-size, index-free encoding of ``(..., raw_obs_dim(N))`` observations.
+
+    Landmarks and other agents are sorted nearest-first and zero-padded to
+    ``max_agents`` / ``max_agents - 1`` slots, followed by 0/1 presence masks,
+    so the width is independent of N and agent/landmark ids. A policy
+    trained at one N runs unchanged at any N <= ``max_agents``.
+    """
+    assert n_agents <= max_agents, f"n_agents={n_agents} exceeds max_agents={max_agents}"
+    obs = np.asarray(obs, dtype=np.float32)
+    lead = obs.shape[:-1]
+    N, M = n_agents, max_agents
+    out = np.zeros(lead + (padded_obs_dim(M),), dtype=np.float32)
+    out[..., :4] = obs[..., :4]
+
+    def _sorted(block, k):
+        rel = block.reshape(lead + (k, 2))
+        order = np.argsort(np.einsum("...i,...i->...", rel, rel), axis=-1, kind="stable")
+        return np.take_along_axis(rel, order[..., None], axis=-2).reshape(lead + (2 * k,))
+
+    lm = 4
+    other = lm + 2 * M
+    lm_mask = other + 2 * (M - 1)
+    other_mask = lm_mask + M
+    out[..., lm:lm + 2 * N] = _sorted(obs[..., 4:4 + 2 * N], N)
+    if N > 1:
+        out[..., other:other + 2 * (N - 1)] = _sorted(obs[..., 4 + 2 * N:4 + 2 * N + 2 * (N - 1)], N - 1)
+    out[..., lm_mask:lm_mask + N] = 1.0
+    out[..., other_mask:other_mask + N - 1] = 1.0
+    return out
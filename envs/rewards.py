@@ -0,0 +1,378 @@
+import importlib.util, time
+import numpy as np
+from envs.spatial import SpreadIndex
+
+# Optional KD-tree path for large agent counts. scipy is only imported when a
+# tree is first built: the default N = 3 runs never pay its ~0.2 s import.
+HAVE_SCIPY = importlib.util.find_spec("scipy") is not None
+
+COLLISION_THRESHOLD = 0.05
+# Below this many agents the dense kernels beat building a KD-tree / grid
+KDTREE_MIN_AGENTS = 64
+METHODS = ("auto", "dense", "kdtree", "grid")
+
+
+class ShapedReward:
+    """Team reward = covered landmarks - collision penalty - action effort.
+
+    Works on a single world (``agents`` of shape ``(N, 2)``) or a batch of
+    worlds (``(B, N, 2)``). ``method`` picks the neighbour search:
+    ``"dense"`` builds the full distance matrices, ``"kdtree"`` uses
+    ``scipy.spatial.cKDTree``, ``"grid"`` keeps an incrementally updated
+    ``envs.spatial.SpreadIndex`` per world, and ``"auto"`` switches to the
+    tree (or the grid without scipy) once ``n_agents >= KDTREE_MIN_AGENTS``.
+    All methods count with the same strict ``<`` comparisons, so they return
+    identical values.
+    Dense scratch buffers are allocated once per shape and reused.
+    """
+
+    def __init__(
+        self,
+        cover_radius=0.1,
+        collision_penalty=1.0,
+        action_penalty=0.01,
+        collision_threshold=COLLISION_THRESHOLD,
+        method="auto",
+    ):
+        assert method in METHODS, f"unknown method: {method}"
+        if method == "kdtree" and not HAVE_SCIPY:
+            raise ImportError("method='kdtree' requires scipy")
+        self.cover_radius = float(cover_radius)
+        self.collision_penalty = float(collision_penalty)
+        self.action_penalty = float(action_penalty)
+        self.collision_threshold = float(collision_threshold)
+        self.method = method
+        self._bufs = {}
+        self._grids = {}
+
+    def __call__(self, agents, landmarks, actions):
+        """Return ``(shaped, components)``; scalars for one world, ``(B,)`` arrays for a batch."""
+        agents = np.asarray(agents, dtype=np.float64)
+        single = agents.ndim == 2
+        if single:
+            agents = agents[None]
+            landmarks = np.asarray(landmarks, dtype=np.float64)[None]
+            actions = np.asarray(actions)[None]
+        covered, collisions, effort = self.components(agents, landmarks, actions)
+        shaped = self.combine(covered, collisions, effort)
+        comps = {"coverage": covered, "collisions": collisions, "effort": effort}
+        if single:
+            return float(shaped[0]), {k: v[0].item() for k, v in comps.items()}
+        return shaped, comps
+
+    def combine(self, covered, collisions, effort):
+        return covered - self.collision_penalty * collisions - self.action_penalty * effort
+
+    def components(self, agents, landmarks, actions):
+        """Batched ``(covered, collisions, effort)`` for ``(B, N, 2)`` inputs."""
+        B, N = agents.shape[:2]
+        effort = self.effort(actions)
+        if N > 0 and self._search(N) == "grid":
+            return self._grid_components(agents, landmarks) + (effort,)
+        if N == 0 or landmarks.shape[1] == 0:
+            covered = np.zeros(B, dtype=np.int64)
+        elif self._search(N) == "kdtree":
+            covered = np.array([self._tree_coverage(agents[b], landmarks[b]) for b in range(B)])
+        else:
+            covered = self.coverage_from_dist(self.landmark_dist(agents, landmarks))
+        if N < 2:
+            collisions = np.zeros(B, dtype=np.int64)
+        elif self._search(N) == "kdtree":
+            collisions = np.array([self._tree_collisions(agents[b]) for b in range(B)])
+        else:
+            collisions = self.collisions_from_dist(self.pair_dist(agents))
+        return covered, collisions, effort
+
+    # ---- dense kernels (also used by VectorSpread, which needs the distances) ----
+
+    def landmark_dist(self, agents, landmarks):
+        """``(B, N, L)`` agent-to-landmark distances into a reused buffer."""
+        B, N = agents.shape[:2]
+        L = landmarks.shape[1]
+        diff = self._buf("al_diff", (B, N, L, 2))
+        dist = self._buf("al_dist", (B, N, L))
+        np.subtract(agents[:, :, None, :], landmarks[:, None, :, :], out=diff)
+        np.einsum("...k,...k->...", diff, diff, out=dist)
+        return np.sqrt(dist, out=dist)
+
+    def pair_dist(self, agents):
+        """``(B, N*(N-1)/2)`` distances for agent pairs ``i < j``."""
+        B, N = agents.shape[:2]
+        key = ("triu", N)
+        if key not in self._bufs:
+            self._bufs[key] = np.triu_indices(N, k=1)
+        ii, jj = self._bufs[key]
+        P = len(ii)
+        diff = self._buf("pair_diff", (B, P, 2))
+        other = self._buf("pair_other", (B, P, 2))
+        dist = self._buf("pair_dist", (B, P))
+        np.take(agents, ii, axis=1, out=diff)
+        np.take(agents, jj, axis=1, out=other)
+        np.subtract(diff, other, out=diff)
+        np.einsum("...k,...k->...", diff, diff, out=dist)
+        return np.sqrt(dist, out=dist)
+
+    def coverage_from_dist(self, lm_dist):
+        # A landmark is covered when its nearest agent is inside the radius
+        return (lm_dist.min(axis=-2) < self.cover_radius).sum(axis=-1)
+
+    def collisions_from_dist(self, pair_dist):
+        return (pair_dist < self.collision_threshold).sum(axis=-1)
+
+    @staticmethod
+    def effort(actions):
+        actions = np.asarray(actions, dtype=np.float64)
+        B = actions.shape[0]
+        return np.einsum("bi,bi->b", actions.reshape(B, -1), actions.reshape(B, -1))
+
+    # ---- KD-tree path ----
+
+    def _search(self, n_agents):
+        if self.method != "auto":
+            return self.method
+        if n_agents < KDTREE_MIN_AGENTS:
+            return "dense"
+        return "kdtree" if HAVE_SCIPY else "grid"
+
+    # Tree queries use a slightly padded, inclusive bound; candidates are then
+    # re-checked with the dense formula so boundary cases match exactly.
+
+    def _tree_coverage(self, agents, landmarks):
+        from scipy.spatial import cKDTree
+        r = self.cover_radius
+        d, idx = cKDTree(agents).query(landmarks, k=1, distance_upper_bound=r * (1 + 1e-9))
+        hit = np.isfinite(d)
+        diff = agents[idx[hit]] - landmarks[hit]
+        return int(np.count_nonzero(np.sqrt(np.sum(diff * diff, axis=-1)) < r))
+
+    def _tree_collisions(self, agents):
+        from scipy.spatial import cKDTree
+        pairs = cKDTree(agents).query_pairs(self.collision_threshold * (1 + 1e-9), output_type="ndarray")
+        if len(pairs) == 0:
+            return 0
+        diff = agents[pairs[:, 0]] - agents[pairs[:, 1]]
+        return int(np.count_nonzero(np.sqrt(np.sum(diff * diff, axis=-1)) < self.collision_threshold))
+
+    # ---- uniform-grid path ----
+
+    def _grid_components(self, agents, landmarks):
+        B = agents.shape[0]
+        covered = np.zeros(B, dtype=np.int64)
+        collisions = np.zeros(B, dtype=np.int64)
+        for b in range(B):
+            index = self._grids.get(b)
+            if index is None:
+                index = self._grids[b] = SpreadIndex(self.cover_radius, self.collision_threshold)
+            index.update(agents[b], landmarks[b])
+            covered[b] = np.count_nonzero(index.covered())
+            collisions[b] = len(index.colliding_pairs()[0])
+        return covered, collisions
+
+    def _buf(self, name, shape):
+        buf = self._bufs.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._bufs[name] = np.empty(shape)
+        return buf
+
+
+# ---- configurable reward pipeline ----
+
+
+class StepGeometry:
+    """Per-step geometry shared by all reward components of one call.
+
+    Every quantity (distance matrices, nearest-agent distance per landmark,
+    coverage/collision counts, effort, speeds) is computed on first use and
+    cached, so components that need the same distances pay for them once.
+    ``elapsed`` is the total time spent computing geometry.
+    """
+
+    def __init__(self, kernels, agents, landmarks, actions, agent_vel=None):
+        self.kernels = kernels
+        self.agents = agents
+        self.landmarks = landmarks
+        self.actions = actions
+        self.agent_vel = agent_vel
+        self.elapsed = 0.0
+        self._cache = {}
+        self._depth = 0
+
+    def _get(self, name, fn):
+        if name not in self._cache:
+            # Only the outermost computation is timed (quantities build on each other)
+            t0 = time.perf_counter()
+            self._depth += 1
+            try:
+                self._cache[name] = fn()
+            finally:
+                self._depth -= 1
+            if not self._depth:
+                self.elapsed += time.perf_counter() - t0
+        return self._cache[name]
+
+    @property
+    def dense(self):
+        return self.kernels._search(self.agents.shape[1]) == "dense"
+
+    def landmark_dist(self):
+        return self._get("landmark_dist", lambda: self.kernels.landmark_dist(self.agents, self.landmarks))
+
+    def pair_dist(self):
+        return self._get("pair_dist", lambda: self.kernels.pair_dist(self.agents))
+
+    def nearest_agent_dist(self):
+        """``(B, L)`` distance from each landmark to its nearest agent."""
+        return self._get("nearest_agent_dist", lambda: self.landmark_dist().min(axis=-2))
+
+    def _counts(self):
+        # Tree / grid searches produce both counts in one pass
+        return self._get("counts", lambda: self.kernels.components(self.agents, self.landmarks, self.actions)[:2])
+
+    def covered(self):
+        B, N = self.agents.shape[:2]
+        if N == 0 or self.landmarks.shape[1] == 0:
+            return np.zeros(B, dtype=np.int64)
+        if not self.dense:
+            return self._counts()[0]
+        return self._get("covered", lambda: (self.nearest_agent_dist() < self.kernels.cover_radius).sum(axis=-1))
+
+    def collisions(self):
+        B, N = self.agents.shape[:2]
+        if N < 2:
+            return np.zeros(B, dtype=np.int64)
+        if not self.dense:
+            return self._counts()[1]
+        return self._get("collisions", lambda: self.kernels.collisions_from_dist(self.pair_dist()))
+
+    def effort(self):
+        return self._get("effort", lambda: self.kernels.effort(self.actions))
+
+    def speed_sq(self):
+        assert self.agent_vel is not None, "this reward component needs agent velocities"
+        return self._get("speed_sq", lambda: np.einsum("bnk,bnk->b", self.agent_vel, self.agent_vel))
+
+
+class RewardComponent:
+    """One weighted term of the team reward; ``value`` returns ``(B,)`` raw values."""
+
+    name = None
+
+    def __init__(self, weight=1.0):
+        self.weight = float(weight)
+
+    def value(self, geom):
+        raise NotImplementedError
+
+
+class Coverage(RewardComponent):
+    name = "coverage"
+
+    def value(self, geom):
+        return geom.covered()
+
+
+class Collisions(RewardComponent):
+    name = "collisions"
+
+    def value(self, geom):
+        return geom.collisions()
+
+
+class Effort(RewardComponent):
+    name = "effort"
+
+    def value(self, geom):
+        return geom.effort()
+
+
+class LandmarkDistance(RewardComponent):
+    """Sum over landmarks of the distance to the nearest agent (dense distances)."""
+
+    name = "landmark_distance"
+
+    def value(self, geom):
+        return geom.nearest_agent_dist().sum(axis=-1)
+
+
+class Speed(RewardComponent):
+    """Sum of squared agent speeds."""
+
+    name = "speed"
+
+    def value(self, geom):
+        return geom.speed_sq()
+
+
+COMPONENTS = {c.name: c for c in (Coverage, Collisions, Effort, LandmarkDistance, Speed)}
+SPLITS = ("even", "full")
+
+
+class RewardPipeline:
+    """Team reward as a weighted sum of pluggable components.
+
+    ``components`` is a list of ``{"name": ..., "weight": ...}`` specs (see
+    ``COMPONENTS``); the coverage radius and collision threshold are the
+    env's. Without specs the pipeline is the classic coverage -
+    collision_penalty * collisions - action_penalty * effort, with identical
+    values to ``ShapedReward``. ``split`` decides what each
+    agent gets: ``even`` (team reward / N) or ``full`` (the whole team reward).
+
+    Calls return ``(shaped, values, timings)``: per-component raw values and
+    per-component compute seconds, plus ``geometry`` for the shared cache.
+    """
+
+    def __init__(self, components=None, cover_radius=0.1, collision_penalty=1.0, action_penalty=0.01,
+                 collision_threshold=COLLISION_THRESHOLD, method="auto", split="even"):
+        if not components:
+            components = [
+                {"name": "coverage", "weight": 1.0},
+                {"name": "collisions", "weight": -collision_penalty},
+                {"name": "effort", "weight": -action_penalty},
+            ]
+        assert split in SPLITS, f"reward split must be one of {SPLITS}"
+        self.split = split
+        self.components = []
+        for spec in components:
+            spec = dict(spec)
+            name = spec.pop("name")
+            assert name in COMPONENTS, f"unknown reward component {name!r} (have {sorted(COMPONENTS)})"
+            self.components.append(COMPONENTS[name](**spec))
+        self.kernels = ShapedReward(
+            cover_radius=cover_radius, collision_threshold=collision_threshold, method=method,
+        )
+        self.last_geometry = None
+
+    def geometry(self, agents, landmarks, actions, agent_vel=None):
+        return StepGeometry(self.kernels, agents, landmarks, actions, agent_vel)
+
+    def __call__(self, agents, landmarks, actions, agent_vel=None, geometry=None):
+        """Scalars / dicts of floats for one world (``(N, 2)``), ``(B,)`` arrays for a batch."""
+        agents = np.asarray(agents, dtype=np.float64)
+        single = agents.ndim == 2
+        if single:
+            agents = agents[None]
+            landmarks = np.asarray(landmarks, dtype=np.float64)[None]
+            actions = np.asarray(actions)[None]
+            agent_vel = None if agent_vel is None else np.asarray(agent_vel)[None]
+        geom = self.last_geometry = geometry or self.geometry(agents, landmarks, actions, agent_vel)
+        shaped = np.zeros(agents.shape[0])
+        values, timings = {}, {}
+        for comp in self.components:
+            t0, g0 = time.perf_counter(), geom.elapsed
+            v = comp.value(geom)
+            shaped = shaped + comp.weight * v
+            values[comp.name] = v
+            # Geometry computed inside the component is booked under "geometry"
+            timings[comp.name] = time.perf_counter() - t0 - (geom.elapsed - g0)
+        timings["geometry"] = geom.elapsed
+        if single:
+            return float(shaped[0]), {k: v[0].item() for k, v in values.items()}, timings
+        return shaped, values, timings
+
+    def metrics(self, geometry=None):
+        """Batched coverage / collisions / effort of the last call (cached geometry, so usually free)."""
+        geom = geometry or self.last_geometry
+        return {"coverage": geom.covered(), "collisions": geom.collisions(), "effort": geom.effort()}
+
+    def per_agent(self, shaped, n_agents):
+        return shaped / max(1, n_agents) if self.split == "even" else shaped
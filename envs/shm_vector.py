@@ -0,0 +1,179 @@
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+import weakref
+import numpy as np
+from envs.obs_encoding import raw_obs_dim
+
+ACT_DIM = 5
+_STEP, _RESET, _CLOSE = 0, 1, 2
+
+
+def _alloc(ctx, shape, dtype):
+    dtype = np.dtype(dtype)
+    raw = ctx.RawArray("b", int(np.prod(shape)) * dtype.itemsize)
+    return raw, shape, dtype.str
+
+
+def _view(spec):
+    raw, shape, dtype = spec
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def _watch_parent(ppid, interval=1.0):
+    # Orphaned workers (parent killed, or exiting without close()) must not
+    # stay parked in barrier.wait() forever
+    while True:
+        time.sleep(interval)
+        if os.getppid() != ppid:
+            os._exit(0)
+
+
+def _worker(lo, hi, env_kwargs, specs, barrier, ppid, timeout):
+    # Spawned children inherit an ignored SIGTERM (e.g. from Ray workers); terminate() must work
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    threading.Thread(target=_watch_parent, args=(ppid,), daemon=True).start()
+    from envs.spread_wrapper import make_env
+    bufs = {k: _view(v) for k, v in specs.items()}
+    obs, act, rew, term, trunc, seeds, cmd = (
+        bufs["obs"], bufs["act"], bufs["rew"], bufs["term"], bufs["trunc"], bufs["seeds"], bufs["cmd"]
+    )
+    try:
+        envs = [make_env(**env_kwargs) for _ in range(lo, hi)]
+        ids = list(envs[0].possible_agents)
+        while True:
+            # Untimed: the parent may sit between steps for a whole learner update.
+            # A timed-out Barrier breaks for every party, so parent death is left to _watch_parent.
+            barrier.wait()  # command + actions published
+            c = int(cmd[0])
+            if c == _CLOSE:
+                break
+            for b in range(lo, hi):
+                env = envs[b - lo]
+                if c == _RESET:
+                    s = int(seeds[b])
+                    o, _ = env.reset(seed=None if s < 0 else s)
+                    rew[b] = 0.0
+                    term[b] = trunc[b] = False
+                else:
+                    o, r, te, tr, _ = env.step({a: act[b, i] for i, a in enumerate(ids)})
+                    rew[b] = [r.get(a, 0.0) for a in ids]
+                    term[b] = all(te.values())
+                    trunc[b] = any(tr.values())
+                for i, a in enumerate(ids):
+                    if a in o:
+                        obs[b, i] = o[a]
+            barrier.wait(timeout)  # results written (the parent is already waiting)
+    except threading.BrokenBarrierError:
+        pass  # the parent gave up (timeout or close(force=True))
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        barrier.abort()  # wakes the parent with BrokenBarrierError
+
+
+def _shutdown(procs, barrier, cmd, timeout):
+    if not barrier.broken:
+        cmd[0] = _CLOSE
+        try:
+            barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            pass
+    for proc in procs:
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join(timeout=2)
+        if proc.is_alive():
+            proc.kill()
+            proc.join(timeout=2)
+
+
+class ShmVectorSpread:
+    """``num_worlds`` PettingZoo spread envs stepped in worker subprocesses.
+
+    Same interface as ``VectorSpread`` (``reset``/``step`` on ``(B, N, ...)``
+    arrays). Actions, observations, rewards and dones live in preallocated
+    shared-memory buffers; a step is "write actions, barrier, workers step
+    their slice of worlds, barrier". Nothing is pickled per step.
+    ``step``/``reset`` return views into the shared buffers that stay valid
+    until the next call; copy them if they must outlive it.
+    """
+
+    def __init__(self, num_worlds=8, n_agents=3, collision_penalty=1.0, action_penalty=0.01, cover_radius=0.1,
+                 spatial_index="auto", num_procs=0, start_method="spawn", timeout=60.0, reward_components=None,
+                 reward_split="even"):
+        self.num_worlds = B = int(num_worlds)
+        self.n_agents = self.n_landmarks = N = int(n_agents)
+        self.obs_dim = raw_obs_dim(N)
+        self.act_dim = ACT_DIM
+        self.timeout = timeout
+        self.num_procs = P = max(1, min(B, int(num_procs or os.cpu_count() or 1)))
+        ctx = mp.get_context(start_method)
+        specs = {
+            "obs": _alloc(ctx, (B, N, self.obs_dim), np.float32),
+            "act": _alloc(ctx, (B, N, ACT_DIM), np.float32),
+            "rew": _alloc(ctx, (B, N), np.float64),
+            "term": _alloc(ctx, (B,), np.bool_),
+            "trunc": _alloc(ctx, (B,), np.bool_),
+            "seeds": _alloc(ctx, (B,), np.int64),
+            "cmd": _alloc(ctx, (1,), np.int64),
+        }
+        self._bufs = {k: _view(v) for k, v in specs.items()}
+        self.obs, self.actions = self._bufs["obs"], self._bufs["act"]
+        self.rewards, self.terminations, self.truncations = self._bufs["rew"], self._bufs["term"], self._bufs["trunc"]
+        self._barrier = ctx.Barrier(P + 1)
+        env_kwargs = dict(n_agents=N, collision_penalty=collision_penalty, action_penalty=action_penalty,
+                          cover_radius=cover_radius, spatial_index=spatial_index,
+                          reward_components=reward_components, reward_split=reward_split)
+        bounds = np.linspace(0, B, P + 1).astype(int)
+        self._procs = [
+            ctx.Process(target=_worker, args=(int(bounds[p]), int(bounds[p + 1]), env_kwargs, specs, self._barrier,
+                                              os.getpid(), timeout), daemon=True)
+            for p in range(P)
+        ]
+        for proc in self._procs:
+            proc.start()
+        self._lock = threading.Lock()
+        self.closed = False
+        # Runs on close(), garbage collection or interpreter exit (before multiprocessing joins its children)
+        self._finalizer = weakref.finalize(self, _shutdown, self._procs, self._barrier, self._bufs["cmd"], timeout)
+
+    def _run(self, command):
+        self._bufs["cmd"][0] = command
+        try:
+            self._barrier.wait(self.timeout)
+            if command != _CLOSE:
+                self._barrier.wait(self.timeout)
+        except threading.BrokenBarrierError:
+            dead = [p.exitcode for p in self._procs if not p.is_alive()]
+            self.close(force=True)
+            raise RuntimeError(f"ShmVectorSpread worker failed (exit codes {dead}); see its traceback above")
+
+    def reset(self, seed=None):
+        seeds = self._bufs["seeds"]
+        if seed is None:
+            seeds[:] = -1
+        elif np.ndim(seed) == 0:
+            seeds[:] = int(seed) + np.arange(self.num_worlds)
+        else:
+            assert len(seed) == self.num_worlds, "need one seed per world"
+            seeds[:] = seed
+        self._run(_RESET)
+        return self.obs
+
+    def step(self, actions):
+        self.actions[:] = np.asarray(actions, dtype=np.float32).reshape(self.actions.shape)
+        self._run(_STEP)
+        return self.obs, self.rewards, self.terminations, self.truncations, {}
+
+    def close(self, force=False):
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+        if force:
+            self._barrier.abort()
+        self._finalizer()
@@ -0,0 +1,110 @@
+import numpy as np
+
+# Cells are padded slightly so float rounding in ``floor(p / cell)`` can never
+# push two points closer than the radius more than one cell apart.
+_CELL_PAD = 1 + 1e-6
+# 3x3 neighbourhood offsets (dx, dy)
+_OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+
+def _cell_keys(cells):
+    # Injective int64 key for (cx, cy); positions stay far below 2**30 cells
+    return cells[..., 0] * (1 << 32) + cells[..., 1]
+
+
+class CellList:
+    """Uniform-grid cell list over 2-D points for fixed-radius queries.
+
+    Points are bucketed into square cells of side ``radius`` and kept sorted
+    by cell key, so every query only inspects the 3x3 block of cells around a
+    point. ``update`` is incremental: the previous sort order is reused as the
+    starting permutation, which a stable sort finishes in ~linear time when
+    only a few points changed cells, and nothing is re-sorted if none did.
+    Candidate pairs are confirmed with the same strict ``dist < radius``
+    test as the dense path, so results match it exactly.
+    """
+
+    def __init__(self, radius):
+        self.radius = float(radius)
+        self.cell_size = self.radius * _CELL_PAD
+        self.points = None
+        self.keys = None
+        self.order = None
+        self.sorted_keys = None
+
+    def update(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        keys = _cell_keys(np.floor(points / self.cell_size).astype(np.int64))
+        if self.order is None or len(self.order) != len(points):
+            self.order = np.argsort(keys, kind="stable")
+        elif not np.array_equal(keys, self.keys):
+            nearly_sorted = self.order
+            self.order = nearly_sorted[np.argsort(keys[nearly_sorted], kind="stable")]
+        self.points = points
+        self.keys = keys
+        self.sorted_keys = keys[self.order]
+        return self
+
+    def candidates(self, queries):
+        """All (query index, point index) pairs that share a 3x3 cell block."""
+        q_cells = np.floor(np.asarray(queries) / self.cell_size).astype(np.int64)
+        nb_keys = _cell_keys(q_cells[:, None, :] + _OFFSETS[None, :, :])
+        lo = np.searchsorted(self.sorted_keys, nb_keys, side="left").ravel()
+        hi = np.searchsorted(self.sorted_keys, nb_keys, side="right").ravel()
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        q_idx = np.repeat(np.repeat(np.arange(len(q_cells)), len(_OFFSETS)), counts)
+        # Expand each [lo, hi) range into consecutive sorted positions
+        starts = np.cumsum(counts) - counts
+        sorted_pos = np.arange(total) - np.repeat(starts - lo, counts)
+        return q_idx, self.order[sorted_pos]
+
+    def query_pairs(self, queries, radius=None):
+        """(query index, point index) pairs with ``dist < radius``."""
+        radius = self.radius if radius is None else float(radius)
+        assert radius <= self.radius, "query radius exceeds the cell size"
+        queries = np.asarray(queries, dtype=np.float64)
+        qi, pj = self.candidates(queries)
+        diff = queries[qi] - self.points[pj]
+        hit = np.sqrt(np.einsum("ij,ij->i", diff, diff)) < radius
+        return qi[hit], pj[hit]
+
+    def self_pairs(self, radius=None):
+        """Pairs ``i < j`` of the indexed points with ``dist < radius``."""
+        qi, pj = self.query_pairs(self.points, radius)
+        keep = qi < pj
+        return qi[keep], pj[keep]
+
+
+class SpreadIndex:
+    """Coverage and collision queries for one world backed by two cell lists.
+
+    Agents are indexed with cells of side ``collision_threshold``; landmarks
+    (static within an episode) with cells of side ``cover_radius`` and are
+    only re-indexed when their positions change.
+    """
+
+    def __init__(self, cover_radius, collision_threshold):
+        self.cover_radius = float(cover_radius)
+        self.collision_threshold = float(collision_threshold)
+        self.agents = CellList(self.collision_threshold)
+        self.landmarks = CellList(self.cover_radius)
+
+    def update(self, agents, landmarks):
+        self.agents.update(agents)
+        if self.landmarks.points is None or not np.array_equal(self.landmarks.points, landmarks):
+            self.landmarks.update(np.array(landmarks, dtype=np.float64))
+        return self
+
+    def covered(self):
+        """Boolean mask of landmarks with at least one agent inside ``cover_radius``."""
+        _, lm = self.landmarks.query_pairs(self.agents.points)
+        mask = np.zeros(len(self.landmarks.points), dtype=bool)
+        mask[lm] = True
+        return mask
+
+    def colliding_pairs(self):
+        return self.agents.self_pairs()
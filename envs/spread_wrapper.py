@@ -1,6 +1,8 @@
+import time
 import numpy as np
 from pettingzoo.mpe import simple_spread_v3
-import supersuit as ss
+from envs.rewards import RewardPipeline
+from envs.timing import PHASES
 
 def make_env(
     n_agents=3,
@@ -8,6 +10,9 @@ def make_env(
     action_penalty=0.01,
     cover_radius=0.1,
     render_mode=None,
+    spatial_index="auto",
+    reward_components=None,
+    reward_split="even",
 ):
     # Base parallel env (works with RLlib's PettingZooEnv)
     env = simple_spread_v3.parallel_env(
@@ -19,44 +24,53 @@ def make_env(
 
     # Keep original step
     original_step = env.step
+    # Configurable team reward (env.reward_components); default = coverage - collisions - effort
+    shaping = RewardPipeline(
+        components=reward_components,
+        cover_radius=cover_radius,
+        collision_penalty=collision_penalty,
+        action_penalty=action_penalty,
+        method=spatial_index,
+        split=reward_split,
+    )
+    world = env.aec_env.world
+    # Preallocated position buffers, refilled in place every step
+    agent_buf = np.zeros((len(world.agents), world.dim_p))
+    landmark_buf = np.zeros((len(world.landmarks), world.dim_p))
+    vel_buf = np.zeros((len(world.agents), world.dim_p))
 
     def _step(actions):
+        t0 = time.perf_counter()
         obs, rewards, terminations, truncations, infos = original_step(actions)
+        t1 = time.perf_counter()
 
         # Positions from underlying AEC env used by parallel wrapper
-        world = env.aec_env.world
-        landmarks = np.array([l.state.p_pos for l in world.landmarks])
-        agents = np.array([a.state.p_pos for a in world.agents])
-
-        # Coverage
-        if len(agents) > 0 and len(landmarks) > 0:
-            dmat = np.linalg.norm(agents[:, None, :] - landmarks[None, :, :], axis=-1)
-            covered = (dmat < cover_radius).any(axis=0).sum()
-        else:
-            covered = 0
-
-        # Collisions (simple radius threshold)
-        collisions = 0
-        for i in range(len(agents)):
-            for j in range(i + 1, len(agents)):
-                if np.linalg.norm(agents[i] - agents[j]) < 0.05:
-                    collisions += 1
-
-        # Effort from action magnitudes
-        effort = 0.0
-        for a in actions.values():
-            arr = np.asarray(a)
-            effort += float(np.sum(arr * arr))
-
-        shaped = float(covered) - collision_penalty * float(collisions) - action_penalty * effort
-        per_agent = shaped / max(1, len(rewards) if rewards else 1)
+        for k, a in enumerate(world.agents):
+            agent_buf[k] = a.state.p_pos
+            vel_buf[k] = a.state.p_vel
+        for k, l in enumerate(world.landmarks):
+            landmark_buf[k] = l.state.p_pos
+        acts = np.asarray(list(actions.values())) if actions else np.zeros((0,))
+
+        shaped, values, timings = shaping(agent_buf, landmark_buf, acts, agent_vel=vel_buf)
+        # Evaluation metrics stay coverage/collisions/effort whatever the reward terms are
+        env.last_reward_components = {k: v[0].item() for k, v in shaping.metrics().items()}
+        per_agent = shaping.per_agent(shaped, len(rewards) if rewards else 1)
 
         for agent_id in rewards.keys():
             rewards[agent_id] = float(rewards.get(agent_id, 0.0)) + per_agent
+            info = infos.setdefault(agent_id, {})
+            info["reward_components"] = values
+            info["reward_timings"] = timings
+        PHASES.add("env_step", t1 - t0)
+        PHASES.add("reward_shaping", time.perf_counter() - t1)
+        for name, seconds in timings.items():
+            PHASES.add(f"reward_{name}", seconds)
 
         return obs, rewards, terminations, truncations, infos
 
     env.step = _step
+    env.last_reward_components = {"coverage": 0, "collisions": 0, "effort": 0.0}
     return env
 
 
@@ -0,0 +1,40 @@
+import time
+from collections import defaultdict
+
+
+class PhaseTimer:
+    """Process-local wall-time accumulators keyed by phase name.
+
+    The envs add ``env_step``/``reward_shaping``/``env_reset`` time, and the
+    gap between leaving one env step and entering the next is booked as
+    ``policy_inference`` (RLlib's module forward pass plus connectors).
+    ``train.instrumentation`` drains the totals once per sample call.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self._last_exit = None
+
+    def add(self, name, seconds):
+        self.totals[name] += seconds
+
+    def env_enter(self):
+        now = time.perf_counter()
+        if self._last_exit is not None:
+            self.totals["policy_inference"] += now - self._last_exit
+        return now
+
+    def env_exit(self):
+        self._last_exit = time.perf_counter()
+
+    def idle(self):
+        # Forget the last exit so time spent outside sampling is not counted
+        self._last_exit = None
+
+    def drain(self):
+        out = dict(self.totals)
+        self.totals.clear()
+        return out
+
+
+PHASES = PhaseTimer()
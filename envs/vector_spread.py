@@ -0,0 +1,184 @@
+import time
+import numpy as np
+from envs.rewards import RewardPipeline
+from envs.timing import PHASES
+
+# Constants mirrored from pettingzoo.mpe simple_spread_v3 (Scenario.make_world,
+# core.World and SimpleEnv._set_action) so both engines share the same physics.
+DIM_P = 2
+DIM_C = 2
+AGENT_SIZE = 0.15
+DT = 0.1
+DAMPING = 0.25
+CONTACT_FORCE = 1e2
+CONTACT_MARGIN = 1e-3
+SENSITIVITY = 5.0
+ACTION_DIM = DIM_P * 2 + 1
+
+
+class VectorSpread:
+    """B independent Simple Spread worlds stepped in one vectorized call.
+
+    State lives in contiguous arrays: ``agent_pos``/``agent_vel`` are
+    ``(B, N, 2)`` and ``landmark_pos`` is ``(B, N, 2)``. ``step`` takes
+    continuous actions of shape ``(B, N, 5)`` and returns observations
+    ``(B, N, obs_dim)``, rewards ``(B, N)`` (PettingZoo reward plus the shaped
+    team reward from ``envs.spread_wrapper.make_env``), and per-world
+    termination/truncation flags ``(B,)``. All worlds share one cycle counter,
+    so they truncate together after ``max_cycles`` steps.
+    """
+
+    def __init__(
+        self,
+        num_worlds=1,
+        n_agents=3,
+        collision_penalty=1.0,
+        action_penalty=0.01,
+        cover_radius=0.1,
+        local_ratio=0.5,
+        max_cycles=25,
+        seed=None,
+        reward_components=None,
+        reward_split="even",
+        spatial_index="auto",
+    ):
+        self.num_worlds = int(num_worlds)
+        self.n_agents = int(n_agents)
+        self.n_landmarks = int(n_agents)
+        self.collision_penalty = float(collision_penalty)
+        self.action_penalty = float(action_penalty)
+        self.cover_radius = float(cover_radius)
+        self.local_ratio = float(local_ratio)
+        self.max_cycles = int(max_cycles)
+
+        B, N, L = self.num_worlds, self.n_agents, self.n_landmarks
+        self.shaping = RewardPipeline(
+            components=reward_components,
+            cover_radius=cover_radius,
+            collision_penalty=collision_penalty,
+            action_penalty=action_penalty,
+            method=spatial_index,
+            split=reward_split,
+        )
+
+        self.obs_dim = 2 * DIM_P + L * DIM_P + (N - 1) * DIM_P + (N - 1) * DIM_C
+        self.act_dim = ACTION_DIM
+
+        self.agent_pos = np.zeros((B, N, DIM_P))
+        self.agent_vel = np.zeros((B, N, DIM_P))
+        self.landmark_pos = np.zeros((B, L, DIM_P))
+        self.steps = 0
+
+        # Index of "other" agents for each agent, in PettingZoo observation order
+        self._others = np.array(
+            [[j for j in range(N) if j != i] for i in range(N)], dtype=np.int64
+        ).reshape(N, max(N - 1, 0))
+        self._obs = np.zeros((B, N, self.obs_dim), dtype=np.float32)
+        self._rngs = None
+        self.seed(seed)
+
+    def seed(self, seed=None):
+        # One generator per world; world b seeded with ``seed + b`` draws the
+        # same reset stream as a PettingZoo env reset with that seed.
+        if seed is None:
+            seeds = [None] * self.num_worlds
+        elif np.ndim(seed) == 0:
+            seeds = [int(seed) + b for b in range(self.num_worlds)]
+        else:
+            seeds = [int(s) for s in seed]
+            assert len(seeds) == self.num_worlds, "need one seed per world"
+        self._rngs = [np.random.default_rng(s) for s in seeds]
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed(seed)
+        N, L = self.n_agents, self.n_landmarks
+        for b, rng in enumerate(self._rngs):
+            # Same draw order as Scenario.reset_world: agents first, then landmarks
+            self.agent_pos[b] = rng.uniform(-1, +1, (N, DIM_P))
+            self.landmark_pos[b] = rng.uniform(-1, +1, (L, DIM_P))
+        self.agent_vel[:] = 0.0
+        self.steps = 0
+        return self.observations()
+
+    def set_state(self, agent_pos, agent_vel, landmark_pos, steps=0):
+        self.agent_pos[:] = agent_pos
+        self.agent_vel[:] = agent_vel
+        self.landmark_pos[:] = landmark_pos
+        self.steps = int(steps)
+        return self.observations()
+
+    def observations(self):
+        # [self_vel, self_pos, landmark_rel_positions, other_agent_rel_positions, comm]
+        B, N, L = self.num_worlds, self.n_agents, self.n_landmarks
+        obs = self._obs
+        pos = self.agent_pos
+        obs[..., 0:2] = self.agent_vel
+        obs[..., 2:4] = pos
+        lm_end = 4 + L * DIM_P
+        obs[..., 4:lm_end] = (self.landmark_pos[:, None, :, :] - pos[:, :, None, :]).reshape(B, N, L * DIM_P)
+        if N > 1:
+            other_end = lm_end + (N - 1) * DIM_P
+            obs[..., lm_end:other_end] = (pos[:, self._others, :] - pos[:, :, None, :]).reshape(B, N, (N - 1) * DIM_P)
+            # Agents are silent, so communication state is always zero
+            obs[..., other_end:] = 0.0
+        return obs.copy()
+
+    def _collision_forces(self):
+        # Soft contact between every agent pair (landmarks do not collide)
+        pos = self.agent_pos
+        delta = pos[:, :, None, :] - pos[:, None, :, :]
+        dist = np.sqrt(np.sum(np.square(delta), axis=-1))
+        off_diag = ~np.eye(self.n_agents, dtype=bool)
+        safe = np.where(off_diag, dist, 1.0)
+        k = CONTACT_MARGIN
+        penetration = np.logaddexp(0, -(safe - 2 * AGENT_SIZE) / k) * k
+        force = CONTACT_FORCE * delta / safe[..., None] * penetration[..., None]
+        force *= off_diag[None, :, :, None]
+        return force.sum(axis=2), dist
+
+    def step(self, actions):
+        t0 = time.perf_counter()
+        actions = np.asarray(actions, dtype=np.float64).reshape(self.num_worlds, self.n_agents, ACTION_DIM)
+        # ClipOutOfBoundsWrapper clips to the Box(0, 1) action space before physics
+        clipped = np.clip(actions, 0.0, 1.0)
+        u = np.stack(
+            [clipped[..., 2] - clipped[..., 1], clipped[..., 4] - clipped[..., 3]], axis=-1
+        ) * SENSITIVITY
+
+        contact, _ = self._collision_forces()
+        p_force = u + contact
+        self.agent_pos += self.agent_vel * DT
+        self.agent_vel *= 1 - DAMPING
+        self.agent_vel += p_force * DT
+        self.steps += 1
+        obs = self.observations()
+        t1 = time.perf_counter()
+
+        rewards, infos = self._rewards(actions)
+        PHASES.add("env_step", t1 - t0)
+        PHASES.add("reward_shaping", time.perf_counter() - t1)
+        for name, seconds in infos["reward_timings"].items():
+            PHASES.add(f"reward_{name}", seconds)
+        terminations = np.zeros(self.num_worlds, dtype=bool)
+        truncations = np.full(self.num_worlds, self.steps >= self.max_cycles)
+        return obs, rewards, terminations, truncations, infos
+
+    def _rewards(self, actions):
+        N = self.n_agents
+        pos = self.agent_pos
+        agent_dist = np.sqrt(np.sum(np.square(pos[:, :, None, :] - pos[:, None, :, :]), axis=-1))
+        # One geometry cache for the scenario reward and every shaped-reward component
+        geom = self.shaping.geometry(pos, self.landmark_pos, actions, self.agent_vel)
+
+        # PettingZoo scenario reward: global min-distance term and local collisions
+        global_rew = -geom.nearest_agent_dist().sum(axis=-1)
+        touching = (agent_dist < 2 * AGENT_SIZE) & ~np.eye(N, dtype=bool)
+        local_rew = -touching.sum(axis=-1).astype(np.float64)
+        base = global_rew[:, None] * (1 - self.local_ratio) + local_rew * self.local_ratio
+
+        # Shaped team reward (same pipeline as make_env._step), reusing the distances
+        shaped, values, timings = self.shaping(pos, self.landmark_pos, actions, geometry=geom)
+        rewards = base + self.shaping.per_agent(shaped, N)[:, None]
+        infos = dict(self.shaping.metrics(geom), shaped=shaped, reward_components=values, reward_timings=timings)
+        return rewards, infos
@@ -0,0 +1,265 @@
+import argparse, json, math, os, sys, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import yaml
+from envs.vector_spread import VectorSpread
+from envs.obs_encoding import pad_observations
+from envs.fast_reset import InitialStatePool
+from eval.rollout_log import RolloutRecorder
+
+METRICS = ("return", "coverage_rate", "final_coverage_rate", "collisions", "effort")
+
+
+def find_module_dir(ckpt, policy_id="shared_policy"):
+    # Algorithm checkpoints keep the RLModule under learner_group/learner/rl_module/<policy>
+    ckpt = os.path.abspath(ckpt)
+    for cand in (
+        os.path.join(ckpt, "learner_group", "learner", "rl_module", policy_id),
+        os.path.join(ckpt, "rl_module", policy_id),
+        ckpt,
+    ):
+        if os.path.exists(os.path.join(cand, "module_state.pt")) or os.path.exists(os.path.join(cand, "module_state.pkl")):
+            return cand
+    return None
+
+
+class RandomPolicy:
+    def __init__(self, act_dim=5, seed=0):
+        self.act_dim = act_dim
+        self.rng = np.random.default_rng(seed)
+
+    def reseed(self, seed):
+        self.rng = np.random.default_rng(seed)
+
+    def act(self, obs_batch):
+        return self.rng.uniform(0.0, 1.0, (len(obs_batch), self.act_dim)).astype(np.float32)
+
+
+class RLModulePolicy:
+    """Deterministic (explore=False) batched actions from an RLlib RLModule."""
+
+    def __init__(self, module_dir=None, module=None):
+        import torch
+        self.torch = torch
+        if module is None:
+            # A live module (e.g. algo.get_module(...)) can be passed instead
+            from ray.rllib.core.rl_module.rl_module import RLModule
+            module = RLModule.from_checkpoint(module_dir)
+        self.module = module
+        self.module.eval()
+
+    def act(self, obs_batch):
+        torch = self.torch
+        with torch.no_grad():
+            out = self.module.forward_inference({"obs": torch.as_tensor(obs_batch, dtype=torch.float32)})
+        dist_cls = self.module.get_inference_action_dist_cls()
+        dist = dist_cls.from_logits(out["action_dist_inputs"]).to_deterministic()
+        act = dist.sample().cpu().numpy()
+        # RLlib's default normalize_actions: unsquash [-1, 1] -> Box(0, 1), then clip
+        return np.clip((act + 1.0) / 2.0, 0.0, 1.0)
+
+
+class AlgorithmPolicy:
+    """Fallback for checkpoints without a standalone RLModule (old API stack)."""
+
+    def __init__(self, ckpt, policy_id="shared_policy"):
+        from ray.rllib.algorithms.algorithm import Algorithm
+        self.policy = Algorithm.from_checkpoint(ckpt).get_policy(policy_id)
+
+    def act(self, obs_batch):
+        actions, _, _ = self.policy.compute_actions(obs_batch, explore=False)
+        return np.clip(np.asarray(actions), 0.0, 1.0)
+
+
+def load_policy(ckpt, seed=0):
+    """Batched ``act(obs_batch) -> actions`` for a checkpoint dir, an exported
+    ``.npz``/TorchScript file, or a random policy if ``ckpt`` is empty."""
+    if not ckpt:
+        return RandomPolicy(seed=seed)
+    if os.path.isfile(ckpt):
+        # Exported policy (eval/export_policy.py): no Ray needed
+        from eval.inference import load_exported
+        return load_exported(ckpt)
+    module_dir = find_module_dir(ckpt)
+    if module_dir is not None:
+        return RLModulePolicy(module_dir)
+    return AlgorithmPolicy(os.path.abspath(ckpt))
+
+
+def run_episodes(policy, seeds, env_cfg, max_cycles=25, states=None, recorder=None):
+    """Run ``len(seeds)`` episodes as one batch of worlds; one forward pass per step.
+
+    ``states`` (``(B, 2N, 2)`` from an ``InitialStatePool``) replaces the seeded
+    reset. A ``RolloutRecorder`` logs every step under episode id = seed.
+    """
+    env = VectorSpread(
+        num_worlds=len(seeds),
+        n_agents=env_cfg.get("n_agents", 3),
+        collision_penalty=env_cfg.get("collision_penalty", 1.0),
+        action_penalty=env_cfg.get("action_penalty", 0.01),
+        cover_radius=env_cfg.get("cover_radius", 0.1),
+        max_cycles=max_cycles,
+        reward_components=env_cfg.get("reward_components"),
+        reward_split=env_cfg.get("reward_split", "even"),
+        spatial_index=env_cfg.get("spatial_index", "auto"),
+    )
+    B, N, L = env.num_worlds, env.n_agents, env.n_landmarks
+    if states is not None:
+        obs = env.set_state(states[:, :N], 0.0, states[:, N:])
+    else:
+        obs = env.reset(seed=list(seeds))
+    if recorder is not None:
+        recorder.log_reset(seeds, env.agent_pos, env.landmark_pos)
+    max_agents = env_cfg.get("max_agents", 0) or 0
+    encode = (lambda o: pad_observations(o, N, max_agents)) if max_agents else (lambda o: o)
+    ret = np.zeros(B)
+    coverage = np.zeros(B)
+    collisions = np.zeros(B)
+    effort = np.zeros(B)
+    steps = 0
+    while True:
+        actions = policy.act(encode(obs).reshape(B * N, -1)).reshape(B, N, -1)
+        obs, rew, term, trunc, info = env.step(actions)
+        steps += 1
+        if recorder is not None:
+            recorder.log(seeds, steps, env.agent_pos, env.landmark_pos, actions, rew,
+                         info["coverage"], info["collisions"], info["effort"])
+        ret += rew.sum(axis=1)
+        coverage += info["coverage"]
+        collisions += info["collisions"]
+        effort += info["effort"]
+        if term.all() or trunc.all():
+            break
+    return {
+        "seed": np.asarray(seeds),
+        "return": ret,
+        "coverage_rate": coverage / (steps * max(1, L)),
+        "final_coverage_rate": info["coverage"] / max(1, L),
+        "collisions": collisions,
+        "effort": effort,
+    }
+
+
+_WORKER = {}
+
+
+def _init_worker(ckpt, seed):
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except Exception:
+        pass
+    _WORKER["policy"] = load_policy(ckpt, seed=seed)
+
+
+def _eval_chunk(args):
+    seeds, env_cfg, max_cycles, states, record = args
+    recorder = None
+    if record is not None:
+        record_dir, prefix, meta = record
+        recorder = RolloutRecorder(record_dir, env_cfg.get("n_agents", 3), prefix=prefix, meta=meta)
+    policy = _WORKER["policy"]
+    if isinstance(policy, RandomPolicy):
+        # Per-chunk action stream: results do not depend on --workers or on which worker runs the chunk
+        policy.reseed(int(seeds[0]))
+    try:
+        return run_episodes(policy, seeds, env_cfg, max_cycles=max_cycles, states=states, recorder=recorder)
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+def summarize(per_episode, z=1.96):
+    """Mean and normal-approximation 95% confidence half-width per metric."""
+    out = {"episodes": int(len(per_episode["return"]))}
+    for k in METRICS:
+        v = np.asarray(per_episode[k], dtype=np.float64)
+        half = z * v.std(ddof=1) / math.sqrt(len(v)) if len(v) > 1 else float("nan")
+        out[k] = {"mean": float(v.mean()), "ci95": float(half)}
+    return out
+
+
+def evaluate(ckpt="", episodes=1000, seed=0, workers=None, envs_per_worker=64, env_cfg=None, max_cycles=25,
+             reset_pool=None, record_dir=None):
+    """Evaluate a checkpoint over episodes seeded ``seed .. seed+episodes-1``.
+
+    With ``reset_pool`` (an ``InitialStatePool`` or its .npz path) the first
+    ``episodes`` pool states are replayed instead and ``seed`` is ignored.
+    ``record_dir`` streams every step to a rollout log (``eval/rollout_log.py``).
+    """
+    env_cfg = env_cfg or {}
+    workers = workers or os.cpu_count() or 1
+    if reset_pool is not None:
+        pool = InitialStatePool.load(reset_pool) if isinstance(reset_pool, str) else reset_pool
+        assert episodes <= len(pool), f"reset pool has {len(pool)} states, {episodes} episodes requested"
+        assert pool.n_agents == env_cfg.get("n_agents", 3), "reset pool was generated for a different n_agents"
+        seeds, states = pool.seeds[:episodes], pool.states[:episodes]
+    else:
+        seeds, states = np.arange(seed, seed + episodes), None
+    meta = {"source": "evaluate", "ckpt": ckpt or "random", "max_cycles": max_cycles}
+    chunks = [
+        (seeds[i:i + envs_per_worker], env_cfg, max_cycles, None if states is None else states[i:i + envs_per_worker],
+         (record_dir, f"chunk{i // envs_per_worker:05d}", meta) if record_dir else None)
+        for i in range(0, episodes, envs_per_worker)
+    ]
+    t0 = time.time()
+    if workers <= 1:
+        _init_worker(ckpt, seed)
+        parts = [_eval_chunk(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker, initargs=(ckpt, seed)) as pool:
+            parts = list(pool.map(_eval_chunk, chunks))
+    per_episode = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    summary = summarize(per_episode)
+    summary["eval_s"] = time.time() - t0
+    summary["ckpt"] = ckpt or "random"
+    return summary, per_episode
+
+
+def _load_env_cfg(path="config.yaml"):
+    if os.path.exists(path):
+        with open(path) as f:
+            return dict((yaml.safe_load(f) or {}).get("env", {}))
+    return {}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Headless batched policy evaluation")
+    ap.add_argument("--ckpt", type=str, default="", help="checkpoint dir or exported policy file (empty = random policy)")
+    ap.add_argument("--episodes", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=0, help="first episode seed")
+    ap.add_argument("--workers", type=int, default=0, help="processes (0 = all cores)")
+    ap.add_argument("--envs_per_worker", type=int, default=64, help="episodes batched per forward pass")
+    ap.add_argument("--n_agents", type=int, default=0, help="override config.yaml env.n_agents")
+    ap.add_argument("--max_cycles", type=int, default=25)
+    ap.add_argument("--record_dir", type=str, default="", help="also log every step to this rollout log directory")
+    ap.add_argument("--reset_pool", type=str, default="", help="replay initial states from a pool .npz (python -m envs.fast_reset)")
+    ap.add_argument("--out", type=str, default="", help="optional JSON summary path")
+    ap.add_argument("--min_coverage_rate", type=float, default=None, help="exit 1 if mean coverage is below")
+    ap.add_argument("--max_collisions", type=float, default=None, help="exit 1 if mean collisions exceed")
+    args = ap.parse_args()
+
+    env_cfg = _load_env_cfg()
+    if args.n_agents:
+        env_cfg["n_agents"] = args.n_agents
+    summary, _ = evaluate(
+        ckpt=args.ckpt, episodes=args.episodes, seed=args.seed, workers=args.workers or None,
+        envs_per_worker=args.envs_per_worker, env_cfg=env_cfg, max_cycles=args.max_cycles,
+        reset_pool=args.reset_pool or None, record_dir=args.record_dir or None,
+    )
+    print(f"Evaluated {summary['ckpt']} over {summary['episodes']} episodes in {summary['eval_s']:.1f}s")
+    for k in METRICS:
+        print(f"  {k:<20} {summary[k]['mean']:10.4f} ± {summary[k]['ci95']:.4f}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(summary, f, indent=2)
+        print("Wrote", args.out)
+
+    failed = []
+    if args.min_coverage_rate is not None and summary["coverage_rate"]["mean"] < args.min_coverage_rate:
+        failed.append(f"coverage_rate {summary['coverage_rate']['mean']:.4f} < {args.min_coverage_rate}")
+    if args.max_collisions is not None and summary["collisions"]["mean"] > args.max_collisions:
+        failed.append(f"collisions {summary['collisions']['mean']:.4f} > {args.max_collisions}")
+    if failed:
+        print("Evaluation gate failed: " + "; ".join(failed))
+        sys.exit(1)
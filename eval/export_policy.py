@@ -0,0 +1,127 @@
+import argparse, json, os, pickle, re
+import numpy as np
+from eval.evaluate import find_module_dir
+
+# RLlib DefaultModelConfig defaults, used when the checkpoint's ctor args can't be read
+_DEFAULT_MODEL = {"fcnet_activation": "tanh", "head_fcnet_activation": "relu"}
+
+
+def _to_numpy(v):
+    return v.detach().cpu().numpy() if hasattr(v, "detach") else np.asarray(v)
+
+
+def _load_state(module_dir):
+    for name in ("module_state.pt", "module_state.pkl"):
+        path = os.path.join(module_dir, name)
+        if not os.path.exists(path):
+            continue
+        try:  # RLlib pickles a dict of NumPy arrays under the .pt name
+            with open(path, "rb") as f:
+                state = pickle.load(f)
+        except Exception:
+            import torch
+            state = torch.load(path, map_location="cpu")
+        return {k: _to_numpy(v) for k, v in state.items()}
+    raise FileNotFoundError(f"No module_state.* under {module_dir}")
+
+
+def _load_model_config(module_dir):
+    # class_and_ctor_args.pkl holds the RLModule spec; unpickling it needs Ray
+    cfg = dict(_DEFAULT_MODEL)
+    try:
+        with open(os.path.join(module_dir, "class_and_ctor_args.pkl"), "rb") as f:
+            ctor = pickle.load(f)
+        kwargs = ctor.get("ctor_args_and_kwargs", ((), {}))[1]
+        model_config = kwargs.get("model_config") or {}
+        if not isinstance(model_config, dict):
+            model_config = vars(model_config)
+        cfg.update({k: v for k, v in model_config.items() if k in cfg and v is not None})
+    except Exception as e:
+        print(f"Could not read model config ({e}); assuming RLlib defaults {cfg}.")
+    return cfg
+
+
+def _linear_layers(state, prefix):
+    # Sequential "…mlp.<idx>.weight" entries in layer order
+    pat = re.compile(re.escape(prefix) + r"(\d+)\.weight$")
+    idx = sorted(int(m.group(1)) for k in state for m in [pat.match(k)] if m)
+    return [(state[f"{prefix}{i}.weight"], state[f"{prefix}{i}.bias"]) for i in idx]
+
+
+def extract_actor(state, model_cfg):
+    """Weights/biases/activations of the deterministic actor path (encoder -> pi)."""
+    encoder = _linear_layers(state, "encoder.actor_encoder.net.mlp.") or _linear_layers(state, "encoder.encoder.net.mlp.")
+    head = _linear_layers(state, "pi.net.mlp.")
+    if not encoder and not head:
+        raise ValueError(f"Unrecognized RLModule state keys: {sorted(state)[:8]} ...")
+    layers = encoder + head
+    acts = [model_cfg["fcnet_activation"]] * len(encoder)
+    acts += [model_cfg["head_fcnet_activation"]] * (len(head) - 1) + ["linear"]
+    return [w for w, _ in layers], [b for _, b in layers], acts
+
+
+def snapshot_actor(state, model_cfg=None, **meta):
+    """``(weights, biases, activations, meta)`` of the actor in an RLModule state dict.
+
+    Plain NumPy, so it pickles cheaply and ``eval.inference.NumpyPolicy`` can
+    run it without Ray or torch.
+    """
+    state = {k: _to_numpy(v) for k, v in state.items()}
+    cfg = dict(_DEFAULT_MODEL)
+    cfg.update({k: v for k, v in (model_cfg or {}).items() if k in cfg and v is not None})
+    weights, biases, acts = extract_actor(state, cfg)
+    meta.update({
+        "num_layers": len(weights),
+        "activations": acts,
+        "obs_dim": int(weights[0].shape[1]),
+        "act_dim": int(weights[-1].shape[0] // 2),  # DiagGaussian: mean and log_std
+        "action_low": 0.0,
+        "action_high": 1.0,
+        "normalize_actions": True,
+    })
+    return weights, biases, acts, meta
+
+
+def load_actor(ckpt, policy_id="shared_policy"):
+    """``snapshot_actor`` of a checkpoint's RLModule (reads the files directly, no RLModule is built)."""
+    module_dir = find_module_dir(ckpt, policy_id)
+    if module_dir is None:
+        raise FileNotFoundError(f"No RLModule for {policy_id!r} under {ckpt}")
+    return snapshot_actor(
+        _load_state(module_dir), _load_model_config(module_dir), source=os.path.abspath(ckpt), policy_id=policy_id,
+    )
+
+
+def export(ckpt, out, fmt="npz", policy_id="shared_policy"):
+    weights, biases, acts, meta = load_actor(ckpt, policy_id)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    if fmt == "npz":
+        arrays = {f"W{i}": w.astype(np.float32) for i, w in enumerate(weights)}
+        arrays.update({f"b{i}": b.astype(np.float32) for i, b in enumerate(biases)})
+        np.savez(out, meta=np.array(json.dumps(meta)), **arrays)
+    else:
+        import torch
+        mods = []
+        for w, b, a in zip(weights, biases, acts):
+            lin = torch.nn.Linear(w.shape[1], w.shape[0])
+            with torch.no_grad():
+                lin.weight.copy_(torch.as_tensor(w))
+                lin.bias.copy_(torch.as_tensor(b))
+            mods.append(lin)
+            if a != "linear":
+                mods.append({"tanh": torch.nn.Tanh, "relu": torch.nn.ReLU, "swish": torch.nn.SiLU, "silu": torch.nn.SiLU}[a]())
+        scripted = torch.jit.script(torch.nn.Sequential(*mods).eval())
+        torch.jit.save(scripted, out, _extra_files={"meta.json": json.dumps(meta)})
+    return meta
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Export shared_policy weights for Ray-free inference")
+    ap.add_argument("--ckpt", type=str, required=True)
+    ap.add_argument("--out", type=str, default="policy.npz")
+    ap.add_argument("--format", choices=["npz", "torchscript"], default="", help="default: from --out suffix")
+    ap.add_argument("--policy_id", type=str, default="shared_policy")
+    args = ap.parse_args()
+    fmt = args.format or ("npz" if args.out.endswith(".npz") else "torchscript")
+    meta = export(args.ckpt, args.out, fmt=fmt, policy_id=args.policy_id)
+    print(f"Exported {meta['num_layers']}-layer policy ({fmt}, activations={meta['activations']}) to {args.out}")
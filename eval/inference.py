@@ -0,0 +1,84 @@
+import json
+import numpy as np
+
+# Standalone policy inference for exported checkpoints (see eval/export_policy.py).
+# Only NumPy is needed for .npz policies; TorchScript policies need torch but no Ray.
+
+_ACTIVATIONS = {
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0.0),
+    "swish": lambda x: x / (1.0 + np.exp(-x)),
+    "silu": lambda x: x / (1.0 + np.exp(-x)),
+    "linear": lambda x: x,
+}
+
+
+def postprocess_actions(dist_inputs, meta):
+    # Deterministic DiagGaussian action = mean (first half of the dist inputs),
+    # then RLlib's normalize_actions unsquash from [-1, 1] to the Box bounds.
+    act_dim = int(meta["act_dim"])
+    mean = dist_inputs[:, :act_dim]
+    low = np.asarray(meta.get("action_low", 0.0), dtype=np.float32)
+    high = np.asarray(meta.get("action_high", 1.0), dtype=np.float32)
+    if meta.get("normalize_actions", True):
+        mean = low + (mean + 1.0) * (high - low) / 2.0
+    return np.clip(mean, low, high)
+
+
+class NumpyPolicy:
+    """Deterministic ``shared_policy`` forward pass from an exported ``.npz``."""
+
+    def __init__(self, weights, biases, activations, meta):
+        self.weights = [np.ascontiguousarray(w.T, dtype=np.float32) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = [_ACTIVATIONS[a] for a in activations]
+        self.meta = meta
+        self.obs_dim = int(meta["obs_dim"])
+        self.act_dim = int(meta["act_dim"])
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            n = int(meta["num_layers"])
+            weights = [data[f"W{i}"] for i in range(n)]
+            biases = [data[f"b{i}"] for i in range(n)]
+        return cls(weights, biases, meta["activations"], meta)
+
+    def forward(self, obs_batch):
+        x = np.asarray(obs_batch, dtype=np.float32)
+        for W, b, act in zip(self.weights, self.biases, self.activations):
+            x = act(x @ W + b)
+        return x
+
+    def act(self, obs_batch):
+        """Actions for a ``(batch, obs_dim)`` array of observations."""
+        return postprocess_actions(self.forward(obs_batch), self.meta)
+
+
+class TorchScriptPolicy:
+    """Same interface as ``NumpyPolicy`` for an exported TorchScript module."""
+
+    def __init__(self, path):
+        import torch
+        self.torch = torch
+        extra = {"meta.json": ""}
+        self.module = torch.jit.load(path, _extra_files=extra, map_location="cpu")
+        self.module.eval()
+        self.meta = json.loads(extra["meta.json"])
+        self.obs_dim = int(self.meta["obs_dim"])
+        self.act_dim = int(self.meta["act_dim"])
+
+    def forward(self, obs_batch):
+        with self.torch.inference_mode():
+            out = self.module(self.torch.as_tensor(np.asarray(obs_batch, dtype=np.float32)))
+        return out.numpy()
+
+    def act(self, obs_batch):
+        return postprocess_actions(self.forward(obs_batch), self.meta)
+
+
+def load_exported(path):
+    if path.endswith(".npz"):
+        return NumpyPolicy.load(path)
+    return TorchScriptPolicy(path)
@@ -0,0 +1,182 @@
+import argparse, glob, hashlib, json, os, time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from envs.obs_encoding import raw_obs_dim, padded_obs_dim
+from eval.evaluate import METRICS, find_module_dir, run_episodes, summarize, _load_env_cfg
+
+# Ranks every checkpoint under runs/ on one seeded episode set. Each result
+# is cached in runs/.cache/leaderboard.json under the sha256 of the
+# checkpoint's module weights plus the evaluation settings, so copies of a
+# checkpoint (runs/checkpoint_<time>, sweep trials) are evaluated once and
+# re-runs only evaluate new checkpoints.
+
+# Metric -> rank direction (+1: higher is better)
+SORT_KEYS = {"coverage_rate": 1, "final_coverage_rate": 1, "return": 1, "collisions": -1, "effort": -1}
+
+
+def find_checkpoints(root="runs"):
+    """Checkpoint dirs with a ``shared_policy`` RLModule, one entry per real path."""
+    found = {}
+    for path in sorted(glob.glob(os.path.join(root, "**", "checkpoint_*"), recursive=True)):
+        if not os.path.isdir(path) or path.endswith(".tmp"):
+            continue
+        real = os.path.realpath(path)
+        if real not in found and find_module_dir(real) is not None:
+            found[real] = path
+    return list(found.values())
+
+
+def weights_hash(ckpt):
+    """sha256 of the module state file (changes only when the weights do)."""
+    module_dir = find_module_dir(ckpt)
+    name = next(n for n in ("module_state.pt", "module_state.pkl") if os.path.exists(os.path.join(module_dir, n)))
+    h = hashlib.sha256()
+    with open(os.path.join(module_dir, name), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def settings_key(env_cfg, episodes, seed, max_cycles):
+    keys = ("n_agents", "cover_radius", "collision_penalty", "action_penalty", "reward_components", "reward_split")
+    blob = json.dumps({"env": {k: env_cfg.get(k) for k in keys}, "episodes": episodes, "seed": seed,
+                       "max_cycles": max_cycles}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+def _env_for(obs_dim, env_cfg):
+    # Pick the observation encoding the checkpoint was trained with (raw or padded, eval N fixed)
+    n = env_cfg.get("n_agents", 3)
+    if obs_dim == raw_obs_dim(n):
+        return dict(env_cfg, max_agents=0)
+    for m in range(n, 257):
+        if padded_obs_dim(m) == obs_dim:
+            return dict(env_cfg, max_agents=m)
+    return None
+
+
+def _evaluate_job(args):
+    ckpt, env_cfg, seeds, max_cycles, batch = args
+    from eval.export_policy import load_actor
+    from eval.inference import NumpyPolicy
+    t0 = time.time()
+    try:
+        weights, biases, acts, meta = load_actor(ckpt)
+    except Exception as e:
+        return {"error": f"load failed: {e!r}"}
+    load_s = time.time() - t0
+    cfg = _env_for(meta["obs_dim"], env_cfg)
+    if cfg is None:
+        return {"error": f"obs_dim {meta['obs_dim']} does not fit n_agents={env_cfg.get('n_agents', 3)}"}
+    policy = NumpyPolicy(weights, biases, acts, meta)
+    t1 = time.time()
+    parts = [run_episodes(policy, seeds[i:i + batch], cfg, max_cycles=max_cycles) for i in range(0, len(seeds), batch)]
+    per_episode = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    summary = summarize(per_episode)
+    summary.update(load_s=load_s, eval_s=time.time() - t1, max_agents=cfg["max_agents"])
+    return summary
+
+
+class ResultCache:
+    """``{key: summary}`` JSON file, rewritten atomically after each new result."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, value):
+        self.entries[key] = value
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.entries, f, indent=1)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def leaderboard(root="runs", env_cfg=None, episodes=256, seed=10_000, max_cycles=25, workers=None, batch=64,
+                sort="coverage_rate", cache_path=None, refresh=False):
+    """Rows (one per checkpoint, best first) with metric means/ci95, eval cost and cache status."""
+    env_cfg = env_cfg or {}
+    cache = ResultCache(cache_path or os.path.join(root, ".cache", "leaderboard.json"))
+    settings = settings_key(env_cfg, episodes, seed, max_cycles)
+    ckpts = find_checkpoints(root)
+    keys = {c: f"{weights_hash(c)}-{settings}" for c in ckpts}
+    # Identical weights under several paths are evaluated once
+    todo = sorted({k for k in keys.values() if refresh or cache.get(k) is None})
+    first = {k: c for c, k in reversed(list(keys.items()))}
+    seeds = np.arange(seed, seed + episodes)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo) or 1))
+    jobs = [(first[k], env_cfg, seeds, max_cycles, batch) for k in todo]
+    t0 = time.time()
+    if todo:
+        print(f"Evaluating {len(todo)} of {len(ckpts)} checkpoints ({episodes} episodes each, {workers} workers)",
+              flush=True)
+        if workers <= 1:
+            results = map(_evaluate_job, jobs)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(_evaluate_job, jobs)
+        for k, res in zip(todo, results):
+            cache.put(k, res)
+        if workers > 1:
+            pool.shutdown()
+    rows = []
+    for c in ckpts:
+        res = cache.get(keys[c])
+        row = {"checkpoint": c, "hash": keys[c].split("-")[0][:12], "cached": keys[c] not in todo}
+        row.update(res)
+        rows.append(row)
+    direction = SORT_KEYS[sort]
+    ok = [r for r in rows if "error" not in r]
+    ok.sort(key=lambda r: (-direction * r[sort]["mean"], -r["return"]["mean"]))
+    for rank, r in enumerate(ok, 1):
+        r["rank"] = rank
+    return ok + [r for r in rows if "error" in r], time.time() - t0
+
+
+def format_table(rows):
+    head = f"{'#':>3}  {'coverage':>15}  {'collisions':>10}  {'effort':>8}  {'return':>9}  {'eval_s':>7}  checkpoint"
+    lines = [head]
+    for r in rows:
+        if "error" in r:
+            lines.append(f"{'-':>3}  {r['error']}  {r['checkpoint']}")
+            continue
+        cov = f"{r['coverage_rate']['mean']:.3f}±{r['coverage_rate']['ci95']:.3f}"
+        cost = f"{r['load_s'] + r['eval_s']:.2f}" + ("*" if r["cached"] else " ")
+        lines.append(f"{r['rank']:>3}  {cov:>15}  {r['collisions']['mean']:>10.3f}  {r['effort']['mean']:>8.2f}  "
+                     f"{r['return']['mean']:>9.2f}  {cost:>7}  {r['checkpoint']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Evaluate every checkpoint under runs/ and rank them")
+    ap.add_argument("--root", type=str, default="runs")
+    ap.add_argument("--episodes", type=int, default=256)
+    ap.add_argument("--seed", type=int, default=10_000, help="first episode seed (same set for every checkpoint)")
+    ap.add_argument("--n_agents", type=int, default=0, help="override config.yaml env.n_agents")
+    ap.add_argument("--max_cycles", type=int, default=25)
+    ap.add_argument("--workers", type=int, default=0, help="processes (0 = all cores)")
+    ap.add_argument("--batch", type=int, default=64, help="episodes per forward pass")
+    ap.add_argument("--sort", choices=sorted(SORT_KEYS), default="coverage_rate")
+    ap.add_argument("--refresh", action="store_true", help="ignore cached results")
+    ap.add_argument("--out", type=str, default="", help="JSON leaderboard path (default <root>/leaderboard.json)")
+    args = ap.parse_args()
+
+    env_cfg = _load_env_cfg()
+    if args.n_agents:
+        env_cfg["n_agents"] = args.n_agents
+    rows, wall = leaderboard(args.root, env_cfg, args.episodes, args.seed, args.max_cycles, args.workers or None,
+                             args.batch, args.sort, refresh=args.refresh)
+    print(format_table(rows))
+    fresh = sum(not r.get("cached", True) for r in rows)
+    print(f"{len(rows)} checkpoints, {fresh} evaluated in {wall:.1f}s, the rest from cache (eval_s*)")
+    out = args.out or os.path.join(args.root, "leaderboard.json")
+    with open(out, "w") as f:
+        json.dump({"episodes": args.episodes, "seed": args.seed, "env": env_cfg, "sort": args.sort,
+                   "metrics": list(METRICS), "rows": rows}, f, indent=2)
+    print("Wrote", out)
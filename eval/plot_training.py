@@ -1,45 +1,66 @@
-import glob, os, argparse
-import pandas as pd
-import matplotlib.pyplot as plt
+import glob, os, sys, time, argparse
 
 ap = argparse.ArgumentParser()
 ap.add_argument("--all", action="store_true", help="Aggregate all runs and plot cumulative curves")
+ap.add_argument("--cache_dir", type=str, default="runs/.cache", help="columnar cache of parsed progress.csv files")
+ap.add_argument("--follow", action="store_true", help="tail the live metrics ring of the newest (or --ring) run")
+ap.add_argument("--ring", type=str, default="", help="metrics.ring to follow")
+ap.add_argument("--interval", type=float, default=1.0, help="--follow poll interval (s)")
 args = ap.parse_args()
 
+# Plotting stack only after argument parsing (--help stays instant; --follow skips pandas)
+import matplotlib.pyplot as plt
+
+if args.follow:
+    from train.metrics_stream import follow
+    ring = args.ring
+    while not ring or not os.path.exists(ring):
+        rings = sorted(glob.glob("runs/**/metrics.ring", recursive=True), key=os.path.getmtime)
+        ring = args.ring or (rings[-1] if rings else "")
+        if not os.path.exists(ring):
+            print("Waiting for a training run to start ...", flush=True)
+            time.sleep(max(args.interval, 2.0))
+    print("Following", ring)
+    xs, ys = [], []
+    fig, ax = plt.subplots()
+    (line,) = ax.plot([], [], marker="o", label="Episode Reward (mean)")
+    ax.set_xlabel("Iteration"); ax.set_ylabel("Reward"); ax.set_title("Training Progress (live)")
+    ax.legend()
+    for rows in follow(ring, interval=args.interval):
+        for r in rows:
+            print(
+                f"iter={r['iteration']:.0f} mean_reward={r['mean_reward']} "
+                f"env_steps_total={r['env_steps_total']} steps_per_s={r['env_steps_per_s'] or 0:.0f}",
+                flush=True,
+            )
+            if r["iteration"] is not None and r["mean_reward"] is not None:
+                xs.append(r["iteration"]); ys.append(r["mean_reward"])
+        line.set_data(xs, ys)
+        ax.relim(); ax.autoscale_view()
+        fig.tight_layout(); fig.savefig("training_curve.png", dpi=180)
+    print("Run finished; saved training_curve.png")
+    sys.exit(0)
+
 csvs = sorted(glob.glob("runs/**/progress.csv", recursive=True), key=os.path.getmtime)
 assert csvs, "No progress.csv found under runs/"
+import pandas as pd
+from eval.run_store import RunStore
+store = RunStore(args.cache_dir)
 
-if not args.all:
-    df = pd.read_csv(csvs[-1])
 
-    # Pick x-axis column
-    x_candidates = [
-        "training_iteration",
-        "iteration",
-        "episodes_total",
-    ]
-    x = None
-    for col in x_candidates:
-        if col in df.columns:
-            x = pd.to_numeric(df[col], errors="coerce")
-            break
-    if x is None:
-        x = pd.Series(range(len(df)))
+def per_iter_steps(df):
+    if df["steps"].notna().any():
+        return df["steps"].fillna(0)
+    # Fallback: use configured batch-size if present in CSV, else 1000
+    batch = df["batch"].dropna()
+    bs = int(batch.iloc[0]) if len(batch) else 1000
+    return pd.Series([bs] * len(df), index=df.index, dtype="float64")
+
 
-    # Pick y-axis column (reward)
-    y_candidates = [
-        "episode_reward_mean",
-        "episode_return_mean",
-        "env_runners/episode_return_mean",
-        "env_runners/episode_reward_mean",
-    ]
-    y = None
-    for col in y_candidates:
-        if col in df.columns:
-            y = pd.to_numeric(df[col], errors="coerce")
-            break
-    if y is None:
-        y = pd.Series([0.0] * len(df))
+if not args.all:
+    df = store.load(csvs[-1])
+    x = df["iteration"] if df["iteration"].notna().any() else pd.Series(range(len(df)), dtype="float64")
+    y = df["reward"] if df["reward"].notna().any() else pd.Series([0.0] * len(df))
 
     # Drop NaNs for plotting clarity
     mask = ~(x.isna() | y.isna())
@@ -51,47 +72,15 @@ if not args.all:
     plt.legend(); plt.tight_layout(); plt.savefig("training_curve.png", dpi=180)
     print("Saved training_curve.png from:", csvs[-1])
 else:
-    # Aggregate all runs
-    def pick_reward(df):
-        for col in [
-            "episode_reward_mean",
-            "episode_return_mean",
-            "env_runners/episode_return_mean",
-            "env_runners/episode_reward_mean",
-        ]:
-            if col in df.columns:
-                return pd.to_numeric(df[col], errors="coerce")
-        return pd.Series([float('nan')] * len(df))
-
-    def per_iter_steps(df):
-        for col in [
-            "env_runners/num_env_steps_sampled_this_iter",
-            "num_env_steps_sampled_this_iter",
-        ]:
-            if col in df.columns:
-                return pd.to_numeric(df[col], errors="coerce").fillna(0)
-        # Fallback: use configured batch-size if present in CSV, else 1000
-        bs = 1000
-        for c in ["train_batch_size", "config/train_batch_size"]:
-            if c in df.columns:
-                try:
-                    bs = int(df[c].iloc[0])
-                except Exception:
-                    pass
-                break
-        return pd.Series([bs] * len(df))
+    # Aggregate all runs from the cache (only new/appended rows are parsed)
+    all_runs = store.load_all(csvs)
+    runs = [df for _, df in all_runs.groupby("run", sort=False)]
+    print(f"Loaded {len(csvs)} runs: {store.stats['cached']} cached, "
+          f"{store.stats['appended']} appended, {store.stats['parsed']} parsed")
 
     # Build cumulative-iteration plot
-    global_iter = 0
-    gi_x, gi_y = [], []
-    for p in csvs:
-        df = pd.read_csv(p)
-        r = pick_reward(df)
-        clean = r.dropna()
-        n = len(clean)
-        gi_x.extend(range(global_iter + 1, global_iter + n + 1))
-        gi_y.extend(clean.values.tolist())
-        global_iter += n
+    gi_y = all_runs["reward"].dropna().reset_index(drop=True)
+    gi_x = range(1, len(gi_y) + 1)
     plt.figure()
     plt.plot(gi_x, gi_y, marker="o", label="Episode Reward (mean)")
     plt.xlabel("Global Iteration"); plt.ylabel("Reward"); plt.title("Training Progress (All Runs)")
@@ -99,26 +88,12 @@ else:
     print("Saved training_curve_all_iters.png across", len(csvs), "runs")
 
     # Build cumulative-steps plot
-    steps = 0
-    gs_x, gs_y = [], []
-    for p in csvs:
-        df = pd.read_csv(p)
-        r = pick_reward(df).fillna(method="ffill")
-        s = per_iter_steps(df)
-        for d, val in zip(s, r):
-            try:
-                d = int(d)
-            except Exception:
-                d = 0
-            steps += max(0, d)
-            if pd.isna(val):
-                continue
-            gs_x.append(steps)
-            gs_y.append(val)
+    rewards = pd.concat([df["reward"].ffill() for df in runs], ignore_index=True)
+    steps = pd.concat([per_iter_steps(df) for df in runs], ignore_index=True)
+    cum_steps = steps.astype("int64").clip(lower=0).cumsum()
+    keep = rewards.notna()
     plt.figure()
-    plt.plot(gs_x, gs_y, marker="o", label="Episode Reward (mean)")
+    plt.plot(cum_steps[keep], rewards[keep], marker="o", label="Episode Reward (mean)")
     plt.xlabel("Global Env Steps"); plt.ylabel("Reward"); plt.title("Training Progress vs Steps (All Runs)")
     plt.legend(); plt.tight_layout(); plt.savefig("training_curve_all_steps.png", dpi=180)
     print("Saved training_curve_all_steps.png across", len(csvs), "runs")
-
-
@@ -1,11 +1,11 @@
-import argparse
+import argparse, os, queue, threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import imageio.v2 as imageio
 try:  # ensure ffmpeg writer plugin is registered
     import imageio_ffmpeg  # noqa: F401
 except Exception:
     pass
-from ray.rllib.algorithms.ppo import PPO
-from train.rllib_env import RLlibSpread
 
 def _render_frame(env):
     # Try direct render first
@@ -66,42 +66,51 @@ def _agent_action_space(env, agent_id):
                 continue
     raise RuntimeError(f"Could not resolve action space for agent: {agent_id}")
 
-def rollout_frames(algo, env, policy_id="shared_policy", max_steps=500):
-    reset_out = env.reset()
+def _actions(algo, env, obs, policy_id):
+    if hasattr(algo, "act"):
+        # Batched policy (eval.evaluate.load_policy / exported): one forward pass for all agents
+        ids = list(obs)
+        acts = algo.act(np.stack([obs[a] for a in ids]))
+        return dict(zip(ids, acts))
+    actions = {}
+    for agent, ob in obs.items():
+        if algo is None:
+            space = _agent_action_space(env, agent)
+            actions[agent] = space.sample()
+        else:
+            try:
+                # New API first
+                act, _ = algo.compute_single_action(ob, explore=False, policy_id=policy_id)
+                actions[agent] = act
+            except Exception:
+                try:
+                    # Older API fallback
+                    act, _, _ = algo.get_policy(policy_id).compute_single_action(ob, explore=False)
+                    actions[agent] = act
+                except Exception as e:
+                    # As a last resort, fall back to random for this step/agent
+                    space = _agent_action_space(env, agent)
+                    actions[agent] = space.sample()
+    return actions
+
+def _positions(env):
+    world = env.raw_env.aec_env.unwrapped.world
+    return np.stack([a.state.p_pos for a in world.agents]), np.stack([l.state.p_pos for l in world.landmarks])
+
+def iter_frames(algo, env, policy_id="shared_policy", max_steps=500, seed=None, observe=_render_frame):
+    """Yield RGB frames one step at a time (nothing is kept in memory)."""
+    reset_out = env.reset(seed=seed) if seed is not None else env.reset()
     if isinstance(reset_out, tuple):
         obs, _infos = reset_out
     else:
         obs, _infos = reset_out, {}
-    frames = []
     steps = 0
     while steps < max_steps:
-        # Render
-        frame = _render_frame(env)
+        frame = observe(env)
         if frame is not None:
-            frames.append(frame)
-
-        # Actions
-        actions = {}
-        for agent, ob in obs.items():
-            if algo is None:
-                space = _agent_action_space(env, agent)
-                actions[agent] = space.sample()
-            else:
-                try:
-                    # New API first
-                    act, _ = algo.compute_single_action(ob, explore=False, policy_id=policy_id)
-                    actions[agent] = act
-                except Exception:
-                    try:
-                        # Older API fallback
-                        act, _, _ = algo.get_policy(policy_id).compute_single_action(ob, explore=False)
-                        actions[agent] = act
-                    except Exception as e:
-                        # As a last resort, fall back to random for this step/agent
-                        space = _agent_action_space(env, agent)
-                        actions[agent] = space.sample()
-
-        step_out = env.step(actions)
+            yield frame
+
+        step_out = env.step(_actions(algo, env, obs, policy_id))
         if isinstance(step_out, tuple) and len(step_out) == 5:
             obs, rewards, terms, truncs, infos = step_out
             done = len(obs) == 0
@@ -111,43 +120,241 @@ def rollout_frames(algo, env, policy_id="shared_policy", max_steps=500):
         steps += 1
         if done:
             break
-    return frames
+
+def collect_states(algo, env, policy_id="shared_policy", max_steps=500, seed=None):
+    """Agent/landmark positions ``(T, N, 2)`` / ``(T, L, 2)`` of one rollout, no rendering."""
+    states = list(iter_frames(algo, env, policy_id=policy_id, max_steps=max_steps, seed=seed, observe=_positions))
+    return np.stack([a for a, _ in states]), np.stack([l for _, l in states])
+
+class RecordEnv:
+    """simple_spread for recording: the PettingZoo parallel env plus RLlibSpread's
+    observation padding (``max_agents``), without importing Ray. Only RLlib
+    checkpoints load Ray (in ``eval.evaluate.load_policy``); random and
+    exported policies record with NumPy/PettingZoo alone."""
+
+    def __init__(self, n_agents=3, max_agents=0, render_mode=None):
+        from envs.spread_wrapper import make_env
+        self.raw_env = make_env(n_agents=n_agents, render_mode=render_mode)
+        self.n_agents = n_agents
+        self.max_agents = max_agents or 0
+
+    def _encode(self, obs):
+        if not self.max_agents or not obs:
+            return obs
+        from envs.obs_encoding import pad_observations
+        ids = list(obs)
+        padded = pad_observations(np.stack([obs[a] for a in ids]), self.n_agents, self.max_agents)
+        return dict(zip(ids, padded))
+
+    def reset(self, seed=None):
+        obs, infos = self.raw_env.reset(seed=seed)
+        return self._encode(obs), infos
+
+    def step(self, actions):
+        obs, rew, term, trunc, infos = self.raw_env.step(actions)
+        return self._encode(obs), rew, term, trunc, infos
+
+    def render(self):
+        return self.raw_env.render()
+
+def _hold(x, T):
+    # Repeat the last state so a panel whose episode ended early holds its last frame
+    return np.concatenate([x, np.repeat(x[-1:], T - len(x), axis=0)]) if len(x) < T else x
+
+class VideoWriter:
+    """Streams frames into ffmpeg as they are produced.
+
+    The encoder is opened on the first frame. With ``background=True`` frames
+    go through a queue of at most ``queue_size`` frames to an encoder thread,
+    so rendering and encoding overlap and memory stays bounded either way.
+    """
+
+    def __init__(self, out_path, fps=20, background=False, queue_size=32):
+        self.out_path = out_path
+        self.fps = fps
+        self.frames = 0
+        self._writer = None
+        self._proc = None
+        self._error = None
+        self._queue = queue.Queue(maxsize=queue_size) if background else None
+        self._thread = None
+
+    def _open(self, frame):
+        try:
+            self._writer = imageio.get_writer(self.out_path, format="FFMPEG", fps=self.fps)
+            return
+        except Exception as e:
+            print(f"imageio FFMPEG writer unavailable ({e}); falling back to imageio-ffmpeg.")
+        # Fallback: direct imageio-ffmpeg
+        try:
+            import imageio_ffmpeg as ffm
+            height, width = frame.shape[:2]
+            self._proc = ffm.write_frames(self.out_path, size=(width, height), fps=self.fps, codec='libx264', pix_fmt='yuv420p')
+            self._proc.send(None)
+        except Exception as e:
+            raise RuntimeError(f"Failed to write video via imageio-ffmpeg: {e}")
+
+    def _write(self, frame):
+        if self._writer is None and self._proc is None:
+            self._open(frame)
+        if self._writer is not None:
+            self._writer.append_data(frame)
+        else:
+            self._proc.send(np.ascontiguousarray(frame))
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            if self._error is None:
+                try:
+                    self._write(frame)
+                except Exception as e:
+                    # Keep draining so the producer never blocks on a full queue
+                    self._error = e
+
+    def append(self, frame):
+        if self._error is not None:
+            raise self._error
+        self.frames += 1
+        if self._queue is None:
+            self._write(frame)
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._queue.put(frame)
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._writer is not None:
+            self._writer.close()
+        if self._proc is not None:
+            self._proc.close()
+        self._writer = self._proc = None
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 def save_mp4(frames, out_path, fps=20):
-    if not frames:
+    with VideoWriter(out_path, fps=fps) as writer:
+        for f in frames:
+            writer.append(f)
+    if not writer.frames:
         print("No frames to write; skipping save.")
-        return
-    try:
-        with imageio.get_writer(out_path, format="FFMPEG", fps=fps) as writer:
-            for f in frames:
-                writer.append_data(f)
-        return
-    except Exception as e:
-        print(f"imageio FFMPEG writer unavailable ({e}); falling back to imageio-ffmpeg.")
-    # Fallback: direct imageio-ffmpeg
+
+def compose(frames):
+    """Single side-by-side frame; shorter panels are padded with black."""
+    height = max(f.shape[0] for f in frames)
+    padded = [f if f.shape[0] == height else np.pad(f, ((0, height - f.shape[0]), (0, 0), (0, 0))) for f in frames]
+    return np.concatenate(padded, axis=1)
+
+def _load(ckpt):
+    if not ckpt or ckpt == "random":
+        return None
+    from eval.evaluate import load_policy
+    return load_policy(ckpt)
+
+def record(ckpts, outs=(), side_by_side="", n_agents=3, max_agents=0, max_steps=500, episodes=1, seed=0, fps=20, background=True,
+           renderer="numpy", render_workers=0, size=700):
+    """Roll out each checkpoint in lockstep on the same seeds and stream every
+    panel to its own video and, optionally, all panels to one composite video.
+    A panel whose episode ended early holds its last frame.
+
+    ``renderer="numpy"`` only collects positions during the rollout and
+    draws the frames afterwards with ``eval.render`` in ``render_workers``
+    processes; ``"pygame"`` renders every step inline through PettingZoo."""
+    from eval.render import iter_rendered
+    policies = [_load(c) for c in ckpts]
+    render_mode = "rgb_array" if renderer == "pygame" else None
+    envs = [RecordEnv(n_agents, max_agents, render_mode) for _ in ckpts]
+    outs = list(outs) + [""] * (len(ckpts) - len(outs))
+    writers = [VideoWriter(o, fps=fps, background=background) if o else None for o in outs]
+    composite = VideoWriter(side_by_side, fps=fps, background=background) if side_by_side else None
+    render_workers = render_workers or os.cpu_count() or 1
     try:
-        import imageio_ffmpeg as ffm
-        height, width = frames[0].shape[:2]
-        proc = ffm.write_frames(out_path, size=(width, height), fps=fps, codec='libx264', pix_fmt='yuv420p')
-        proc.send(None)
-        for f in frames:
-            proc.send(f)
-        proc.close()
-    except Exception as e:
-        raise RuntimeError(f"Failed to write video via imageio-ffmpeg: {e}")
+        for ep in range(episodes):
+            if renderer != "pygame":
+                states = [collect_states(p, e, max_steps=max_steps, seed=seed + ep) for p, e in zip(policies, envs)]
+                T = max(len(a) for a, _ in states)
+                panels = [(_hold(a, T), _hold(l, T)) for a, l in states]
+                for chunk in iter_rendered(panels, size=size, workers=render_workers):
+                    for t in range(len(chunk[0])):
+                        frames = [c[t] for c in chunk]
+                        for w, f in zip(writers, frames):
+                            if w is not None:
+                                w.append(f)
+                        if composite is not None:
+                            composite.append(compose(frames))
+                continue
+            streams = [iter_frames(p, e, max_steps=max_steps, seed=seed + ep) for p, e in zip(policies, envs)]
+            last = [None] * len(streams)
+            while True:
+                live = False
+                for i, stream in enumerate(streams):
+                    frame = next(stream, None)
+                    if frame is not None:
+                        live = True
+                        last[i] = frame
+                        if writers[i] is not None:
+                            writers[i].append(frame)
+                if not live:
+                    break
+                if composite is not None and all(f is not None for f in last):
+                    composite.append(compose(last))
+    finally:
+        for w in writers + [composite]:
+            if w is not None:
+                w.close()
+    return [w.frames if w else 0 for w in writers], (composite.frames if composite else 0)
+
+def _record_one(job):
+    ckpt, out, kw = job
+    (frames,), _ = record([ckpt], [out], **kw)
+    return out, frames
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--ckpt", type=str, default="")
     ap.add_argument("--out", type=str, default="rollout.mp4")
+    ap.add_argument("--ckpts", nargs="+", default=None, help="several checkpoints ('random' = random policy); overrides --ckpt")
+    ap.add_argument("--outs", nargs="*", default=None, help="one video per --ckpts entry")
+    ap.add_argument("--side_by_side", type=str, default="", help="also write all --ckpts as one composite video")
+    ap.add_argument("--workers", type=int, default=1, help="record --ckpts in parallel processes (no --side_by_side)")
     ap.add_argument("--n_agents", type=int, default=3)
+    ap.add_argument("--max_agents", type=int, default=0, help="padded obs width of curriculum checkpoints (env.max_agents)")
     ap.add_argument("--max_steps", type=int, default=500)
+    ap.add_argument("--episodes", type=int, default=1, help="episodes per video (seeds seed..seed+episodes-1)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--fps", type=int, default=20)
+    ap.add_argument("--no_background", action="store_true", help="encode on the rollout thread")
+    ap.add_argument("--renderer", choices=["numpy", "pygame"], default="numpy",
+                    help="numpy: collect states, then rasterize in parallel; pygame: PettingZoo render per step")
+    ap.add_argument("--render_workers", type=int, default=0, help="processes for --renderer numpy (0 = all cores)")
+    ap.add_argument("--size", type=int, default=700, help="frame size in pixels (--renderer numpy)")
     args = ap.parse_args()
 
-    env = RLlibSpread({"n_agents": args.n_agents, "render_mode": "rgb_array"})
-    algo = PPO.from_checkpoint(args.ckpt) if args.ckpt else None
-    frames = rollout_frames(algo, env, max_steps=args.max_steps)
-    save_mp4(frames, args.out)
-    print(f"Saved {args.out} with {len(frames)} frames")
-
-
+    ckpts = args.ckpts if args.ckpts is not None else [args.ckpt]
+    outs = args.outs if args.outs is not None else ([args.out] if args.ckpts is None else [])
+    kw = dict(n_agents=args.n_agents, max_agents=args.max_agents, max_steps=args.max_steps, episodes=args.episodes, seed=args.seed,
+              fps=args.fps, background=not args.no_background, renderer=args.renderer,
+              render_workers=args.render_workers, size=args.size)
+    if args.workers > 1 and not args.side_by_side and len(outs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(outs))) as pool:
+            for out, frames in pool.map(_record_one, [(c, o, kw) for c, o in zip(ckpts, outs)]):
+                print(f"Saved {out} with {frames} frames")
+    else:
+        counts, composite = record(ckpts, outs, side_by_side=args.side_by_side, **kw)
+        for out, frames in zip(outs, counts):
+            print(f"Saved {out} with {frames} frames")
+        if args.side_by_side:
+            print(f"Saved {args.side_by_side} with {composite} frames")
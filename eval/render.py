@@ -0,0 +1,99 @@
+import collections, os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Same look as PettingZoo's pygame renderer (SimpleEnv.draw): white canvas,
+# camera range = max |position| of the frame, radius = size * 350 px at 700 px,
+# colours = entity.color * 200, 1 px black border, agents drawn before landmarks.
+AGENT_COLOR = (70, 70, 170)
+LANDMARK_COLOR = (50, 50, 50)
+AGENT_SIZE = 0.15
+LANDMARK_SIZE = 0.05
+_BASE_WIDTH = 700
+
+
+def _disk(radius):
+    r = int(np.ceil(radius))
+    dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+    d = np.sqrt(dy ** 2 + dx ** 2)
+    fill = d <= radius
+    border = fill & (d > radius - 1)
+    return (dy[fill], dx[fill]), (dy[border], dx[border])
+
+
+def _centers(pos, cam, size):
+    # Mirrors SimpleEnv.draw, including its floor division
+    x = np.floor(pos[..., 0] / cam[:, None] * size / 2) * 0.9 + size // 2
+    y = np.floor(-pos[..., 1] / cam[:, None] * size / 2) * 0.9 + size // 2
+    return np.rint(y).astype(np.int64), np.rint(x).astype(np.int64)
+
+
+def _stamp(frames, cy, cx, offsets, color):
+    # cy/cx: (T,) centres of one entity in every frame; offsets: disk pixels
+    T, H, W, _ = frames.shape
+    ys = cy[:, None] + offsets[0][None]
+    xs = cx[:, None] + offsets[1][None]
+    ts = np.broadcast_to(np.arange(T)[:, None], ys.shape)
+    ok = (ys >= 0) & (ys < H) & (xs >= 0) & (xs < W)
+    frames[ts[ok], ys[ok], xs[ok]] = color
+
+
+def render_frames(agent_pos, landmark_pos, size=_BASE_WIDTH):
+    """RGB frames ``(T, size, size, 3)`` from ``(T, N, 2)`` / ``(T, L, 2)`` positions.
+
+    Every frame of the batch is drawn at once: the loop runs over entities
+    only, each a single scatter of its disk pixels into all T frames.
+    """
+    agent_pos = np.asarray(agent_pos, dtype=np.float64)
+    landmark_pos = np.asarray(landmark_pos, dtype=np.float64)
+    T = agent_pos.shape[0]
+    frames = np.full((T, size, size, 3), 255, dtype=np.uint8)
+    cam = np.abs(np.concatenate([agent_pos, landmark_pos], axis=1)).reshape(T, -1).max(axis=1)
+    cam = np.where(cam > 0, cam, 1.0)
+    scale = size / _BASE_WIDTH
+    for pos, radius, color in ((agent_pos, AGENT_SIZE, AGENT_COLOR), (landmark_pos, LANDMARK_SIZE, LANDMARK_COLOR)):
+        fill, border = _disk(radius * 350 * scale)
+        cy, cx = _centers(pos, cam, size)
+        for e in range(pos.shape[1]):
+            _stamp(frames, cy[:, e], cx[:, e], fill, color)
+            _stamp(frames, cy[:, e], cx[:, e], border, (0, 0, 0))
+    return frames
+
+
+def _render_job(args):
+    panels, size = args
+    return [render_frames(a, l, size) for a, l in panels]
+
+
+def iter_rendered(panels, size=_BASE_WIDTH, chunk=32, workers=1):
+    """Yield ``[frames_panel0, frames_panel1, ...]`` per chunk of time steps, in order.
+
+    ``panels`` is a list of ``(agent_pos, landmark_pos)`` with the same T.
+    With ``workers > 1`` chunks are rendered in a process pool; at most
+    ``2 * workers`` chunks are in flight so memory stays bounded.
+    """
+    T = len(panels[0][0])
+    jobs = (([(a[t:t + chunk], l[t:t + chunk]) for a, l in panels], size) for t in range(0, T, chunk))
+    if workers <= 1:
+        for job in jobs:
+            yield _render_job(job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for job in jobs:
+            pending.append(pool.submit(_render_job, job))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def render_video(agent_pos, landmark_pos, out_path, fps=20, size=_BASE_WIDTH, chunk=32, workers=0):
+    """Encode one episode's positions to ``out_path``; returns the frame count."""
+    from eval.record_video import VideoWriter
+    workers = workers or os.cpu_count() or 1
+    with VideoWriter(out_path, fps=fps, background=True) as writer:
+        for (frames,) in iter_rendered([(agent_pos, landmark_pos)], size=size, chunk=chunk, workers=workers):
+            for f in frames:
+                writer.append(f)
+    return writer.frames
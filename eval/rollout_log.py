@@ -0,0 +1,233 @@
+import argparse, glob, json, os
+import numpy as np
+
+# On-disk layout of a log directory:
+#   index_<prefix>.json        one per writer: fields, meta, shard list
+#   <prefix>_<k>/<field>.npy   uncompressed shard, memory-mapped by the reader
+#   <prefix>_<k>.npz           compressed shard (compress=True)
+# Full shards hold exactly shard_rows rows; the last one of a writer may be shorter.
+
+
+class ShardWriter:
+    """Streams fixed-schema rows to fixed-size shards plus an index file.
+
+    Rows are copied into preallocated buffers; every ``shard_rows`` rows the
+    buffers are written out (to a ``.tmp`` path, then renamed) and the index
+    is rewritten atomically, so a reader only ever sees complete shards.
+    """
+
+    def __init__(self, out_dir, fields, shard_rows=4096, prefix="part", compress=False, meta=None):
+        self.out_dir = out_dir
+        self.fields = {k: (tuple(shape), np.dtype(dtype).str) for k, (shape, dtype) in fields.items()}
+        self.shard_rows = int(shard_rows)
+        self.prefix = prefix
+        self.compress = compress
+        self.meta = dict(meta or {})
+        self.shards = []
+        self.rows = 0
+        self._n = 0
+        self._buf = {k: np.zeros((self.shard_rows,) + shape, dtype) for k, (shape, dtype) in self.fields.items()}
+        os.makedirs(out_dir, exist_ok=True)
+        self.closed = False
+        self._write_index()
+
+    def append(self, **cols):
+        """Append a batch of rows; every field gets an array with the same leading length."""
+        k = len(next(iter(cols.values())))
+        assert set(cols) == set(self.fields), f"expected fields {sorted(self.fields)}, got {sorted(cols)}"
+        done = 0
+        while done < k:
+            take = min(k - done, self.shard_rows - self._n)
+            for name, v in cols.items():
+                self._buf[name][self._n:self._n + take] = v[done:done + take]
+            self._n += take
+            done += take
+            if self._n == self.shard_rows:
+                self.flush()
+
+    def flush(self):
+        if not self._n:
+            return
+        name = f"{self.prefix}_{len(self.shards):06d}"
+        path = os.path.join(self.out_dir, name + (".npz" if self.compress else ""))
+        tmp = path + ".tmp"
+        if self.compress:
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, **{k: b[:self._n] for k, b in self._buf.items()})
+        else:
+            os.makedirs(tmp, exist_ok=True)
+            for k, b in self._buf.items():
+                np.save(os.path.join(tmp, k + ".npy"), b[:self._n])
+        os.replace(tmp, path)
+        self.shards.append({"path": os.path.basename(path), "rows": self._n})
+        self.rows += self._n
+        self._n = 0
+        self._write_index()
+
+    def _write_index(self):
+        index = os.path.join(self.out_dir, f"index_{self.prefix}.json")
+        with open(index + ".tmp", "w") as f:
+            json.dump({
+                "fields": {k: [list(s), d] for k, (s, d) in self.fields.items()},
+                "shard_rows": self.shard_rows, "compress": self.compress, "meta": self.meta,
+                "rows": self.rows, "closed": self.closed, "shards": self.shards,
+            }, f, indent=1)
+        os.replace(index + ".tmp", index)
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self._write_index()
+
+
+class ShardReader:
+    """Reads every ``index_*.json`` in a directory; shards are memory-mapped where possible."""
+
+    def __init__(self, path):
+        self.path = path
+        self.indices = []
+        for p in sorted(glob.glob(os.path.join(path, "index_*.json"))):
+            with open(p) as f:
+                self.indices.append(json.load(f))
+        assert self.indices, f"no index_*.json under {path}"
+        self.fields = {k: (tuple(s), d) for k, (s, d) in self.indices[0]["fields"].items()}
+        self.meta = self.indices[0]["meta"]
+        self.shards = [s for ix in self.indices for s in ix["shards"]]
+
+    def __len__(self):
+        return sum(s["rows"] for s in self.shards)
+
+    def shard(self, i, fields=None):
+        path = os.path.join(self.path, self.shards[i]["path"])
+        fields = fields or list(self.fields)
+        if path.endswith(".npz"):
+            with np.load(path) as f:
+                return {k: f[k] for k in fields}
+        return {k: np.load(os.path.join(path, k + ".npy"), mmap_mode="r") for k in fields}
+
+    def iter_shards(self, fields=None):
+        for i in range(len(self.shards)):
+            yield self.shard(i, fields)
+
+    def column(self, name):
+        return np.concatenate([s[name] for s in self.iter_shards([name])]) if self.shards else np.zeros((0,))
+
+
+# Rollout logs: one row per world step; step 0 is the reset state (zero action/reward)
+def rollout_fields(n_agents, n_landmarks=None):
+    N, L = n_agents, n_landmarks or n_agents
+    return {
+        "episode": ((), np.int64),
+        "step": ((), np.int32),
+        "agent_pos": ((N, 2), np.float32),
+        "landmark_pos": ((L, 2), np.float32),
+        "actions": ((N, 5), np.float32),
+        "reward": ((N,), np.float32),
+        "coverage": ((), np.float32),
+        "collisions": ((), np.float32),
+        "effort": ((), np.float32),
+    }
+
+
+class RolloutRecorder:
+    """Logs positions, actions, rewards and shaped-reward components per world step."""
+
+    def __init__(self, out_dir, n_agents, prefix="part", shard_rows=4096, compress=False, meta=None):
+        self.n_agents = n_agents
+        self.writer = ShardWriter(out_dir, rollout_fields(n_agents), shard_rows=shard_rows, prefix=prefix,
+                                  compress=compress, meta=dict(meta or {}, n_agents=n_agents))
+
+    def log_reset(self, episode, agent_pos, landmark_pos):
+        episode = np.atleast_1d(episode)
+        B, N = len(episode), self.n_agents
+        zeros = np.zeros(B)
+        self.log(episode, 0, agent_pos, landmark_pos, np.zeros((B, N, 5)), np.zeros((B, N)), zeros, zeros, zeros)
+
+    def log(self, episode, step, agent_pos, landmark_pos, actions, reward, coverage, collisions, effort):
+        """One row per world; every argument is batched over worlds (or a scalar for all of them)."""
+        episode = np.atleast_1d(episode)
+        B, N = len(episode), self.n_agents
+        self.writer.append(
+            episode=episode,
+            step=np.full(B, step),
+            agent_pos=np.reshape(agent_pos, (B, N, 2)),
+            landmark_pos=np.reshape(landmark_pos, (B, -1, 2)),
+            actions=np.reshape(actions, (B, N, 5)),
+            reward=np.reshape(reward, (B, N)),
+            coverage=np.broadcast_to(coverage, (B,)),
+            collisions=np.broadcast_to(collisions, (B,)),
+            effort=np.broadcast_to(effort, (B,)),
+        )
+
+    def close(self):
+        self.writer.close()
+
+
+class RolloutLog(ShardReader):
+    """Offline view of a rollout log: per-episode metrics and video (``eval.render``), no Ray or policy needed."""
+
+    def episodes(self):
+        return np.unique(self.column("episode"))
+
+    def episode(self, episode):
+        parts = []
+        for s in self.iter_shards():
+            mask = np.asarray(s["episode"]) == episode
+            if mask.any():
+                parts.append({k: np.asarray(v[mask]) for k, v in s.items()})
+        assert parts, f"episode {episode} not in {self.path}"
+        out = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+        order = np.argsort(out["step"], kind="stable")
+        return {k: v[order] for k, v in out.items()}
+
+    def metrics(self):
+        """Per-episode metrics with the same definitions as eval/evaluate.py."""
+        cols = {k: self.column(k) for k in ("episode", "step", "reward", "coverage", "collisions", "effort")}
+        live = cols["step"] > 0
+        ids, inv = np.unique(cols["episode"][live], return_inverse=True)
+        steps = np.bincount(inv, minlength=len(ids))
+        L = self.meta.get("n_agents", 1)
+
+        def total(v):
+            return np.bincount(inv, weights=v[live], minlength=len(ids))
+
+        # Coverage at each episode's last step
+        order = np.lexsort((cols["step"][live], inv))
+        group = inv[order]
+        last = cols["coverage"][live][order[np.r_[group[1:] != group[:-1], True]]] if len(group) else np.zeros(0)
+        return {
+            "episode": ids,
+            "return": total(cols["reward"].sum(axis=1)),
+            "coverage_rate": total(cols["coverage"]) / np.maximum(1, steps * L),
+            "final_coverage_rate": last / max(1, L),
+            "collisions": total(cols["collisions"]),
+            "effort": total(cols["effort"]),
+            "steps": steps,
+        }
+
+
+def render_episode(log, episode, out_path, fps=20, size=700, workers=0):
+    from eval.render import render_video
+    ep = log.episode(episode)
+    return render_video(ep["agent_pos"], ep["landmark_pos"], out_path, fps=fps, size=size, workers=workers)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Summarize or render a rollout log (no Ray / policy needed)")
+    ap.add_argument("path", help="log directory (evaluate.py --record_dir, train.record_rollouts)")
+    ap.add_argument("--video", type=int, default=None, help="episode id to render")
+    ap.add_argument("--out", type=str, default="replay.mp4")
+    ap.add_argument("--fps", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=0, help="render processes (0 = all cores)")
+    args = ap.parse_args()
+
+    log = RolloutLog(args.path)
+    m = log.metrics()
+    print(f"{args.path}: {len(log)} rows in {len(log.shards)} shards, {len(m['episode'])} episodes")
+    for k in ("return", "coverage_rate", "final_coverage_rate", "collisions", "effort"):
+        print(f"  {k:<20} {m[k].mean():10.4f}")
+    if args.video is not None:
+        frames = render_episode(log, args.video, args.out, fps=args.fps, workers=args.workers)
+        print(f"Saved {args.out} with {frames} frames")
@@ -0,0 +1,137 @@
+import hashlib, io, json, os
+import pandas as pd
+
+# Canonical column -> progress.csv candidates (first present wins). Only these
+# columns are ever parsed.
+COLUMNS = {
+    "iteration": ["training_iteration", "iteration", "episodes_total"],
+    "reward": [
+        "episode_reward_mean",
+        "episode_return_mean",
+        "env_runners/episode_return_mean",
+        "env_runners/episode_reward_mean",
+    ],
+    "steps": [
+        "env_runners/num_env_steps_sampled_this_iter",
+        "num_env_steps_sampled_this_iter",
+        "env_runners/num_env_steps_sampled",  # new API stack: per iteration
+    ],
+    "batch": ["train_batch_size", "config/train_batch_size"],
+}
+
+try:
+    import pyarrow  # noqa: F401
+    _EXT = ".parquet"
+except Exception:  # pragma: no cover - pyarrow ships with ray[rllib]
+    _EXT = ".pkl"
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        return f.readline()
+
+
+def _resolve(header_line):
+    names = pd.read_csv(io.BytesIO(header_line), nrows=0).columns
+    return {canon: next((c for c in cands if c in names), None) for canon, cands in COLUMNS.items()}
+
+
+def _parse(header_line, body, sources):
+    wanted = {src: canon for canon, src in sources.items() if src}
+    if not body.strip():
+        df = pd.DataFrame(columns=list(COLUMNS), dtype="float64")
+    else:
+        df = pd.read_csv(io.BytesIO(header_line + body), usecols=list(wanted), low_memory=False).rename(columns=wanted)
+    out = pd.DataFrame(index=df.index)
+    for canon in COLUMNS:
+        out[canon] = pd.to_numeric(df[canon], errors="coerce") if canon in df else float("nan")
+    return out.astype("float64")
+
+
+class RunStore:
+    """Columnar cache of the few ``progress.csv`` columns the plots need.
+
+    Each CSV is cached as ``<cache_dir>/<key>.parquet`` with a JSON sidecar
+    holding its mtime, size and the byte offset parsed so far. Unchanged files
+    are served from the cache; grown files (RLlib appends one row per
+    iteration) only have the new complete lines parsed. Anything else, e.g. a
+    rewritten header, is parsed again from scratch.
+    """
+
+    def __init__(self, cache_dir="runs/.cache"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.stats = {"cached": 0, "appended": 0, "parsed": 0}
+
+    def _paths(self, csv_path):
+        key = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()[:16]
+        base = os.path.join(self.cache_dir, key)
+        return base + _EXT, base + ".json"
+
+    def _read_table(self, path):
+        return pd.read_parquet(path) if _EXT == ".parquet" else pd.read_pickle(path)
+
+    def _write_table(self, df, path):
+        tmp = path + ".tmp"
+        if _EXT == ".parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, path)
+
+    def load(self, csv_path):
+        """Canonical columns (iteration, reward, steps, batch) of one run."""
+        table_path, meta_path = self._paths(csv_path)
+        st = os.stat(csv_path)
+        meta = None
+        if os.path.exists(meta_path) and os.path.exists(table_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        if meta and meta.get("columns") != COLUMNS:
+            meta = None  # column mapping changed; re-parse
+        if meta and meta["mtime"] == st.st_mtime and meta["size"] == st.st_size:
+            self.stats["cached"] += 1
+            return self._read_table(table_path)
+
+        header = _read_header(csv_path)
+        if meta and st.st_size >= meta["offset"] and meta["header"] == header.decode(errors="replace"):
+            cached = self._read_table(table_path)
+            offset = meta["offset"]
+            sources = meta["sources"]
+            self.stats["appended"] += 1
+        else:
+            cached = None
+            offset = len(header)
+            sources = _resolve(header)
+            self.stats["parsed"] += 1
+
+        with open(csv_path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read()
+        # Only complete lines; a row being written stays for the next call
+        body = chunk[: chunk.rfind(b"\n") + 1]
+        new = _parse(header, body, sources)
+        df = new if cached is None else pd.concat([cached, new], ignore_index=True)
+
+        self._write_table(df, table_path)
+        with open(meta_path, "w") as f:
+            json.dump({
+                "csv": os.path.abspath(csv_path),
+                "mtime": st.st_mtime,
+                "size": st.st_size,
+                "offset": offset + len(body),
+                "header": header.decode(errors="replace"),
+                "sources": sources,
+                "columns": COLUMNS,
+            }, f)
+        return df
+
+    def load_all(self, csv_paths):
+        """All runs in order with a ``run`` column (the run directory, unique per CSV)."""
+        frames = []
+        for p in csv_paths:
+            df = self.load(p)
+            frames.append(df.assign(run=os.path.dirname(os.path.abspath(p))))
+        if not frames:
+            return pd.DataFrame(columns=list(COLUMNS) + ["run"])
+        return pd.concat(frames, ignore_index=True)
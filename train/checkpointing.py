@@ -0,0 +1,143 @@
+import json, math, os, shutil, threading, time
+
+
+def write_pointers(ckpt_dir, base_dir):
+    """Atomically point ``<base>/latest_checkpoint{,_path.txt}`` at ``ckpt_dir``."""
+    os.makedirs(base_dir, exist_ok=True)
+    latest_txt = os.path.join(base_dir, "latest_checkpoint_path.txt")
+    tmp = latest_txt + f".tmp{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(ckpt_dir + "\n")
+    os.replace(tmp, latest_txt)
+    latest_link = os.path.join(base_dir, "latest_checkpoint")
+    tmp_link = latest_link + f".tmp{os.getpid()}"
+    try:
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(ckpt_dir, tmp_link)
+        os.replace(tmp_link, latest_link)  # rename(2) swaps the link atomically
+    except OSError:
+        pass  # e.g. no symlink support; the .txt pointer is authoritative
+    return latest_txt
+
+
+class CheckpointManager:
+    """Periodic, optionally asynchronous checkpoints with retention.
+
+    ``maybe_save`` is called after every ``train()``. When ``every_iters``
+    iterations or ``every_s`` seconds have passed it writes the state with
+    ``algo.save_to_path`` into a ``.tmp`` directory on the calling thread
+    (``save_to_path`` walks the live env runners, learners and connectors,
+    which is not safe alongside ``train()``). Renaming it into place, moving
+    the pointers and retention run on a background thread, so training
+    continues while old checkpoints are deleted. Retention keeps the
+    ``keep_last`` newest plus the ``keep_best``
+    highest-reward checkpoints of this run and deletes the rest.
+    """
+
+    def __init__(self, ckpt_dir, pointer_dir, every_iters=0, every_s=0.0, keep_last=3, keep_best=1,
+                 background=True, recorder=None):
+        self.ckpt_dir = os.path.abspath(ckpt_dir)
+        self.pointer_dir = os.path.abspath(pointer_dir)
+        self.every_iters = int(every_iters or 0)
+        self.every_s = float(every_s or 0)
+        self.keep_last = max(1, int(keep_last))
+        self.keep_best = max(0, int(keep_best))
+        self.background = background
+        self.recorder = recorder
+        self.entries = []  # {"path", "iteration", "reward", "time"} of this run, oldest first
+        self.latest = None
+        self._last_iter = 0
+        self._last_time = time.time()
+        self._thread = None
+        os.makedirs(self.ckpt_dir, exist_ok=True)
+
+    def due(self, iteration):
+        if self.every_iters and iteration - self._last_iter >= self.every_iters:
+            return True
+        return bool(self.every_s and time.time() - self._last_time >= self.every_s)
+
+    def maybe_save(self, algo, iteration, reward=None):
+        if not self.due(iteration):
+            return None
+        if self._thread is not None and self._thread.is_alive():
+            # Previous write still running: try again next iteration rather than queue up
+            return None
+        return self.save(algo, iteration, reward, block=not self.background)
+
+    def save(self, algo, iteration, reward=None, block=True):
+        self.wait()
+        self._last_iter, self._last_time = iteration, time.time()
+        path = os.path.join(self.ckpt_dir, f"checkpoint_{iteration:06d}")
+        entry = {"path": path, "iteration": iteration, "reward": reward, "time": time.time()}
+        t0 = time.time()
+        tmp = path + ".tmp"
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            algo.save_to_path(tmp)
+        except Exception as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            print(f"Warning: checkpoint at iteration {iteration} failed: {e}")
+            return None
+        save_s = time.time() - t0
+        if block:
+            self._finish(entry, t0, save_s)
+        else:
+            self._thread = threading.Thread(target=self._finish, args=(entry, t0, save_s), daemon=True)
+            self._thread.start()
+        return path
+
+    def _finish(self, entry, t0, save_s):
+        try:
+            shutil.rmtree(entry["path"], ignore_errors=True)
+            os.replace(entry["path"] + ".tmp", entry["path"])
+            write_pointers(entry["path"], self.pointer_dir)
+        except Exception as e:
+            shutil.rmtree(entry["path"] + ".tmp", ignore_errors=True)
+            print(f"Warning: checkpoint at iteration {entry['iteration']} failed: {e}")
+            return
+        self.latest = entry["path"]
+        self.entries = [e for e in self.entries if e["path"] != entry["path"]] + [entry]
+        removed = self._apply_retention()
+        self._write_index()
+        if self.recorder is not None:
+            self.recorder.event(
+                "checkpoint", iteration=entry["iteration"], path=entry["path"], save_s=save_s,
+                checkpoint_s=time.time() - t0, background=threading.current_thread() is not threading.main_thread(),
+                removed=removed,
+            )
+
+    def _scored(self):
+        # No reward or NaN (no episode finished that iteration) can't rank: sorted/max on NaN is order-dependent
+        return [e for e in self.entries if e["reward"] is not None and math.isfinite(e["reward"])]
+
+    def _apply_retention(self):
+        keep = {e["path"] for e in self.entries[-self.keep_last:]}
+        scored = self._scored()
+        keep |= {e["path"] for e in sorted(scored, key=lambda e: e["reward"], reverse=True)[: self.keep_best]}
+        removed = [e["path"] for e in self.entries if e["path"] not in keep]
+        for p in removed:
+            shutil.rmtree(p, ignore_errors=True)
+        self.entries = [e for e in self.entries if e["path"] in keep]
+        return removed
+
+    def _write_index(self):
+        index = os.path.join(self.ckpt_dir, "checkpoints.json")
+        tmp = index + ".tmp"
+        best = max(self._scored(), key=lambda e: e["reward"], default=None)
+        with open(tmp, "w") as f:
+            json.dump({"latest": self.latest, "best": best and best["path"], "checkpoints": self.entries}, f, indent=2)
+        os.replace(tmp, index)
+
+    def wait(self):
+        """Block until an in-flight background write has finished."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self, algo=None, iteration=None, reward=None):
+        """Final synchronous checkpoint (if ``algo`` is given) after pending writes."""
+        self.wait()
+        if algo is not None and (self.latest is None or iteration != self._last_iter):
+            self.save(algo, iteration, reward, block=True)
+        return self.latest
@@ -0,0 +1,19 @@
+import torch
+from ray.rllib.algorithms.ppo.torch.ppo_torch_learner import PPOTorchLearner
+
+
+class CPUPPOTorchLearner(PPOTorchLearner):
+    """PPO torch learner that pins its intra-op thread count.
+
+    ``learner_config_dict["torch_threads"]`` is applied in every learner
+    process (the driver when ``num_learners: 0``, each learner actor
+    otherwise), so several local learners don't oversubscribe the cores.
+    With ``num_learners > 1`` RLlib wraps the module in DDP (gloo on CPU) and
+    gradients are averaged across learners every minibatch.
+    """
+
+    def build(self):
+        threads = int((self.config.learner_config_dict or {}).get("torch_threads", 0) or 0)
+        if threads:
+            torch.set_num_threads(threads)
+        super().build()
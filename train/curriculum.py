@@ -0,0 +1,133 @@
+import argparse, json, os, time
+import numpy as np
+from ray.rllib.algorithms import ppo as ppo_mod
+from ray.tune.logger import UnifiedLogger
+from train.train_rllib_ppo import load_cfg, build_config, mean_reward, iter_steps, stop_algo
+from train.instrumentation import IterationRecorder
+from train.checkpointing import CheckpointManager
+from eval.evaluate import RLModulePolicy, run_episodes
+
+# Curriculum over agent count: train shared_policy at N = stages[0], then
+# warm-start each larger stage from the previous stage's weights. All stages
+# use the padded observation encoding (env.max_agents, envs/obs_encoding.py)
+# so the network input size never changes.
+
+
+def live_coverage(algo, env_cfg, episodes=64, seed=10_000):
+    """Mean coverage rate of the current shared_policy (explore=False)."""
+    module = algo.get_module("shared_policy")
+    training = module.training
+    try:
+        # RLModulePolicy puts the module in eval mode; this is the learner's live copy
+        per_episode = run_episodes(RLModulePolicy(module=module), np.arange(seed, seed + episodes), env_cfg)
+    finally:
+        module.train(training)
+    return float(np.mean(per_episode["coverage_rate"])), float(np.mean(per_episode["return"]))
+
+
+def run_stage(name, env_cfg, trn, stage_dir, pointer_dir, max_iters, target, eval_every, eval_episodes,
+              init_weights=None, overrides=None):
+    def _logger_creator(cfg):
+        os.makedirs(stage_dir, exist_ok=True)
+        return UnifiedLogger(cfg, stage_dir, loggers=None)
+
+    algo_cfg = build_config(env_cfg, trn, **(overrides or {}))
+    algo = ppo_mod.PPO(config=algo_cfg.to_dict(), logger_creator=_logger_creator)
+    if init_weights is not None:
+        # set_weights updates the learner and syncs the env runners
+        algo.set_weights(init_weights)
+    recorder = IterationRecorder(stage_dir)
+    train_s = 0.0
+    reached_s = None
+    coverage = None
+    reward = None
+    iteration = 0
+    for iteration in range(1, max_iters + 1):
+        t0 = time.time()
+        result = algo.train()
+        wall = time.time() - t0
+        train_s += wall
+        reward = mean_reward(result)
+        recorder.record(iteration, result, wall, env_steps=iter_steps(result), mean_reward=reward,
+                        n_agents=env_cfg["n_agents"], stage=name)
+        if iteration % eval_every == 0 or iteration == max_iters:
+            coverage, eval_return = live_coverage(algo, env_cfg, eval_episodes)
+            recorder.event("curriculum_eval", iteration=iteration, train_s=train_s,
+                           coverage_rate=coverage, eval_return=eval_return)
+            print(f"[{name}] N={env_cfg['n_agents']} iter={iteration} train_s={train_s:.0f} "
+                  f"coverage_rate={coverage:.3f} (target {target})", flush=True)
+            if coverage >= target:
+                reached_s = train_s
+                break
+    weights = algo.get_weights(["shared_policy"])
+    ckpt = CheckpointManager(stage_dir, pointer_dir, recorder=recorder).close(algo, iteration, reward)
+    stop_algo(algo)
+    return {
+        "stage": name, "n_agents": env_cfg["n_agents"], "iterations": iteration, "train_s": train_s,
+        "coverage_rate": coverage, "reached_target": reached_s is not None, "checkpoint": ckpt,
+    }, weights
+
+
+if __name__ == "__main__":
+    cfg = load_cfg()
+    cur = dict(cfg.get("curriculum") or {})
+    ap = argparse.ArgumentParser(description="Agent-count curriculum with weight transfer")
+    ap.add_argument("--stages", type=int, nargs="+", default=cur.get("stages", [3, 6, 10]), help="n_agents per stage")
+    ap.add_argument("--max_agents", type=int, default=cur.get("max_agents", 0), help="padded width (0 = last stage)")
+    ap.add_argument("--target_coverage", type=float, default=cur.get("target_coverage", 0.5))
+    ap.add_argument("--max_iters_per_stage", type=int, default=cur.get("max_iters_per_stage", 50))
+    ap.add_argument("--eval_every", type=int, default=cur.get("eval_every", 5))
+    ap.add_argument("--eval_episodes", type=int, default=cur.get("eval_episodes", 64))
+    ap.add_argument("--no_scratch", action="store_true", help="skip the from-scratch baseline at the last stage")
+    args = ap.parse_args()
+
+    trn = cfg["train"]
+    # Same speed toggles as train_rllib_ppo.py
+    overrides = {
+        "num_workers": int(os.getenv("FAST_NUM_WORKERS", trn["num_workers"])),
+        "train_batch_size": int(os.getenv("FAST_TRAIN_BATCH", trn["train_batch_size"])),
+        "rollout_fragment_length": int(os.getenv("FAST_ROLLOUT_LEN", trn["rollout_fragment_length"])),
+        "small_model": os.getenv("FAST_SMALL_MODEL", "0") == "1",
+    }
+    stages = list(args.stages)
+    max_agents = args.max_agents or max(stages)
+    # Padded-observation checkpoints: pointers stay in the curriculum dir, not runs/latest_checkpoint
+    logdir = os.path.join(os.path.abspath(trn.get("local_dir", "runs")), f"CURRICULUM_{time.strftime('%Y-%m-%d_%H-%M-%S')}")
+
+    report = {"stages": [], "target_coverage": args.target_coverage, "max_agents": max_agents}
+    weights = None
+    total_s = 0.0
+    for k, n in enumerate(stages):
+        env_cfg = dict(cfg["env"], n_agents=n, max_agents=max_agents)
+        # Intermediate stages stop at the target too; the clock keeps running across stages
+        res, weights = run_stage(
+            f"stage{k}", env_cfg, trn, os.path.join(logdir, f"stage{k}_n{n}"), logdir,
+            args.max_iters_per_stage, args.target_coverage, args.eval_every, args.eval_episodes,
+            init_weights=weights, overrides=overrides,
+        )
+        total_s += res["train_s"]
+        res["cumulative_train_s"] = total_s
+        report["stages"].append(res)
+    last = report["stages"][-1]
+    report["curriculum_time_to_target_s"] = total_s if last["reached_target"] else None
+
+    if not args.no_scratch:
+        # Same final N and the whole curriculum's iteration budget, no warm start
+        env_cfg = dict(cfg["env"], n_agents=stages[-1], max_agents=max_agents)
+        res, _ = run_stage(
+            "scratch", env_cfg, trn, os.path.join(logdir, f"scratch_n{stages[-1]}"), logdir,
+            args.max_iters_per_stage * len(stages), args.target_coverage, args.eval_every, args.eval_episodes,
+            overrides=overrides,
+        )
+        report["scratch"] = res
+        report["scratch_time_to_target_s"] = res["train_s"] if res["reached_target"] else None
+        if report["curriculum_time_to_target_s"] and report["scratch_time_to_target_s"]:
+            report["speedup"] = report["scratch_time_to_target_s"] / report["curriculum_time_to_target_s"]
+
+    with open(os.path.join(logdir, "curriculum_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Curriculum {stages}: time to coverage {args.target_coverage} at N={stages[-1]}: "
+          f"{report['curriculum_time_to_target_s']}")
+    if "scratch" in report:
+        print(f"From scratch: {report['scratch_time_to_target_s']}  speedup: {report.get('speedup')}")
+    print("Wrote", os.path.join(logdir, "curriculum_report.json"))
@@ -0,0 +1,181 @@
+import argparse, json, multiprocessing as mp, os, queue, time
+import numpy as np
+
+# Continuous deterministic evaluation next to training. The trainer hands the
+# worker process a NumPy snapshot of shared_policy's actor (or a checkpoint
+# path) after an iteration and moves on; the worker evaluates the newest one
+# on a fixed seed set with explore=False and appends a row per evaluation to
+# <logdir>/eval_metrics.jsonl. Snapshots that arrive while an evaluation is
+# running are superseded by the latest one, so the worker never falls behind
+# and the learner never waits for it.
+
+
+def module_snapshot(module, **meta):
+    """Picklable NumPy copy of a live RLModule's deterministic actor."""
+    from eval.export_policy import snapshot_actor
+    model_cfg = getattr(module, "model_config", None) or {}
+    if not isinstance(model_cfg, dict):
+        model_cfg = vars(model_cfg)
+    return snapshot_actor(module.state_dict(), model_cfg, **meta)
+
+
+def evaluate_policy(policy, env_cfg, seeds, max_cycles=25):
+    """Summary (mean and ci95 per metric, as in eval/evaluate.py) over ``seeds``, one batch of worlds."""
+    from eval.evaluate import run_episodes, summarize
+    t0 = time.time()
+    summary = summarize(run_episodes(policy, seeds, env_cfg, max_cycles=max_cycles))
+    summary["eval_s"] = time.time() - t0
+    return summary
+
+
+def _policy(source, payload):
+    if source == "weights":
+        from eval.inference import NumpyPolicy
+        return NumpyPolicy(*payload)
+    from eval.evaluate import load_policy
+    return load_policy(payload)
+
+
+def _worker(inbox, outbox, path, env_cfg, seeds, max_cycles, nice):
+    if nice:
+        try:
+            os.nice(nice)  # spare cycles only: the learner keeps priority
+        except OSError:
+            pass
+    stop = False
+    while not stop:
+        item = inbox.get()
+        skipped = 0
+        # Only the newest snapshot matters; drop the ones it supersedes
+        while True:
+            try:
+                newer = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if newer is None:
+                stop = True
+            else:
+                item, skipped = newer, skipped + 1
+        if item is None:
+            break
+        iteration, source, payload = item
+        try:
+            summary = evaluate_policy(_policy(source, payload), env_cfg, seeds, max_cycles)
+        except Exception as e:
+            summary = {"error": repr(e)}
+        row = {"iteration": iteration, "time": time.time(), "source": source, "skipped": skipped,
+               "episodes": len(seeds), "seed": int(seeds[0])}
+        row.update({k: v["mean"] if isinstance(v, dict) else v for k, v in summary.items()})
+        with open(path, "a") as f:
+            f.write(json.dumps(row) + "\n")
+        outbox.put(row)
+
+
+class EvalWorker:
+    """Background process that evaluates policy snapshots with ``explore=False``.
+
+    ``submit`` and ``poll`` never block: ``submit`` enqueues a snapshot (the
+    worker only evaluates the newest pending one) and ``poll`` returns the
+    rows finished since the last call. Episodes use seeds ``seed ..
+    seed + episodes - 1`` every time, so rows are directly comparable.
+    """
+
+    def __init__(self, logdir, env_cfg, episodes=64, seed=10_000, max_cycles=25, nice=10, start_method="spawn"):
+        ctx = mp.get_context(start_method)
+        os.makedirs(logdir, exist_ok=True)
+        self.path = os.path.join(logdir, "eval_metrics.jsonl")
+        self.seeds = np.arange(seed, seed + episodes)
+        self._inbox, self._outbox = ctx.Queue(), ctx.Queue()
+        self._proc = ctx.Process(
+            target=_worker, args=(self._inbox, self._outbox, self.path, dict(env_cfg), self.seeds, max_cycles, nice),
+            daemon=True,
+        )
+        self._proc.start()
+        self.submitted = 0
+
+    def submit(self, iteration, module):
+        """Queue a snapshot of a live RLModule (e.g. ``algo.get_module("shared_policy")``)."""
+        self._inbox.put((iteration, "weights", module_snapshot(module)))
+        self.submitted += 1
+
+    def submit_checkpoint(self, iteration, path):
+        self._inbox.put((iteration, "checkpoint", path))
+        self.submitted += 1
+
+    def poll(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._outbox.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def close(self, timeout=300):
+        """Let the worker finish the newest pending snapshot, then stop it; returns the remaining rows."""
+        self._inbox.put(None)
+        rows = []
+        deadline = time.time() + timeout
+        while self._proc.is_alive() and time.time() < deadline:
+            try:
+                rows.append(self._outbox.get(timeout=0.5))
+            except queue.Empty:
+                pass
+        rows += self.poll()
+        self._proc.join(timeout=5)
+        if self._proc.is_alive():
+            self._proc.terminate()
+        return rows
+
+
+def format_row(row):
+    if "error" in row:
+        return f"[eval] iter={row['iteration']} failed: {row['error']}"
+    return (f"[eval] iter={row['iteration']} coverage_rate={row['coverage_rate']:.3f} "
+            f"final_coverage={row['final_coverage_rate']:.3f} collisions={row['collisions']:.2f} "
+            f"return={row['return']:.2f} ({row['eval_s']:.1f}s, skipped {row['skipped']})")
+
+
+def watch(run_dir, env_cfg, episodes=64, seed=10_000, max_cycles=25, poll_s=10.0, once=False):
+    """Evaluate every checkpoint listed in ``<run_dir>/checkpoints.json`` as it appears."""
+    seeds = np.arange(seed, seed + episodes)
+    path = os.path.join(run_dir, "eval_metrics.jsonl")
+    index = os.path.join(run_dir, "checkpoints.json")
+    done = set()
+    while True:
+        entries = []
+        if os.path.exists(index):
+            with open(index) as f:
+                entries = json.load(f)["checkpoints"]
+        for e in entries:
+            if e["path"] in done or not os.path.exists(e["path"]):
+                continue
+            done.add(e["path"])
+            try:
+                summary = evaluate_policy(_policy("checkpoint", e["path"]), env_cfg, seeds, max_cycles)
+            except FileNotFoundError:
+                continue  # removed by retention while we were busy
+            row = {"iteration": e["iteration"], "time": time.time(), "source": "checkpoint", "skipped": 0,
+                   "episodes": episodes, "seed": seed, "checkpoint": e["path"]}
+            row.update({k: v["mean"] if isinstance(v, dict) else v for k, v in summary.items()})
+            with open(path, "a") as f:
+                f.write(json.dumps(row) + "\n")
+            print(format_row(row), flush=True)
+        if once:
+            return
+        time.sleep(poll_s)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Evaluate each new checkpoint of a run (explore=False, fixed seeds)")
+    ap.add_argument("run_dir", help="training log dir with checkpoints.json (runs/PPO_...)")
+    ap.add_argument("--episodes", type=int, default=64)
+    ap.add_argument("--seed", type=int, default=10_000, help="first episode seed")
+    ap.add_argument("--max_cycles", type=int, default=25)
+    ap.add_argument("--poll_s", type=float, default=10.0)
+    ap.add_argument("--once", action="store_true", help="evaluate the current checkpoints and exit")
+    args = ap.parse_args()
+
+    import yaml
+    with open("config.yaml") as f:
+        env_cfg = yaml.safe_load(f)["env"]
+    watch(args.run_dir, env_cfg, args.episodes, args.seed, args.max_cycles, args.poll_s, args.once)
@@ -0,0 +1,188 @@
+import cProfile, json, os, sys, threading, time
+from collections import Counter
+from ray.rllib.algorithms.callbacks import DefaultCallbacks
+from envs.timing import PHASES
+
+PROFILE_MODES = ("off", "cprofile", "sample")
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+class StackSampler:
+    """py-spy style sampling profiler: a daemon thread snapshots the target
+    thread's stack every ``interval`` seconds and counts collapsed stacks.
+    ``dump`` writes ``frame;frame;frame count`` lines (flamegraph format)."""
+
+    def __init__(self, interval=0.01, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for stack, n in self.counts.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+class PhaseTimingCallbacks(DefaultCallbacks):
+    """Reports env-side phase timings and memory from each env runner.
+
+    Per ``sample()`` call it drains ``envs.timing.PHASES`` into the runner's
+    metrics under ``env_runners/phase_timers/<phase>_s`` (summed per
+    iteration) and logs the runner's peak RSS. When ``PROFILE_DIR`` is set
+    (see ``phase_callbacks``) it also profiles the runner and dumps stats
+    there every ``PROFILE_DUMP_EVERY`` samples.
+    """
+
+    PROFILE_MODE = "off"
+    PROFILE_DIR = None
+    PROFILE_DUMP_EVERY = 10
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._profiler = None
+        self._num_samples = 0
+
+    def on_sample_end(self, *, env_runner=None, metrics_logger=None, samples=None, worker=None, **kwargs):
+        phases = PHASES.drain()
+        PHASES.idle()
+        if metrics_logger is not None:
+            for name, seconds in phases.items():
+                metrics_logger.log_value(("phase_timers", f"{name}_s"), seconds, reduce="sum", clear_on_reduce=True)
+            rss = peak_rss_mb()
+            if rss is not None:
+                metrics_logger.log_value("peak_rss_mb", rss, reduce="max", clear_on_reduce=True)
+        self._profile_tick()
+
+    def _profile_tick(self):
+        if self.PROFILE_MODE == "off" or not self.PROFILE_DIR:
+            return
+        if self._profiler is None:
+            os.makedirs(self.PROFILE_DIR, exist_ok=True)
+            if self.PROFILE_MODE == "cprofile":
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+            else:
+                self._profiler = StackSampler().start()
+        self._num_samples += 1
+        if self._num_samples % self.PROFILE_DUMP_EVERY == 0:
+            ext = "prof" if self.PROFILE_MODE == "cprofile" else "folded"
+            path = os.path.join(self.PROFILE_DIR, f"env_runner_{os.getpid()}.{ext}")
+            if self.PROFILE_MODE == "cprofile":
+                self._profiler.dump_stats(path)
+            else:
+                self._profiler.dump(path)
+
+
+def phase_callbacks(profile_mode="off", profile_dir=None):
+    """Callbacks class with the profiling hook configured (pickled to runners)."""
+    assert profile_mode in PROFILE_MODES, f"profile mode must be one of {PROFILE_MODES}"
+
+    class _PhaseTimingCallbacks(PhaseTimingCallbacks):
+        PROFILE_MODE = profile_mode
+        PROFILE_DIR = profile_dir
+
+    return _PhaseTimingCallbacks
+
+
+class LearnerTimer:
+    """Exact learner update time per iteration.
+
+    RLlib's ``learner_update_timer`` is an EMA across iterations; this wraps
+    the algorithm's ``learner_group.update_from_episodes`` and sums wall time
+    until ``drain``.
+    """
+
+    def __init__(self, algo):
+        self.seconds = 0.0
+        group = algo.learner_group
+        update = group.update_from_episodes
+
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return update(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - t0
+
+        group.update_from_episodes = timed
+
+    def drain(self):
+        seconds, self.seconds = self.seconds, 0.0
+        return seconds
+
+
+class IterationRecorder:
+    """Appends one JSON line per training iteration to ``<logdir>/metrics.jsonl``."""
+
+    def __init__(self, logdir, filename="metrics.jsonl"):
+        os.makedirs(logdir, exist_ok=True)
+        self.path = os.path.join(logdir, filename)
+
+    def record(self, iteration, result, wall_s, env_steps=None, learner_s=None, **extra):
+        runners = result.get("env_runners", {}) if isinstance(result, dict) else {}
+        phases = runners.get("phase_timers", {}) or {}
+        timers = result.get("timers", {}) if isinstance(result, dict) else {}
+        learners = (result.get("learners", {}) if isinstance(result, dict) else {}).get("__all_modules__", {})
+        trained = learners.get("num_module_steps_trained")
+        row = {
+            "iteration": iteration,
+            "time": time.time(),
+            "wall_s": wall_s,
+            "env_steps": env_steps,
+            "env_steps_per_s": (env_steps / wall_s) if env_steps and wall_s > 0 else None,
+            "env_step_s": phases.get("env_step_s"),
+            "env_reset_s": phases.get("env_reset_s"),
+            "reward_shaping_s": phases.get("reward_shaping_s"),
+            "policy_inference_s": phases.get("policy_inference_s"),
+            # RLlib's own timers (smoothed across iterations by RLlib)
+            "rllib_sampling_s": timers.get("env_runner_sampling_timer"),
+            "rllib_learner_update_s": timers.get("learner_update_timer"),
+            "rllib_sync_weights_s": timers.get("synch_weights"),
+            # Agent-steps of the train batch per second of learner update (all epochs), from LearnerTimer
+            "learner_update_s": learner_s,
+            "learner_samples_per_s": (trained / learner_s) if trained and learner_s else None,
+            "peak_rss_mb": peak_rss_mb(),
+            "env_runner_peak_rss_mb": runners.get("peak_rss_mb"),
+        }
+        # Per-component reward pipeline time (reward_<component>_s, reward_geometry_s)
+        row.update({k: v for k, v in phases.items() if k.startswith("reward_") and k not in row})
+        row.update(extra)
+        self._append(row)
+        return row
+
+    def event(self, name, **fields):
+        # Non-iteration rows, e.g. checkpoint timings
+        self._append({"event": name, "time": time.time(), **fields})
+
+    def _append(self, row):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(row) + "\n")
@@ -0,0 +1,181 @@
+import math, mmap, os, threading, time
+import numpy as np
+
+# Per-iteration fields published by the trainer (float64, NaN = missing)
+FIELDS = (
+    "iteration", "time", "mean_reward", "env_steps", "env_steps_total", "env_steps_per_s", "wall_s",
+    "env_step_s", "env_reset_s", "reward_shaping_s", "policy_inference_s",
+    "rllib_sampling_s", "rllib_learner_update_s", "learner_samples_per_s", "peak_rss_mb",
+)
+
+MAGIC = int.from_bytes(b"MGMRING1", "little")
+_HEADER_WORDS = 8  # magic, version, nfields, capacity, count, closed, reserved x2
+_NAMES_BYTES = 1024
+_DATA_OFFSET = _HEADER_WORDS * 8 + _NAMES_BYTES
+_COUNT, _CLOSED = 4, 5
+
+
+class MetricsRing:
+    """Append-only ring buffer of metric rows in a memory-mapped file.
+
+    The trainer writes a row into slot ``count % capacity`` and only then
+    bumps ``count``, so a reader polling ``count`` never sees a half-written
+    row unless it fell more than ``capacity`` rows behind. Publishing is a
+    few stores into shared memory: no syscalls, locks or serialization.
+    """
+
+    def __init__(self, path, fields=FIELDS, capacity=4096):
+        self.path = path
+        self.fields = tuple(fields)
+        names = ",".join(self.fields).encode()
+        assert len(names) < _NAMES_BYTES, "too many metric fields"
+        size = _DATA_OFFSET + capacity * len(self.fields) * 8
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.truncate(size)
+        self._fh = open(path, "r+b")
+        self._mm = mmap.mmap(self._fh.fileno(), size)
+        self.header = np.frombuffer(self._mm, dtype=np.uint64, count=_HEADER_WORDS)
+        self._mm[_HEADER_WORDS * 8:_HEADER_WORDS * 8 + len(names)] = names
+        self.data = np.frombuffer(self._mm, dtype=np.float64, offset=_DATA_OFFSET).reshape(capacity, len(self.fields))
+        self.data[:] = np.nan
+        self.header[:] = (MAGIC, 1, len(self.fields), capacity, 0, 0, 0, 0)
+        self.capacity = capacity
+
+    def publish(self, row):
+        count = int(self.header[_COUNT])
+        slot = self.data[count % self.capacity]
+        for i, name in enumerate(self.fields):
+            v = row.get(name)
+            slot[i] = float(v) if isinstance(v, (int, float)) else math.nan
+        self.header[_COUNT] = count + 1
+
+    def close(self):
+        if self._mm is None:
+            return
+        self.header[_CLOSED] = 1
+        self.header = self.data = None
+        self._mm.flush()
+        self._mm.close()
+        self._fh.close()
+        self._mm = None
+
+
+class MetricsReader:
+    """Tails a ``MetricsRing`` file from another process."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = np.frombuffer(self._mm, dtype=np.uint64, count=_HEADER_WORDS)
+        assert int(self.header[0]) == MAGIC, f"{path} is not a metrics ring"
+        nfields, self.capacity = int(self.header[2]), int(self.header[3])
+        names = bytes(self._mm[_HEADER_WORDS * 8:_DATA_OFFSET]).rstrip(b"\0").decode()
+        self.fields = tuple(names.split(","))[:nfields]
+        self.data = np.frombuffer(self._mm, dtype=np.float64, offset=_DATA_OFFSET).reshape(self.capacity, nfields)
+        self.seen = 0
+        self.dropped = 0
+
+    @property
+    def closed(self):
+        return bool(self.header[_CLOSED])
+
+    def read_new(self):
+        """Rows published since the last call, as dicts (oldest first)."""
+        count = int(self.header[_COUNT])
+        start = max(self.seen, count - self.capacity)
+        self.dropped += start - self.seen
+        rows = self.data[[i % self.capacity for i in range(start, count)]].copy()
+        # Slots the writer lapped while we copied are stale
+        lapped = int(self.header[_COUNT]) - self.capacity
+        if lapped > start:
+            rows = rows[lapped - start:]
+            self.dropped += lapped - start
+        self.seen = count
+        return [{k: (None if math.isnan(v) else float(v)) for k, v in zip(self.fields, r)} for r in rows]
+
+    def close(self):
+        self.header = self.data = None
+        self._mm.close()
+        self._fh.close()
+
+
+def prometheus_text(row, prefix="marl_"):
+    lines = []
+    for k, v in row.items():
+        if isinstance(v, (int, float)) and not math.isnan(v):
+            lines.append(f"{prefix}{k} {v}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusEndpoint:
+    """Serves the latest row as Prometheus text on ``/metrics`` (daemon thread)."""
+
+    def __init__(self, port, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        endpoint = self
+        self.latest = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = prometheus_text(endpoint.latest).encode()
+                self.send_response(200 if self.path.startswith("/metrics") else 404)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def publish(self, row):
+        # Swap the reference; the handler thread only ever reads it
+        self.latest = dict(row)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsStream:
+    """Trainer-side publisher: ``<logdir>/metrics.ring`` plus an optional HTTP endpoint."""
+
+    def __init__(self, logdir, http_port=0, capacity=4096):
+        self.ring = MetricsRing(os.path.join(logdir, "metrics.ring"), capacity=capacity)
+        self.http = PrometheusEndpoint(http_port) if http_port else None
+        if self.http:
+            print(f"Serving live metrics on http://127.0.0.1:{self.http.port}/metrics")
+
+    def publish(self, row):
+        self.ring.publish(row)
+        if self.http:
+            self.http.publish(row)
+
+    def close(self):
+        self.ring.close()
+        if self.http:
+            self.http.close()
+
+
+def follow(path, interval=1.0, idle_timeout=None):
+    """Yield batches of new rows until the trainer closes the ring (or goes idle)."""
+    reader = MetricsReader(path)
+    last = time.time()
+    try:
+        while True:
+            rows = reader.read_new()
+            if rows:
+                last = time.time()
+                yield rows
+            elif reader.closed:
+                return
+            elif idle_timeout and time.time() - last > idle_timeout:
+                return
+            time.sleep(interval)
+    finally:
+        reader.close()
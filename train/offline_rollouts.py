@@ -0,0 +1,450 @@
+import argparse, glob, hashlib, json, os, shutil, time
+import gymnasium as gym
+import numpy as np
+from eval.rollout_log import ShardWriter, ShardReader
+
+# Seed-sharded offline rollout collection on RLlibSpread.
+#
+# The seed range [first_seed, first_seed + episodes) is cut into chunks of
+# episodes_per_chunk consecutive seeds. Each chunk is one Ray task: it plays
+# its episodes with env.reset(seed=s) and writes one row per agent-step to
+# its own ShardWriter (prefix seeds_<first>_<last>, fixed-size .npy shards
+# plus index_<prefix>.json). A chunk's files depend only on its seeds, the
+# env config, the policy weights, the exploration noise and shard_rows --
+# not on the worker, node or number of workers -- so re-collecting any chunk
+# reproduces it byte for byte (dataset.json keeps a sha256 per chunk;
+# `verify` re-collects and compares). Tasks are spread over every CPU of the
+# local Ray instance, of a cluster (--address), or of --local_nodes
+# in-process nodes.
+#
+# `shard_dataset` streams the shards into a ray.data Dataset, one read task
+# per shard on the memory-mapped .npy files, and `bc_config` / `build_bc`
+# feed it to RLlib's offline API (BC on shared_policy's per-agent
+# transitions) without loading the dataset into RAM.
+
+ACT_DIM = 5
+
+
+def transition_fields(obs_dim):
+    return {
+        "episode": ((), np.int64),  # = episode seed
+        "step": ((), np.int32),
+        "agent": ((), np.int16),
+        "obs": ((obs_dim,), np.float32),
+        "action": ((ACT_DIM,), np.float32),  # as sent to the env: Box(0, 1)
+        "reward": ((), np.float32),
+        "next_obs": ((obs_dim,), np.float32),
+        "terminated": ((), np.bool_),
+        "truncated": ((), np.bool_),
+    }
+
+
+def chunk_prefix(first, last):
+    # Zero-padded so index files (and ShardReader's row order) sort by seed
+    return f"seeds_{first:010d}_{last:010d}"
+
+
+def chunks(first_seed, episodes, episodes_per_chunk):
+    return [(s, min(s + episodes_per_chunk, first_seed + episodes) - 1)
+            for s in range(first_seed, first_seed + episodes, episodes_per_chunk)]
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_digest(out_dir, prefix):
+    """sha256 over a chunk's index and every shard file, in a fixed order."""
+    h = hashlib.sha256()
+    paths = [os.path.join(out_dir, f"index_{prefix}.json")]
+    for shard in sorted(glob.glob(os.path.join(out_dir, f"{prefix}_*"))):
+        paths += sorted(glob.glob(os.path.join(shard, "*.npy"))) if os.path.isdir(shard) else [shard]
+    for p in paths:
+        h.update(os.path.relpath(p, out_dir).encode())
+        h.update(file_sha256(p).encode())
+    return h.hexdigest()
+
+
+def load_collect_policy(spec):
+    """``(kind, payload, sha256)`` for "random", an exported .npz/.pt or a checkpoint dir.
+
+    Checkpoints are read into a NumPy actor snapshot here, so workers never
+    build an RLModule and every chunk runs the same bits.
+    """
+    if not spec or spec == "random":
+        return "random", None, None
+    if os.path.isfile(spec):
+        return "exported", os.path.abspath(spec), file_sha256(spec)
+    from eval.export_policy import load_actor
+    from eval.leaderboard import weights_hash
+    return "weights", load_actor(spec), weights_hash(spec)
+
+
+def _make_policy(kind, payload):
+    if kind == "random":
+        return None
+    if kind == "exported":
+        from eval.inference import load_exported
+        return load_exported(payload)
+    from eval.inference import NumpyPolicy
+    return NumpyPolicy(*payload)
+
+
+def collect_chunk(out_dir, first, last, env_cfg, policy=("random", None, None), noise=0.0, shard_rows=4096):
+    """Play seeds ``first..last`` and write them as chunk ``seeds_<first>_<last>``; returns its summary."""
+    import torch
+    from train.rllib_env import RLlibSpread
+    torch.set_num_threads(1)  # one task per core; also keeps TorchScript policies bit-stable
+    kind, payload, policy_hash = policy
+    act = _make_policy(kind, payload)
+    prefix = chunk_prefix(first, last)
+    # Drop a partial chunk left behind by an interrupted run
+    for p in glob.glob(os.path.join(out_dir, f"{prefix}_*")) + glob.glob(os.path.join(out_dir, f"index_{prefix}.json")):
+        shutil.rmtree(p) if os.path.isdir(p) else os.remove(p)
+    env = RLlibSpread(dict(env_cfg))
+    ids = list(env.raw_env.possible_agents)
+    N = len(ids)
+    obs_dim = env.observation_space[ids[0]].shape[0]
+    meta = {"first_seed": first, "last_seed": last, "n_agents": N, "policy": kind, "policy_sha256": policy_hash,
+            "noise": noise, "env": {k: env_cfg[k] for k in sorted(env_cfg)}}
+    writer = ShardWriter(out_dir, transition_fields(obs_dim), shard_rows=shard_rows, prefix=prefix, meta=meta)
+    t0 = time.time()
+    agent_idx = np.arange(N, dtype=np.int16)
+    for seed in range(first, last + 1):
+        # Per-episode streams: a seed's actions do not depend on the chunk it falls in
+        rng = np.random.default_rng([seed, 1])
+        obs, _ = env.reset(seed=seed)
+        step = 0
+        while True:
+            o = np.stack([obs[a] for a in ids]).astype(np.float32)
+            if act is None:
+                a = rng.uniform(0.0, 1.0, (N, ACT_DIM))
+            else:
+                a = act.act(o)
+                if noise:
+                    a = a + noise * rng.standard_normal(a.shape)
+            a = np.clip(a, 0.0, 1.0).astype(np.float32)
+            nxt, rew, term, trunc, _ = env.step(dict(zip(ids, a)))
+            step += 1
+            writer.append(
+                episode=np.full(N, seed), step=np.full(N, step), agent=agent_idx, obs=o, action=a,
+                reward=np.array([rew[x] for x in ids], dtype=np.float32),
+                next_obs=np.stack([nxt[x] for x in ids]).astype(np.float32),
+                terminated=np.array([term[x] for x in ids]), truncated=np.array([trunc[x] for x in ids]),
+            )
+            obs = nxt
+            if term.get("__all__") or trunc.get("__all__"):
+                break
+    writer.close()
+    env.close()
+    return {"first_seed": first, "last_seed": last, "prefix": prefix, "rows": writer.rows,
+            "shards": len(writer.shards), "sha256": chunk_digest(out_dir, prefix), "collect_s": time.time() - t0}
+
+
+def _init_ray(address=None, local_nodes=0, cpus_per_node=0):
+    """Connect to ``address``, or start ``local_nodes`` Ray nodes on this machine (0 = one plain local instance)."""
+    import ray
+    if address:
+        ray.init(address=address)
+        return None
+    cpus = cpus_per_node or os.cpu_count() or 1
+    if local_nodes > 1:
+        from ray.cluster_utils import Cluster
+        cluster = Cluster(initialize_head=True, head_node_args={"num_cpus": cpus, "include_dashboard": False})
+        for _ in range(local_nodes - 1):
+            cluster.add_node(num_cpus=cpus)
+        ray.init(address=cluster.address)
+        return cluster
+    ray.init(num_cpus=cpus, include_dashboard=False)
+    return None
+
+
+def _complete(out_dir, prefix):
+    path = os.path.join(out_dir, f"index_{prefix}.json")
+    if not os.path.exists(path):
+        return False
+    with open(path) as f:
+        return json.load(f)["closed"]
+
+
+def _run_chunks(todo, out_dir, env_cfg, pol, noise, shard_rows, address=None, local_nodes=0, cpus_per_node=0):
+    """Yield ``(summary, node)`` per chunk as the Ray tasks finish (SPREAD over all nodes)."""
+    import ray
+    cluster = _init_ray(address, local_nodes, cpus_per_node)
+    try:
+        nodes = len([n for n in ray.nodes() if n["Alive"]])
+        cpus = int(ray.cluster_resources().get("CPU", 1))
+        print(f"Collecting {len(todo)} chunks on {nodes} node(s), {cpus} CPUs", flush=True)
+
+        @ray.remote(num_cpus=1, scheduling_strategy="SPREAD")
+        def _task(first, last, policy):
+            res = collect_chunk(out_dir, first, last, env_cfg, policy, noise, shard_rows)
+            return res, ray.get_runtime_context().get_node_id()[:8]
+
+        pol_ref = ray.put(pol)  # the actor snapshot is shipped once, not per task
+        pending = [_task.remote(a, b, pol_ref) for a, b in todo]
+        while pending:
+            done, pending = ray.wait(pending, num_returns=1)
+            yield ray.get(done[0])
+    finally:
+        ray.shutdown()
+        if cluster is not None:
+            cluster.shutdown()
+
+
+def _write_manifest(path, settings, chunks_by_prefix):
+    out = {"settings": settings, "rows": sum(c["rows"] for c in chunks_by_prefix.values()),
+           "chunks": sorted(chunks_by_prefix.values(), key=lambda c: c["first_seed"])}
+    with open(path + ".tmp", "w") as f:
+        json.dump(out, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return out
+
+
+def collect(out_dir, env_cfg, first_seed=0, episodes=1000, episodes_per_chunk=50, policy="random", noise=0.0,
+            shard_rows=4096, address=None, local_nodes=0, cpus_per_node=0, overwrite=False):
+    """Collect the seed range as Ray tasks spread over all nodes; writes ``<out_dir>/dataset.json``.
+
+    Chunks already on disk with the same settings are kept, so an interrupted
+    or extended collection only runs the missing seeds.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Every episode starts from reset(seed): no replayed reset pool, no training rollout log
+    env_cfg = dict(env_cfg, reset_pool="", reset_pool_size=0)
+    env_cfg.pop("record_dir", None)
+    pol = load_collect_policy(policy)
+    settings = {"policy": pol[0], "policy_sha256": pol[2], "noise": noise, "shard_rows": shard_rows,
+                "env": {k: env_cfg[k] for k in sorted(env_cfg)}}
+    manifest_path = os.path.join(out_dir, "dataset.json")
+    done = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            old = json.load(f)
+        if old["settings"] != settings and not overwrite:
+            raise ValueError(f"{out_dir} holds data collected with other settings (use --overwrite or another --out)")
+        if old["settings"] == settings:
+            done = {c["prefix"]: c for c in old["chunks"]}
+    todo = [(a, b) for a, b in chunks(first_seed, episodes, episodes_per_chunk)
+            if overwrite or chunk_prefix(a, b) not in done or not _complete(out_dir, chunk_prefix(a, b))]
+    t0 = time.time()
+    rows = 0
+    for k, (res, node) in enumerate(_run_chunks(todo, out_dir, env_cfg, pol, noise, shard_rows, address,
+                                                local_nodes, cpus_per_node) if todo else (), 1):
+        res.pop("collect_s")
+        done[res["prefix"]] = res
+        rows += res["rows"]
+        _write_manifest(manifest_path, settings, done)
+        print(f"  seeds {res['first_seed']}..{res['last_seed']}: {res['rows']} rows on node {node} ({k}/{len(todo)})",
+              flush=True)
+    out = _write_manifest(manifest_path, settings, done)
+    wall = time.time() - t0
+    print(f"{rows} new rows in {wall:.1f}s ({rows / max(wall, 1e-9):.0f} agent-steps/s); "
+          f"{out['rows']} rows in {len(out['chunks'])} chunks under {out_dir}", flush=True)
+    return out
+
+
+def verify(out_dir, policy="random", seeds=None):
+    """Re-collect chunks (all, or those holding ``seeds``) in a scratch dir and compare
+    their sha256 with dataset.json and with the files on disk; returns the mismatches."""
+    import tempfile
+    with open(os.path.join(out_dir, "dataset.json")) as f:
+        manifest = json.load(f)
+    s = manifest["settings"]
+    pol = load_collect_policy(policy)
+    if (pol[0], pol[2]) != (s["policy"], s["policy_sha256"]):
+        raise ValueError(f"{policy!r} is not the policy {out_dir} was collected with ({s['policy']}, {s['policy_sha256']})")
+    bad = []
+    for c in manifest["chunks"]:
+        if seeds is not None and not any(c["first_seed"] <= x <= c["last_seed"] for x in seeds):
+            continue
+        with tempfile.TemporaryDirectory() as tmp:
+            res = collect_chunk(tmp, c["first_seed"], c["last_seed"], s["env"], pol, s["noise"], s["shard_rows"])
+        ok = res["sha256"] == c["sha256"] == chunk_digest(out_dir, c["prefix"])
+        print(f"  {c['prefix']}: {'OK' if ok else 'MISMATCH'}", flush=True)
+        if not ok:
+            bad.append(c["prefix"])
+    return bad
+
+
+# ---- Streaming loader for RLlib's offline API ----
+
+def shard_datasource(path, rows_per_block=4096):
+    """``ray.data.Datasource`` with one read task per shard; each task memory-maps its
+    shard and yields blocks of ``rows_per_block`` rows in RLlib's offline column names.
+    Actions are mapped from the env's Box(0, 1) to RLlib's normalized [-1, 1] (what
+    the shared_policy module outputs before unsquashing)."""
+    from ray.data.block import BlockAccessor, BlockMetadata
+    from ray.data.datasource import Datasource, ReadTask
+
+    reader = ShardReader(path)
+    fields = ("episode", "step", "agent", "obs", "action", "reward", "next_obs", "terminated", "truncated")
+
+    def _read(i):
+        s = reader.shard(i, list(fields))
+        for lo in range(0, len(s["episode"]), rows_per_block):
+            sl = slice(lo, lo + rows_per_block)
+            yield BlockAccessor.batch_to_block({
+                # One single-agent trajectory per (episode, agent)
+                "eps_id": np.asarray(s["episode"][sl]) * 1024 + np.asarray(s["agent"][sl]),
+                "t": np.asarray(s["step"][sl], dtype=np.int64) - 1,
+                "obs": np.asarray(s["obs"][sl]),
+                "actions": np.asarray(s["action"][sl]) * 2.0 - 1.0,
+                "rewards": np.asarray(s["reward"][sl]),
+                "new_obs": np.asarray(s["next_obs"][sl]),
+                "terminateds": np.asarray(s["terminated"][sl]),
+                "truncateds": np.asarray(s["truncated"][sl]),
+            })
+
+    class ShardDatasource(Datasource):
+        def estimate_inmemory_data_size(self):
+            row = sum(int(np.prod(shape or (1,))) * np.dtype(d).itemsize for shape, d in reader.fields.values())
+            return len(reader) * row
+
+        def get_read_tasks(self, parallelism):
+            tasks = []
+            for i, shard in enumerate(reader.shards):
+                meta = BlockMetadata(num_rows=shard["rows"], size_bytes=None, schema=None,
+                                     input_files=[os.path.join(path, shard["path"])], exec_stats=None)
+                tasks.append(ReadTask(lambda i=i: _read(i), meta))
+            return tasks
+
+    return ShardDatasource()
+
+
+def shard_dataset(path, rows_per_block=4096):
+    """Lazy, streaming ``ray.data.Dataset`` over a collected dataset (nothing is read until iterated)."""
+    import ray.data
+    return ray.data.read_datasource(shard_datasource(path, rows_per_block))
+
+
+def _obs_dim(path):
+    return ShardReader(path).fields["obs"][0][0]
+
+
+class SingleAgentSpread(gym.Env):
+    """One agent of ``RLlibSpread`` as a single-agent env (RLlib's offline algorithms are single-agent).
+
+    ``config`` is the dataset's env settings plus ``agent`` (index, default 0);
+    the other agents take the no-op action. BC itself only reads the spaces.
+    """
+
+    def __init__(self, config=None):
+        from train.rllib_env import RLlibSpread
+        cfg = config if config is not None else {}  # keep an EnvContext (worker/vector index)
+        index = int(cfg.get("agent", 0))
+        self.env = RLlibSpread(cfg)
+        self.agent_ids = list(self.env.raw_env.possible_agents)
+        self.agent = self.agent_ids[index]
+        self.observation_space = self.env.observation_space[self.agent]
+        self.action_space = self.env.action_space[self.agent]
+
+    def reset(self, *, seed=None, options=None):
+        obs, infos = self.env.reset(seed=seed, options=options)
+        return obs[self.agent], infos.get(self.agent, {})
+
+    def step(self, action):
+        actions = {a: np.zeros(ACT_DIM, np.float32) for a in self.agent_ids}
+        actions[self.agent] = np.asarray(action, dtype=np.float32)
+        obs, rew, term, trunc, infos = self.env.step(actions)
+        return (obs[self.agent], float(rew[self.agent]), bool(term["__all__"]), bool(trunc["__all__"]),
+                infos.get(self.agent, {}))
+
+    def close(self):
+        self.env.close()
+
+
+def bc_config(path, trn, train_batch_size=2048, iters_per_learner=8, lr=1e-3, prelearner_cpus=1):
+    """BCConfig for shared_policy's per-agent transitions (use ``build_bc`` to attach the shard stream)."""
+    from ray.rllib.algorithms.bc import BCConfig
+    from ray.rllib.core.rl_module.default_model_config import DefaultModelConfig
+    with open(os.path.join(path, "dataset.json")) as f:
+        env_cfg = json.load(f)["settings"]["env"]
+    obs_dim = _obs_dim(path)
+    assert SingleAgentSpread(env_cfg).observation_space.shape == (obs_dim,), "dataset obs width does not match its env"
+    return (
+        BCConfig()
+        # RLlib always builds a local env runner; BC takes its spaces from the dataset's env
+        .environment(SingleAgentSpread, env_config=env_cfg)
+        .framework(trn.get("framework", "torch"))
+        .training(train_batch_size_per_learner=train_batch_size, lr=lr)
+        .rl_module(model_config=DefaultModelConfig(fcnet_hiddens=list(trn["fcnet_hiddens"])))
+        .offline_data(
+            # Placeholder read of the index files; build_bc swaps in the shard stream
+            input_=sorted(glob.glob(os.path.join(os.path.abspath(path), "index_*.json"))),
+            input_read_method="read_binary_files",
+            dataset_num_iters_per_learner=iters_per_learner,
+            map_batches_kwargs={"concurrency": 1, "num_cpus": prelearner_cpus},
+        )
+    )
+
+
+def build_bc(path, trn, **kwargs):
+    algo = bc_config(path, trn, **kwargs).build()
+    algo.offline_data.data = shard_dataset(path)
+    return algo
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Seed-sharded offline rollout collection and BC on the collected shards")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("collect", help="collect a seed range into fixed-size shards")
+    c.add_argument("--out", type=str, default="data/offline")
+    c.add_argument("--policy", type=str, default="random", help="random | checkpoint dir | exported .npz/.pt")
+    c.add_argument("--first_seed", type=int, default=0)
+    c.add_argument("--episodes", type=int, default=1000)
+    c.add_argument("--episodes_per_chunk", type=int, default=50, help="seeds per task (the unit of reproducibility)")
+    c.add_argument("--noise", type=float, default=0.0, help="Gaussian action noise (policy rollouts, seeded per episode)")
+    c.add_argument("--shard_rows", type=int, default=4096, help="agent-steps per shard")
+    c.add_argument("--address", type=str, default="", help="existing Ray cluster (e.g. auto)")
+    c.add_argument("--local_nodes", type=int, default=0, help="start this many Ray nodes on this machine")
+    c.add_argument("--cpus_per_node", type=int, default=0, help="CPUs per local node (0 = all cores)")
+    c.add_argument("--overwrite", action="store_true", help="re-collect chunks that already exist")
+    v = sub.add_parser("verify", help="re-collect chunks and compare their sha256 with dataset.json")
+    v.add_argument("--out", type=str, default="data/offline")
+    v.add_argument("--policy", type=str, default="random")
+    v.add_argument("--seeds", type=int, nargs="*", default=None, help="only the chunks holding these seeds")
+    b = sub.add_parser("bc", help="behaviour cloning on the collected shards (streamed, never fully in RAM)")
+    b.add_argument("--data", type=str, default="data/offline")
+    b.add_argument("--iters", type=int, default=10)
+    b.add_argument("--train_batch_size", type=int, default=2048)
+    b.add_argument("--iters_per_learner", type=int, default=8, help="minibatch updates per iteration")
+    b.add_argument("--lr", type=float, default=1e-3)
+    b.add_argument("--eval_episodes", type=int, default=64)
+    b.add_argument("--checkpoint", type=str, default="", help="save the BC algorithm here")
+    args = ap.parse_args()
+
+    import yaml
+    with open("config.yaml") as f:
+        cfg = yaml.safe_load(f)
+    if args.cmd == "collect":
+        collect(args.out, cfg["env"], args.first_seed, args.episodes, args.episodes_per_chunk, args.policy, args.noise,
+                args.shard_rows, args.address or None, args.local_nodes, args.cpus_per_node, args.overwrite)
+    elif args.cmd == "verify":
+        bad = verify(args.out, args.policy, args.seeds)
+        print("All chunks reproduce byte for byte" if not bad else f"{len(bad)} chunk(s) differ: {bad}")
+        raise SystemExit(1 if bad else 0)
+    else:
+        import ray
+        from eval.evaluate import RLModulePolicy, run_episodes
+        ray.init(num_cpus=max(2, os.cpu_count() or 1), include_dashboard=False)
+        algo = build_bc(args.data, cfg["train"], train_batch_size=args.train_batch_size,
+                        iters_per_learner=args.iters_per_learner, lr=args.lr)
+        with open(os.path.join(args.data, "dataset.json")) as f:
+            env_cfg = json.load(f)["settings"]["env"]
+        for it in range(1, args.iters + 1):
+            t0 = time.time()
+            res = algo.train()
+            learner = res["learners"]["default_policy"]
+            print(f"iter={it} policy_loss={learner.get('policy_loss'):.4f} "
+                  f"samples={learner.get('num_module_steps_trained')} ({time.time() - t0:.1f}s)", flush=True)
+        policy = RLModulePolicy(module=algo.get_module())
+        m = run_episodes(policy, np.arange(10_000, 10_000 + args.eval_episodes), env_cfg)
+        print(f"BC policy: coverage_rate={m['coverage_rate'].mean():.3f} return={m['return'].mean():.2f} "
+              f"({args.eval_episodes} episodes, explore=False)")
+        if args.checkpoint:
+            print("Saved", algo.save(os.path.abspath(args.checkpoint)).checkpoint.path)
+        algo.stop()
@@ -2,18 +2,8 @@ import argparse
 import os
 import time
 from ray.rllib.algorithms.algorithm import Algorithm
-
-
-def get_any(d: dict, keys):
-    for k in keys:
-        if k in d:
-            return d[k]
-        if "/" in k:
-            a, b = k.split("/", 1)
-            sub = d.get(a)
-            if isinstance(sub, dict) and b in sub:
-                return sub[b]
-    return None
+from train.checkpointing import CheckpointManager
+from train.train_rllib_ppo import iter_steps, mean_reward
 
 
 def main():
@@ -21,62 +11,39 @@ def main():
     ap.add_argument("--ckpt", required=True)
     ap.add_argument("--iters", type=int, default=10)
     ap.add_argument("--fallback-batch", type=int, default=1000)
+    ap.add_argument("--checkpoint-every", type=int, default=10, help="iterations between checkpoints (0 = end only)")
+    ap.add_argument("--keep-last", type=int, default=3)
+    ap.add_argument("--keep-best", type=int, default=1)
     args = ap.parse_args()
 
     print("Resuming from:", args.ckpt)
     algo = Algorithm.from_checkpoint(args.ckpt)
 
+    # Absolute paths avoid pyarrow URI issues
+    base = os.path.abspath("runs")
+    ckpts = CheckpointManager(
+        os.path.join(base, f"RESUME_{time.strftime('%Y-%m-%d_%H-%M-%S')}"), base,
+        every_iters=args.checkpoint_every, keep_last=args.keep_last, keep_best=args.keep_best,
+    )
+
     cumulative = 0
     for i in range(args.iters):
         r = algo.train()
-        rew = get_any(
-            r,
-            [
-                "env_runners/episode_return_mean",
-                "env_runners/episode_reward_mean",
-                "episode_return_mean",
-                "episode_reward_mean",
-            ],
-        )
-        step = get_any(
-            r,
-            [
-                "env_runners/num_env_steps_sampled_this_iter",
-                "num_env_steps_sampled_this_iter",
-            ],
-        )
+        rew = mean_reward(r)
+        step = iter_steps(r)
         if isinstance(step, (int, float)) and step > 0:
             cumulative += int(step)
-            step_disp = int(step)
         else:
             cumulative += int(args.fallback_batch)
-            step_disp = f"est:{args.fallback_batch}"
         print(
-            f"iter {i+1} mean_reward={rew} env_steps_iter={step_disp} env_steps_total={cumulative}"
+            f"iter {i+1} mean_reward={rew} "
+            f"env_steps_iter={step if step is not None else 'est:'+str(args.fallback_batch)} "
+            f"env_steps_total={cumulative}"
         )
+        ckpts.maybe_save(algo, i + 1, rew)
 
-    # Save to absolute, timestamped directory to avoid pyarrow URI issues
-    base = os.path.abspath("runs")
-    os.makedirs(base, exist_ok=True)
-    target = os.path.join(base, f"checkpoint_{time.strftime('%Y%m%d-%H%M%S')}")
-    os.makedirs(target, exist_ok=True)
-    new_ckpt = algo.save(checkpoint_dir=target).checkpoint.path
+    new_ckpt = ckpts.close(algo, args.iters, rew if args.iters else None)
     print("Saved checkpoint:", new_ckpt)
-    try:
-        with open(os.path.join(base, "latest_checkpoint_path.txt"), "w") as f:
-            f.write(new_ckpt + "\n")
-        link = os.path.join(base, "latest_checkpoint")
-        if os.path.islink(link) or os.path.exists(link):
-            try:
-                os.remove(link)
-            except Exception:
-                pass
-        try:
-            os.symlink(new_ckpt, link)
-        except Exception:
-            pass
-    except Exception:
-        pass
 
 
 if __name__ == "__main__":
@@ -1,20 +1,125 @@
+import atexit, os, time
+import gymnasium as gym
+import numpy as np
 try:
     from ray.rllib.env.wrappers.pettingzoo_env import ParallelPettingZooEnv as _PZEnv
 except Exception:  # fallback for older ray versions
     from ray.rllib.env import PettingZooEnv as _PZEnv
+from ray.rllib.env.multi_agent_env import MultiAgentEnv
 from envs.spread_wrapper import make_env
+from envs.vector_spread import VectorSpread
+from envs.shm_vector import ShmVectorSpread
+from envs.obs_encoding import pad_observations, padded_obs_dim
+from envs.fast_reset import FastReset, InitialStatePool
+from envs.timing import PHASES
+from eval.rollout_log import RolloutRecorder
 
 class RLlibSpread(_PZEnv):
     def __init__(self, env_config=None):
-        cfg = env_config or {}
+        # An empty EnvContext is falsy: keep it, it carries worker_index/vector_index
+        cfg = env_config if env_config is not None else {}
+        worker, vector = getattr(env_config, "worker_index", 0), getattr(env_config, "vector_index", 0)
         self.raw_env = make_env(
             n_agents=cfg.get("n_agents", 3),
             collision_penalty=cfg.get("collision_penalty", 1.0),
             action_penalty=cfg.get("action_penalty", 0.01),
             cover_radius=cfg.get("cover_radius", 0.1),
             render_mode=cfg.get("render_mode", None),
+            spatial_index=cfg.get("spatial_index", "auto"),
+            reward_components=cfg.get("reward_components"),
+            reward_split=cfg.get("reward_split", "even"),
         )
         super().__init__(self.raw_env)
+        # Padded observations (env.max_agents) keep obs size fixed across agent counts
+        self.n_agents = cfg.get("n_agents", 3)
+        self.max_agents = cfg.get("max_agents", 0) or 0
+        if self.max_agents:
+            space = gym.spaces.Box(-np.inf, np.inf, (padded_obs_dim(self.max_agents),), np.float32)
+            self.observation_space = gym.spaces.Dict({aid: space for aid in self._agent_ids})
+        # In-place resets after the first one, optionally replaying a pool of initial states
+        self._fast = FastReset(self.raw_env) if cfg.get("fast_reset", True) else None
+        self._has_reset = False
+        self.pool = None
+        if cfg.get("reset_pool"):
+            self.pool = InitialStatePool.load(cfg["reset_pool"])
+        elif cfg.get("reset_pool_size", 0):
+            self.pool = InitialStatePool.generate(self.n_agents, cfg["reset_pool_size"], cfg.get("reset_pool_seed", 0))
+        if self.pool is not None:
+            assert self.pool.n_agents == self.n_agents, "reset pool was generated for a different n_agents"
+            assert self._fast is not None, "reset_pool needs fast_reset"
+        # Each env runner / sub-env starts at a different point of the pool
+        self._pool_cursor = worker * 1009 + vector * 101
+        # Optional rollout log (env.record_dir): one writer per env instance
+        self.recorder = None
+        if cfg.get("record_dir"):
+            self.recorder = RolloutRecorder(
+                cfg["record_dir"], self.n_agents, prefix=f"w{worker}_v{vector}_{os.getpid()}",
+                shard_rows=cfg.get("record_shard_rows", 4096), meta={"source": "train"},
+            )
+            atexit.register(self.recorder.close)
+            self._world = self.raw_env.aec_env.unwrapped.world
+            self._agent_ids_list = list(self.raw_env.possible_agents)
+            self._episode = ((worker << 40) | (vector << 32)) - 1
+            self._step = 0
+
+    def _positions(self):
+        w = self._world
+        return np.stack([a.state.p_pos for a in w.agents]), np.stack([l.state.p_pos for l in w.landmarks])
+
+    def _encode(self, obs):
+        if not self.max_agents or not obs:
+            return obs
+        ids = list(obs)
+        padded = pad_observations(np.stack([obs[a] for a in ids]), self.n_agents, self.max_agents)
+        return dict(zip(ids, padded))
+
+    def reset(self, *, seed=None, options=None):
+        PHASES.idle()
+        t0 = time.perf_counter()
+        state = None
+        if self.pool is not None:
+            # options={"pool_index": k} replays pool state k; otherwise cycle through the pool
+            index = (options or {}).get("pool_index")
+            if index is None:
+                index, self._pool_cursor = self._pool_cursor, self._pool_cursor + 1
+            state = self.pool[index % len(self.pool)]
+        if self._fast is not None and self._has_reset:
+            obs, infos = self._fast.reset(seed=seed, state=state)
+        else:
+            obs, infos = super().reset(seed=seed, options=options)
+            self._has_reset = True
+            if state is not None:
+                obs, infos = self._fast.reset(state=state)
+        if self.recorder is not None:
+            self._episode += 1
+            self._step = 0
+            self.recorder.log_reset(self._episode, *self._positions())
+        obs = self._encode(obs)
+        PHASES.add("env_reset", time.perf_counter() - t0)
+        PHASES.env_exit()
+        return obs, infos
+
+    def step(self, action_dict):
+        PHASES.env_enter()
+        obs, rew, term, trunc, infos = super().step(action_dict)
+        if self.recorder is not None:
+            self._step += 1
+            ids = self._agent_ids_list
+            comps = self.raw_env.last_reward_components
+            self.recorder.log(
+                self._episode, self._step, *self._positions(),
+                np.stack([np.asarray(action_dict.get(a, np.zeros(5)), dtype=np.float32) for a in ids]),
+                np.array([rew.get(a, 0.0) for a in ids]),
+                comps["coverage"], comps["collisions"], comps["effort"],
+            )
+        obs = self._encode(obs)
+        PHASES.env_exit()
+        return obs, rew, term, trunc, infos
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        super().close()
 
     def render(self):
         # Proxy render to underlying env when possible
@@ -24,3 +129,107 @@ class RLlibSpread(_PZEnv):
             return None
 
 
+class RLlibVectorSpread(MultiAgentEnv):
+    """RLlib env backed by the NumPy ``VectorSpread`` engine (or ``ShmVectorSpread``).
+
+    The agents of all ``num_worlds`` worlds are exposed as one multi-agent env,
+    so every ``step`` call advances B worlds (B * N agent-steps) at once. With
+    ``num_worlds: 1`` agent ids match the PettingZoo path (``agent_0`` ...).
+    Note that RLlib then counts one env step per call and sums episode
+    returns over all worlds.
+    """
+
+    def __init__(self, env_config=None):
+        super().__init__()
+        cfg = env_config if env_config is not None else {}
+        kwargs = dict(
+            num_worlds=cfg.get("num_worlds", 1),
+            n_agents=cfg.get("n_agents", 3),
+            collision_penalty=cfg.get("collision_penalty", 1.0),
+            action_penalty=cfg.get("action_penalty", 0.01),
+            cover_radius=cfg.get("cover_radius", 0.1),
+            reward_components=cfg.get("reward_components"),
+            reward_split=cfg.get("reward_split", "even"),
+            spatial_index=cfg.get("spatial_index", "auto"),
+        )
+        self.shared_memory = cfg.get("engine") == "shm"
+        if self.shared_memory:
+            # PettingZoo worlds in subprocesses, results handed over in shared memory
+            self.vec = ShmVectorSpread(num_procs=cfg.get("shm_procs", 0), **kwargs)
+        else:
+            self.vec = VectorSpread(**kwargs)
+        self.max_agents = cfg.get("max_agents", 0) or 0
+        self.obs_dim = padded_obs_dim(self.max_agents) if self.max_agents else self.vec.obs_dim
+        B, N = self.vec.num_worlds, self.vec.n_agents
+        if B == 1:
+            self._ids = [f"agent_{i}" for i in range(N)]
+        else:
+            self._ids = [f"world{b}_agent_{i}" for b in range(B) for i in range(N)]
+        self.possible_agents = list(self._ids)
+        self.agents = list(self._ids)
+        obs_space = gym.spaces.Box(-np.inf, np.inf, (self.obs_dim,), np.float32)
+        act_space = gym.spaces.Box(0.0, 1.0, (self.vec.act_dim,), np.float32)
+        self.observation_spaces = {aid: obs_space for aid in self._ids}
+        self.action_spaces = {aid: act_space for aid in self._ids}
+        self.observation_space = gym.spaces.Dict(self.observation_spaces)
+        self.action_space = gym.spaces.Dict(self.action_spaces)
+
+    def reset(self, *, seed=None, options=None):
+        PHASES.idle()
+        t0 = time.perf_counter()
+        obs = self.vec.reset(seed=seed)
+        self.agents = list(self._ids)
+        PHASES.add("env_reset", time.perf_counter() - t0)
+        PHASES.env_exit()
+        return self._to_dict(obs), {aid: {} for aid in self._ids}
+
+    def step(self, action_dict):
+        PHASES.env_enter()
+        actions = np.stack([np.asarray(action_dict[aid], dtype=np.float64) for aid in self._ids])
+        obs, rew, term, trunc, info = self.vec.step(actions)
+        N = self.vec.n_agents
+        obs_d = self._to_dict(obs)
+        rew_d = dict(zip(self._ids, rew.reshape(-1).tolist()))
+        term_d = {aid: bool(term[k // N]) for k, aid in enumerate(self._ids)}
+        trunc_d = {aid: bool(trunc[k // N]) for k, aid in enumerate(self._ids)}
+        term_d["__all__"] = bool(term.all())
+        trunc_d["__all__"] = bool(trunc.all())
+        if term_d["__all__"] or trunc_d["__all__"]:
+            self.agents = []
+        PHASES.env_exit()
+        return obs_d, rew_d, term_d, trunc_d, self._infos(info)
+
+    def _infos(self, info):
+        # Per-world reward components for each agent (shm workers keep theirs in-process)
+        values = info.get("reward_components")
+        if values is None:
+            return {aid: {} for aid in self._ids}
+        N = self.vec.n_agents
+        per_world = [{k: v[b].item() for k, v in values.items()} for b in range(self.vec.num_worlds)]
+        timings = info["reward_timings"]
+        return {aid: {"reward_components": per_world[k // N], "reward_timings": timings}
+                for k, aid in enumerate(self._ids)}
+
+    def _to_dict(self, obs):
+        if self.max_agents:
+            obs = pad_observations(obs, self.vec.n_agents, self.max_agents)
+        elif self.shared_memory:
+            # One memcpy out of the shared buffer; RLlib keeps references to these arrays
+            obs = obs.copy()
+        flat = obs.reshape(-1, self.obs_dim)
+        return {aid: flat[k] for k, aid in enumerate(self._ids)}
+
+    def render(self):
+        return None
+
+    def close(self):
+        if self.shared_memory:
+            self.vec.close()
+
+
+def env_class(env_cfg):
+    # "vector" selects the batched NumPy engine, "shm" PettingZoo worlds in
+    # shared-memory subprocesses; anything else uses PettingZoo in-process
+    if (env_cfg or {}).get("engine", "pettingzoo") in ("vector", "shm"):
+        return RLlibVectorSpread
+    return RLlibSpread
@@ -0,0 +1,109 @@
+import torch
+from torch import nn
+from ray.rllib.algorithms.ppo.torch.ppo_torch_rl_module import PPOTorchRLModule
+from ray.rllib.core.columns import Columns
+
+# Fast policy forward for the env runners. RLlib's env-to-module connector
+# already stacks every agent's observation (shared_policy) into one batch per
+# env step (B * N rows with the vector engine); this module replaces the
+# encoder/pi dict plumbing of that forward with one fused actor MLP that can
+# be TorchScript-compiled or torch.compile'd and run in bfloat16 or with int8
+# dynamic quantization. The learner's copy of the module (inference_only
+# False) and _forward_train are untouched, so PPO updates stay in fp32.
+
+COMPILE_MODES = ("none", "script", "compile")
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def actor_layers(module):
+    """The actor encoder MLP followed by the pi head, as one nn.Sequential sharing the module's parameters."""
+    enc = getattr(module.encoder, "actor_encoder", None) or module.encoder.encoder
+    return nn.Sequential(*enc.net.mlp, *module.pi.net.mlp)
+
+
+class FastActor(nn.Module):
+    """``obs -> action_dist_inputs`` through a compiled/reduced-precision copy of the actor.
+
+    fp32 shares the module's parameters, so weight syncs need no rebuild.
+    bf16 keeps its own bfloat16 copy (refreshed in place by ``sync``); int8
+    re-quantizes (and re-scripts) on ``sync``.
+    """
+
+    def __init__(self, module, compile="script", precision="fp32"):
+        super().__init__()
+        assert compile in COMPILE_MODES, f"rollout_compile must be one of {COMPILE_MODES}, got {compile!r}"
+        assert precision in PRECISIONS, f"rollout_precision must be one of {PRECISIONS}, got {precision!r}"
+        if precision == "int8" and compile == "compile":
+            # Dynamic-quantized linears are opaque packed ops to inductor; TorchScript handles them
+            compile = "script"
+        self.compile_mode, self.precision = compile, precision
+        self.source = actor_layers(module)
+        self._build()
+
+    def _build(self):
+        net = self.source
+        if self.precision == "bf16":
+            import copy
+            net = copy.deepcopy(net).to(torch.bfloat16)
+        elif self.precision == "int8":
+            net = torch.ao.quantization.quantize_dynamic(net, {nn.Linear}, dtype=torch.qint8)
+        net.eval()
+        self.net = net
+        if self.compile_mode == "script":
+            self.fn = torch.jit.script(net)
+        elif self.compile_mode == "compile":
+            try:
+                self.fn = torch.compile(net, dynamic=True)
+            except Exception as e:  # no inductor backend / C compiler: TorchScript instead
+                print(f"[rollout_inference] torch.compile unavailable ({e!r}); using TorchScript", flush=True)
+                self.compile_mode, self.fn = "script", torch.jit.script(net)
+        else:
+            self.fn = net
+
+    def sync(self):
+        """Pick up new weights after ``module.set_state``."""
+        if self.precision == "bf16":
+            with torch.no_grad():
+                for dst, src in zip(self.net.parameters(), self.source.parameters()):
+                    dst.copy_(src)
+        elif self.precision == "int8":
+            self._build()
+
+    def forward(self, obs):
+        with torch.no_grad():
+            if self.precision == "bf16":
+                return self.fn(obs.to(torch.bfloat16)).float()
+            return self.fn(obs.float())
+
+
+class RolloutInferencePPOModule(PPOTorchRLModule):
+    """PPO RLModule whose inference-only copies (env runners) use ``FastActor``.
+
+    Configured through ``model_config["rollout_compile"]`` (none | script |
+    compile) and ``model_config["rollout_precision"]`` (fp32 | bf16 | int8),
+    i.e. ``train.rollout_compile`` / ``train.rollout_precision``.
+    """
+
+    def setup(self):
+        super().setup()
+        cfg = self.model_config if isinstance(self.model_config, dict) else vars(self.model_config)
+        self.rollout_compile = cfg.get("rollout_compile") or "none"
+        self.rollout_precision = cfg.get("rollout_precision") or "fp32"
+        self._fast = None
+
+    def _fast_enabled(self):
+        return (self.inference_only and not self.is_stateful()
+                and (self.rollout_compile != "none" or self.rollout_precision != "fp32"))
+
+    def _forward(self, batch, **kwargs):
+        if not self._fast_enabled():
+            return super()._forward(batch, **kwargs)
+        if self._fast is None:
+            # Built lazily: not registered as a submodule, so state_dict/checkpoints are unchanged
+            self._fast = [FastActor(self, self.rollout_compile, self.rollout_precision)]
+        return {Columns.ACTION_DIST_INPUTS: self._fast[0](batch[Columns.OBS])}
+
+    def set_state(self, state):
+        super().set_state(state)
+        if self._fast is not None:
+            self._fast[0].sync()
@@ -0,0 +1,194 @@
+import argparse, copy, json, os, tempfile, time
+import yaml
+import ray
+from ray import tune
+from ray import train as ray_train
+from ray.train import Checkpoint
+from ray.tune.schedulers import ASHAScheduler, PopulationBasedTraining
+from train.train_rllib_ppo import load_cfg, build_config, mean_reward, iter_steps
+from train.instrumentation import IterationRecorder
+
+SCHEDULERS = ("asha", "pbt", "none")
+# Keys that change network or observation shapes; PBT can't carry weights across them
+_PBT_FIXED = ("train.fcnet_hiddens", "train.vf_share_layers", "train.framework", "env.n_agents", "env.engine", "env.num_worlds")
+_DISTRIBUTIONS = {
+    "uniform": tune.uniform,
+    "loguniform": tune.loguniform,
+    "randint": tune.randint,
+    "choice": tune.choice,
+}
+
+
+def is_searched(value, base=None):
+    """Whether a sweep value is a search axis rather than a constant override.
+
+    For keys whose config value is itself a list (``fcnet_hiddens``) a flat
+    list is a constant and a list of lists is the axis.
+    """
+    if isinstance(value, dict):
+        return len(value) == 1 and next(iter(value)) in _DISTRIBUTIONS
+    if isinstance(value, list):
+        return not isinstance(base, list) or all(isinstance(v, list) for v in value)
+    return False
+
+
+def to_tune(value, search="grid", base=None):
+    """YAML value -> tune search space.
+
+    Lists are grid axes (``search: grid``) or categorical draws (``random``);
+    ``{loguniform: [lo, hi]}`` style mappings are distributions; anything
+    else is a constant.
+    """
+    if not is_searched(value, base):
+        return value
+    if isinstance(value, dict):
+        kind, args = next(iter(value.items()))
+        return _DISTRIBUTIONS[kind](args) if kind == "choice" else _DISTRIBUTIONS[kind](*args)
+    return tune.grid_search(value) if search == "grid" else tune.choice(value)
+
+
+def _base(cfg, dotted):
+    section, key = dotted.split(".", 1)
+    return (cfg.get(section) or {}).get(key)
+
+
+def apply_params(cfg, params):
+    """Copy of ``cfg`` with dotted ``section.key`` overrides, e.g. ``env.cover_radius``."""
+    cfg = copy.deepcopy(cfg)
+    for dotted, value in params.items():
+        section, key = dotted.split(".", 1)
+        assert section in ("env", "train"), f"sweep keys must start with env. or train. (got {dotted})"
+        cfg[section][key] = value
+    return cfg
+
+
+def _trial(config, base_cfg=None, max_iters=50, checkpoint_every=0):
+    cfg = apply_params(base_cfg, config)
+    env_cfg, trn = cfg["env"], cfg["train"]
+    algo = build_config(env_cfg, trn).build()
+    ckpt = ray_train.get_checkpoint()
+    start, env_steps_total = 0, 0
+    if ckpt is not None:
+        # PBT exploit / trial restore
+        with ckpt.as_directory() as d:
+            algo.restore_from_path(d)
+            with open(os.path.join(d, "trial_state.json")) as f:
+                state = json.load(f)
+        start, env_steps_total = state["iteration"], state["env_steps_total"]
+    recorder = IterationRecorder(ray_train.get_context().get_trial_dir())
+    for i in range(start, max_iters):
+        t0 = time.time()
+        result = algo.train()
+        wall = time.time() - t0
+        steps = iter_steps(result) or 0
+        env_steps_total += steps
+        row = recorder.record(i + 1, result, wall, env_steps=steps, mean_reward=mean_reward(result),
+                              env_steps_total=env_steps_total)
+        metrics = {
+            "episode_return_mean": mean_reward(result),
+            "env_steps_total": env_steps_total,
+            "env_steps_per_s": row["env_steps_per_s"],
+            "iteration": i + 1,
+        }
+        if (checkpoint_every and (i + 1) % checkpoint_every == 0) or i + 1 == max_iters:
+            with tempfile.TemporaryDirectory() as d:
+                algo.save_to_path(d)
+                with open(os.path.join(d, "trial_state.json"), "w") as f:
+                    json.dump({"iteration": i + 1, "env_steps_total": env_steps_total}, f)
+                ray_train.report(metrics, checkpoint=Checkpoint.from_directory(d))
+        else:
+            ray_train.report(metrics)
+    algo.stop()
+
+
+def build_scheduler(name, space, max_iters, grace_period, perturbation_interval, cfg=None):
+    if name == "asha":
+        return ASHAScheduler(time_attr="training_iteration", max_t=max_iters, grace_period=grace_period)
+    if name == "pbt":
+        # Searched keys are mutated (lists step to a neighbouring value,
+        # distributions are resampled or scaled by 0.8/1.2) unless they change shapes
+        mutations = {
+            k: (v if isinstance(v, list) else to_tune(v))
+            for k, v in space.items() if is_searched(v, _base(cfg, k)) and k not in _PBT_FIXED
+        }
+        assert mutations, "pbt needs at least one mutable list or distribution in sweep.space"
+        return PopulationBasedTraining(
+            time_attr="training_iteration", perturbation_interval=perturbation_interval,
+            hyperparam_mutations=mutations,
+        )
+    return None
+
+
+def _parse_params(pairs):
+    out = {}
+    for p in pairs:
+        key, _, value = p.partition("=")
+        out[key] = yaml.safe_load(value)
+    return out
+
+
+if __name__ == "__main__":
+    cfg = load_cfg()
+    sw = dict(cfg.get("sweep") or {})
+    ap = argparse.ArgumentParser(description="Parallel PPO hyperparameter sweep (ray.tune)")
+    ap.add_argument("--param", action="append", default=[],
+                    help="section.key=YAML, e.g. env.collision_penalty='[0.5, 1, 2]' or "
+                         "train.lr='{loguniform: [1e-4, 1e-3]}' (adds to / overrides sweep.space)")
+    ap.add_argument("--search", choices=["grid", "random"], default=sw.get("search", "grid"))
+    ap.add_argument("--num_samples", type=int, default=sw.get("num_samples", 1))
+    ap.add_argument("--scheduler", choices=SCHEDULERS, default=sw.get("scheduler", "asha"))
+    ap.add_argument("--max_iters", type=int, default=sw.get("max_iters", 50))
+    ap.add_argument("--grace_period", type=int, default=sw.get("grace_period", 5), help="ASHA min iterations")
+    ap.add_argument("--perturbation_interval", type=int, default=sw.get("perturbation_interval", 5), help="PBT")
+    ap.add_argument("--cpus_per_trial", type=int, default=sw.get("cpus_per_trial", 1),
+                    help="learner CPU; env runners (train.num_workers) get one CPU each on top")
+    ap.add_argument("--max_concurrent", type=int, default=sw.get("max_concurrent", 0), help="0 = fill all CPUs")
+    ap.add_argument("--name", type=str, default="")
+    args = ap.parse_args()
+
+    space = dict(sw.get("space") or {})
+    space.update(_parse_params(args.param))
+    assert space, "nothing to sweep: set sweep.space in config.yaml or pass --param"
+    param_space = {k: to_tune(v, args.search, _base(cfg, k)) for k, v in space.items()}
+
+    # Constant overrides (e.g. train.num_workers=0) also size each trial's resources
+    trn = apply_params(cfg, {k: v for k, v in space.items() if not is_searched(v, _base(cfg, k))})["train"]
+    num_workers = int(trn["num_workers"])
+    resources = tune.PlacementGroupFactory(
+        [{"CPU": args.cpus_per_trial}] + [{"CPU": 1}] * num_workers, strategy="PACK"
+    )
+    trainable = tune.with_resources(
+        tune.with_parameters(
+            _trial, base_cfg=cfg, max_iters=args.max_iters,
+            checkpoint_every=args.perturbation_interval if args.scheduler == "pbt" else 0,
+        ),
+        resources,
+    )
+    # Trials land in runs/<name>/<trial>/ with progress.csv, metrics.jsonl and checkpoints
+    name = args.name or f"sweep_{time.strftime('%Y-%m-%d_%H-%M-%S')}"
+    ray.init(ignore_reinit_error=True)
+    tuner = tune.Tuner(
+        trainable,
+        param_space=param_space,
+        tune_config=tune.TuneConfig(
+            metric="episode_return_mean", mode="max", num_samples=args.num_samples,
+            scheduler=build_scheduler(args.scheduler, space, args.max_iters, args.grace_period,
+                                      args.perturbation_interval, cfg),
+            max_concurrent_trials=args.max_concurrent or None,
+        ),
+        run_config=ray_train.RunConfig(
+            name=name,
+            storage_path=os.path.abspath(trn.get("local_dir", "runs")),
+            checkpoint_config=ray_train.CheckpointConfig(
+                num_to_keep=2, checkpoint_score_attribute="episode_return_mean", checkpoint_score_order="max",
+            ),
+        ),
+    )
+    results = tuner.fit()
+    best = results.get_best_result()
+    print("Best config:", {k: best.config[k] for k in space})
+    print("Best episode_return_mean:", best.metrics.get("episode_return_mean"))
+    if best.checkpoint is not None:
+        print("Best checkpoint:", best.checkpoint.path)
+        with open(os.path.join(os.path.abspath(trn.get("local_dir", "runs")), name, "best_checkpoint_path.txt"), "w") as f:
+            f.write(best.checkpoint.path + "\n")
@@ -1,7 +1,12 @@
-import yaml, os, time
+import gc, yaml, os, time
 from ray import air, tune
 from ray.rllib.algorithms.ppo import PPOConfig
-from train.rllib_env import RLlibSpread
+from ray.rllib.core.rl_module.default_model_config import DefaultModelConfig
+from train.rllib_env import env_class
+from train.instrumentation import IterationRecorder, LearnerTimer, phase_callbacks
+from train.metrics_stream import MetricsStream
+from train.checkpointing import CheckpointManager
+from train.eval_worker import EvalWorker, format_row
 
 def load_cfg(path="config.yaml"):
     with open(path, "r") as f:
@@ -11,147 +16,233 @@ def policy_mapping_fn(agent_id, *args, **kwargs):
     # Compatible with older/newer RLlib signatures regardless of extra params
     return "shared_policy"
 
-if __name__ == "__main__":
-    cfg = load_cfg()
-    env_cfg = cfg["env"]
-    trn = cfg["train"]
-
-    # Speed toggles for CI via env vars
-    stop_iter = int(os.getenv("FAST_STOP_ITERS", trn["stop_training_iteration"]))
-    num_workers = int(os.getenv("FAST_NUM_WORKERS", trn["num_workers"]))
-    train_batch_size = int(os.getenv("FAST_TRAIN_BATCH", trn["train_batch_size"]))
-    rollout_fragment_length = int(os.getenv("FAST_ROLLOUT_LEN", trn["rollout_fragment_length"]))
-    small_model = os.getenv("FAST_SMALL_MODEL", "0") == "1"
-    time_limit_s = int(os.getenv("FAST_TIME_LIMIT", "0"))
-
+def build_config(env_cfg, trn, num_workers=None, train_batch_size=None, rollout_fragment_length=None,
+                 small_model=False, callbacks=None):
+    """PPOConfig from the ``env:``/``train:`` sections (shared with train/sweep.py)."""
+    assert trn.get("algo", "PPO") == "PPO", f"only PPO is supported, got train.algo={trn['algo']!r}"
+    train_batch_size = train_batch_size or trn["train_batch_size"]
+    num_learners = int(trn.get("num_learners", 0) or 0)
+    # sgd_minibatch_size is the global minibatch: each of k learners takes 1/k of it
+    # and DDP averages their gradients
+    minibatch_size = max(1, min(trn["sgd_minibatch_size"], train_batch_size) // max(1, num_learners))
+    model_config = DefaultModelConfig(
+        fcnet_hiddens=([64, 64] if small_model else list(trn["fcnet_hiddens"])),
+        vf_share_layers=trn["vf_share_layers"],
+    )
     algo_cfg = (
         PPOConfig()
-        .environment(env=RLlibSpread, env_config=env_cfg)
+        .environment(env=env_class(env_cfg), env_config=env_cfg)
         .framework(trn["framework"])
         .env_runners(
-            num_env_runners=num_workers,
-            rollout_fragment_length=rollout_fragment_length,
+            num_env_runners=trn["num_workers"] if num_workers is None else num_workers,
+            rollout_fragment_length=rollout_fragment_length or trn["rollout_fragment_length"],
             batch_mode="truncate_episodes"
         )
         .training(
             train_batch_size=train_batch_size,
+            minibatch_size=minibatch_size,
+            num_epochs=trn["num_sgd_iter"],
             gamma=trn["gamma"],
             lr=trn["lr"],
-            model={
-                "fcnet_hiddens": ([64, 64] if small_model else trn["fcnet_hiddens"]),
-                "vf_share_layers": trn["vf_share_layers"],
-            },
+        )
+        # New API stack: the network comes from the RLModule model_config (training(model=...) is ignored)
+        .rl_module(model_config=model_config)
+        .learners(
+            num_learners=num_learners,
+            num_cpus_per_learner=trn.get("num_cpus_per_learner", 1),
         )
         .multi_agent(
             policies={"shared_policy": (None, None, None, {})},
             policy_mapping_fn=policy_mapping_fn
         )
     )
+    if trn.get("learner_torch_threads", 0) and trn["framework"] == "torch":
+        from train.cpu_learner import CPUPPOTorchLearner
+        algo_cfg = algo_cfg.training(
+            learner_class=CPUPPOTorchLearner,
+            learner_config_dict={"torch_threads": int(trn["learner_torch_threads"])},
+        )
+    rollout_compile = trn.get("rollout_compile") or "none"
+    rollout_precision = trn.get("rollout_precision") or "fp32"
+    if (rollout_compile != "none" or rollout_precision != "fp32") and trn["framework"] == "torch":
+        # Env runners run the actor through train/rollout_inference.py; the learner stays fp32 eager
+        from ray.rllib.algorithms.ppo.ppo_catalog import PPOCatalog
+        from ray.rllib.core.rl_module.rl_module import RLModuleSpec
+        from train.rollout_inference import RolloutInferencePPOModule
+        algo_cfg = algo_cfg.rl_module(
+            rl_module_spec=RLModuleSpec(module_class=RolloutInferencePPOModule, catalog_class=PPOCatalog),
+            model_config=dict(vars(model_config), rollout_compile=rollout_compile,
+                              rollout_precision=rollout_precision),
+        )
+    if callbacks is not None:
+        algo_cfg = algo_cfg.callbacks(callbacks)
+    return algo_cfg
+
+def get_any(res: dict, keys: list):
+    for k in keys:
+        # Try flattened key first
+        if k in res:
+            return res[k]
+        # Try nested form like 'env_runners/metric'
+        if '/' in k:
+            first, rest = k.split('/', 1)
+            sub = res.get(first)
+            if isinstance(sub, dict) and rest in sub:
+                return sub.get(rest)
+    return None
+
+def mean_reward(res: dict):
+    return get_any(
+        res,
+        [
+            'env_runners/episode_return_mean',
+            'env_runners/episode_reward_mean',
+            'episode_return_mean',
+            'episode_reward_mean',
+        ],
+    )
+
+def lifetime_steps(res: dict):
+    val = get_any(
+        res,
+        [
+            'env_runners/num_env_steps_sampled_lifetime',
+            'num_env_steps_sampled_lifetime',
+        ],
+    )
+    if isinstance(val, (int, float)) and val >= 0:
+        return int(val)
+    return None
+
+def iter_steps(res: dict):
+    val = get_any(
+        res,
+        [
+            'env_runners/num_env_steps_sampled_this_iter',
+            'num_env_steps_sampled_this_iter',
+            'env_runners/num_env_steps_sampled',
+        ],
+    )
+    if isinstance(val, (int, float)) and val >= 0:
+        return int(val)
+    return None
+
+def stop_algo(algo):
+    """``algo.stop()`` plus the LearnerGroup teardown it leaves out.
+
+    Reference cycles keep a stopped algo alive; its LearnerGroup.__del__
+    (DDP teardown with num_learners > 1) then runs after Ray has shut down
+    and re-inits Ray. Shut the learners down and collect while Ray is up.
+    """
+    algo.stop()
+    algo.learner_group.shutdown()
+    gc.collect()
+
+if __name__ == "__main__":
+    cfg = load_cfg()
+    env_cfg = cfg["env"]
+    trn = cfg["train"]
+
+    # Speed toggles for CI via env vars
+    stop_iter = int(os.getenv("FAST_STOP_ITERS", trn["stop_training_iteration"]))
+    num_workers = int(os.getenv("FAST_NUM_WORKERS", trn["num_workers"]))
+    train_batch_size = int(os.getenv("FAST_TRAIN_BATCH", trn["train_batch_size"]))
+    rollout_fragment_length = int(os.getenv("FAST_ROLLOUT_LEN", trn["rollout_fragment_length"]))
+    small_model = os.getenv("FAST_SMALL_MODEL", "0") == "1"
+    time_limit_s = int(os.getenv("FAST_TIME_LIMIT", "0"))
+    # Opt-in env-runner profiler: off | cprofile | sample
+    profile_mode = os.getenv("PROFILE_ENV_RUNNERS", trn.get("profile_env_runners", "off"))
+    # Live metrics: <logdir>/metrics.ring always; Prometheus text endpoint if a port is set
+    metrics_port = int(os.getenv("METRICS_PORT", trn.get("metrics_port", 0)))
+    # Deterministic evaluation in a background process (fixed seeds, explore=False)
+    eval_every = int(os.getenv("EVAL_EVERY_ITERS", trn.get("eval_every_iters", 0)))
+
+    # Log dir is fixed up front so runner profiles land next to progress.csv
+    logdir = os.path.abspath(os.path.join(trn["local_dir"], f"PPO_{time.strftime('%Y-%m-%d_%H-%M-%S')}"))
+    stream = MetricsStream(logdir, http_port=metrics_port)
+    if trn.get("record_rollouts", False):
+        # Every env logs its steps under <logdir>/rollouts (python -m eval.rollout_log)
+        env_cfg = dict(env_cfg, record_dir=os.path.join(logdir, "rollouts"))
+
+    algo_cfg = build_config(
+        env_cfg, trn, num_workers=num_workers, train_batch_size=train_batch_size,
+        rollout_fragment_length=rollout_fragment_length, small_model=small_model,
+        callbacks=phase_callbacks(profile_mode, os.path.join(logdir, "profiles")),
+    )
 
     # Use Algorithm directly for simplicity with new API; save a checkpoint at the end
     from ray.rllib.algorithms import ppo as ppo_mod
     from ray.tune.logger import UnifiedLogger
 
     def _logger_creator(cfg):
-        timestr = time.strftime("%Y-%m-%d_%H-%M-%S")
-        logdir = os.path.join(trn["local_dir"], f"PPO_{timestr}")
         os.makedirs(logdir, exist_ok=True)
         return UnifiedLogger(cfg, logdir, loggers=None)
 
     algo = ppo_mod.PPO(config=algo_cfg.to_dict(), logger_creator=_logger_creator)
-    def _get_any(res: dict, keys: list):
-        for k in keys:
-            # Try flattened key first
-            if k in res:
-                return res[k]
-            # Try nested form like 'env_runners/metric'
-            if '/' in k:
-                first, rest = k.split('/', 1)
-                sub = res.get(first)
-                if isinstance(sub, dict) and rest in sub:
-                    return sub.get(rest)
-        return None
-
-    def _mean_reward(res: dict):
-        return _get_any(
-            res,
-            [
-                'env_runners/episode_return_mean',
-                'env_runners/episode_reward_mean',
-                'episode_return_mean',
-                'episode_reward_mean',
-            ],
-        )
-
-    def _lifetime_steps(res: dict):
-        val = _get_any(
-            res,
-            [
-                'env_runners/num_env_steps_sampled_lifetime',
-                'num_env_steps_sampled_lifetime',
-            ],
-        )
-        if isinstance(val, (int, float)) and val >= 0:
-            return int(val)
-        return None
-
-    def _iter_steps(res: dict):
-        val = _get_any(
-            res,
-            [
-                'env_runners/num_env_steps_sampled_this_iter',
-                'num_env_steps_sampled_this_iter',
-            ],
-        )
-        if isinstance(val, (int, float)) and val >= 0:
-            return int(val)
-        return None
-
+    recorder = IterationRecorder(logdir)
+    learner_timer = LearnerTimer(algo)
+    # Periodic checkpoints go under the run dir; runs/latest_checkpoint* always points at the newest
+    ckpt_base = os.path.abspath(trn["local_dir"]) if trn.get("local_dir") else os.path.abspath("runs")
+    ckpts = CheckpointManager(
+        logdir, ckpt_base,
+        every_iters=int(os.getenv("CHECKPOINT_EVERY_ITERS", trn.get("checkpoint_every_iters", 0))),
+        every_s=float(trn.get("checkpoint_every_s", 0)),
+        keep_last=trn.get("keep_last_checkpoints", 3),
+        keep_best=trn.get("keep_best_checkpoints", 1),
+        background=trn.get("async_checkpoint", True),
+        recorder=recorder,
+    )
+    evaluator = None
+    if eval_every:
+        evaluator = EvalWorker(logdir, env_cfg, episodes=trn.get("eval_episodes", 64), seed=trn.get("eval_seed", 10_000))
     start_time = time.time()
     cumulative_env_steps = 0
+    last_reward = None
+    iteration = 0
     for i in range(stop_iter):
+        t_iter = time.time()
         result = algo.train()
-        iter_steps = _iter_steps(result)
-        if isinstance(iter_steps, (int, float)) and iter_steps > 0:
-            cumulative_env_steps += int(iter_steps)
+        iter_wall = time.time() - t_iter
+        steps_iter = iter_steps(result)
+        if isinstance(steps_iter, (int, float)) and steps_iter > 0:
+            cumulative_env_steps += int(steps_iter)
         elif train_batch_size:
             # Conservative fallback to configured batch size
             cumulative_env_steps += int(train_batch_size)
+        row = recorder.record(
+            i + 1, result, iter_wall, env_steps=steps_iter, learner_s=learner_timer.drain(),
+            mean_reward=mean_reward(result), env_steps_total=cumulative_env_steps,
+        )
+        stream.publish(row)
+        iteration, last_reward = i + 1, mean_reward(result)
+        ckpts.maybe_save(algo, iteration, last_reward)
+        if evaluator is not None:
+            if iteration % eval_every == 0:
+                evaluator.submit(iteration, algo.get_module("shared_policy"))
+            for ev in evaluator.poll():
+                recorder.event("eval", **ev)
+                print(format_row(ev), flush=True)
         print(
-            f"Iter {i+1}/{stop_iter}: mean_reward={_mean_reward(result)} "
-            f"env_steps_iter={iter_steps if iter_steps is not None else 'est:'+str(train_batch_size)} "
+            f"Iter {i+1}/{stop_iter}: mean_reward={mean_reward(result)} "
+            f"env_steps_iter={steps_iter if steps_iter is not None else 'est:'+str(train_batch_size)} "
             f"env_steps_total={cumulative_env_steps} "
+            f"steps_per_s={row['env_steps_per_s'] or 0:.0f} "
+            f"learner_samples_per_s={row['learner_samples_per_s'] or 0:.0f} "
             f"elapsed_s={int(time.time()-start_time)}",
             flush=True,
         )
         if time_limit_s and (time.time() - start_time) >= time_limit_s:
             print(f"FAST_TIME_LIMIT reached ({time_limit_s}s). Stopping early.")
             break
-    # Ensure absolute checkpoint directory exists (avoid pyarrow URI issues)
-    ckpt_base = os.path.abspath(trn["local_dir"]) if trn.get("local_dir") else os.path.abspath("runs")
-    os.makedirs(ckpt_base, exist_ok=True)
-    ckpt_name = time.strftime("checkpoint_%Y%m%d-%H%M%S")
-    target_dir = os.path.join(ckpt_base, ckpt_name)
-    os.makedirs(target_dir, exist_ok=True)
-    chkpt_dir = algo.save(checkpoint_dir=target_dir).checkpoint.path
+    stream.close()
+    if evaluator is not None:
+        if iteration % eval_every:
+            evaluator.submit(iteration, algo.get_module("shared_policy"))
+        for ev in evaluator.close():
+            recorder.event("eval", **ev)
+            print(format_row(ev), flush=True)
+    chkpt_dir = ckpts.close(algo, iteration, last_reward)
     print(f"Saved checkpoint: {chkpt_dir}")
-    # Persist discoverable pointers for tooling/Makefile
-    try:
-        latest_txt = os.path.join(ckpt_base, "latest_checkpoint_path.txt")
-        with open(latest_txt, "w") as f:
-            f.write(chkpt_dir + "\n")
-        latest_link = os.path.join(ckpt_base, "latest_checkpoint")
-        if os.path.islink(latest_link) or os.path.exists(latest_link):
-            try:
-                os.remove(latest_link)
-            except Exception:
-                pass
-        try:
-            os.symlink(chkpt_dir, latest_link)
-        except Exception:
-            pass
-        print(f"Wrote latest checkpoint pointer: {latest_txt}")
-    except Exception as e:
-        print(f"Warning: could not write latest checkpoint pointer: {e}")
-
-
+    print(f"Wrote latest checkpoint pointer: {os.path.join(ckpt_base, 'latest_checkpoint_path.txt')}")
+    # Closes the env runners' envs (shm engine workers) and the learners before interpreter exit
+    stop_algo(algo)